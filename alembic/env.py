@@ -8,9 +8,11 @@ import sys
 # Add the parent directory to sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# Import your models
-from app.models.attendance import Attendance, Base as AttendanceBase
-from app.models.session import Session, Base as SessionBase
+# Import your models so they are registered on the shared metadata
+from app.models.base import Base
+from app.models.attendance import Attendance
+from app.models.session import Session
+from app.models.roster import RosterEntry
 
 # this is the Alembic Config object
 config = context.config
@@ -20,7 +22,13 @@ if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
 # Add your model's MetaData object here for 'autogenerate' support
-target_metadata = [AttendanceBase.metadata, SessionBase.metadata]
+target_metadata = Base.metadata
+
+# Tables the migrations leave behind on purpose, which no model describes
+UNMANAGED_TABLES = {"attendance_duplicates"}
+
+def include_name(name, type_, parent_names) -> bool:
+    return not (type_ == "table" and name in UNMANAGED_TABLES)
 
 def run_migrations_offline() -> None:
     url = os.getenv("DATABASE_URL")
@@ -30,6 +38,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_name=include_name,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -54,7 +63,10 @@ def run_migrations_online() -> None:
     with connectable.connect() as connection:
         context.configure(
             connection=connection,
-            target_metadata=target_metadata
+            target_metadata=target_metadata,
+            include_name=include_name,
+            # SQLite (used for local benchmarks) needs batch mode for ALTER
+            render_as_batch=connection.dialect.name == "sqlite"
         )
 
         with context.begin_transaction():
@@ -0,0 +1,62 @@
+"""initial schema
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing deployments created these tables before migrations existed,
+    # so only create what is missing.
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table('sessions'):
+        op.create_table(
+            'sessions',
+            sa.Column('session_id', sa.String(), nullable=False),
+            sa.Column('data', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('expires_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('session_id')
+        )
+
+    if not inspector.has_table('attendance'):
+        op.create_table(
+            'attendance',
+            sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+            sa.Column('session_id', sa.String(), nullable=True),
+            sa.Column('full_name', sa.String(length=100), nullable=False),
+            sa.Column('phone_number', sa.String(length=15), nullable=False),
+            sa.Column('email', sa.String(length=255), nullable=False),
+            sa.Column('branch', sa.String(length=50), nullable=False),
+            sa.Column('section', sa.String(length=10), nullable=False),
+            sa.Column('roll_number', sa.String(length=20), nullable=False),
+            sa.Column('device_info', sa.String(length=500), nullable=True),
+            sa.Column('selfie_data', sa.Text(), nullable=False),
+            sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+            sa.Column('verified', sa.Boolean(), nullable=True),
+            sa.Column('verification_time', sa.DateTime(timezone=True), nullable=True),
+            sa.Column('verified_by', sa.String(length=100), nullable=True),
+            sa.ForeignKeyConstraint(['session_id'], ['sessions.session_id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('attendance')
+    op.drop_table('sessions')
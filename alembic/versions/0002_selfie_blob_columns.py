@@ -0,0 +1,38 @@
+"""store selfies in the blob store
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 09:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('attendance') as batch_op:
+        batch_op.add_column(sa.Column('selfie_key', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('selfie_size', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('selfie_mime_type', sa.String(length=50), nullable=True))
+        # Existing rows keep their inline image until
+        # `python -m app.services.selfie_migration` moves them to the blob store
+        batch_op.alter_column('selfie_data', existing_type=sa.Text(), nullable=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('attendance') as batch_op:
+        batch_op.alter_column('selfie_data', existing_type=sa.Text(), nullable=False)
+        batch_op.drop_column('selfie_mime_type')
+        batch_op.drop_column('selfie_size')
+        batch_op.drop_column('selfie_key')
@@ -0,0 +1,49 @@
+"""indexes for expiry sweeps and per-session lookups
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _is_postgres() -> bool:
+    return op.get_bind().dialect.name == 'postgresql'
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Build the indexes without blocking writes on large existing tables;
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction.
+    concurrently = _is_postgres()
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_sessions_expires_at', 'sessions', ['expires_at'],
+            postgresql_concurrently=concurrently
+        )
+        op.create_index(
+            'ix_attendance_session_id_roll_number', 'attendance', ['session_id', 'roll_number'],
+            postgresql_concurrently=concurrently
+        )
+        op.create_index(
+            'ix_attendance_created_at', 'attendance', ['created_at'],
+            postgresql_concurrently=concurrently
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_attendance_created_at', table_name='attendance')
+    op.drop_index('ix_attendance_session_id_roll_number', table_name='attendance')
+    op.drop_index('ix_sessions_expires_at', table_name='sessions')
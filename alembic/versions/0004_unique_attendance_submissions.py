@@ -0,0 +1,79 @@
+"""unique attendance per session and roll number, idempotency keys
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+import logging
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+DUPLICATES_TABLE = 'attendance_duplicates'
+_FIRST_IDS = "SELECT MIN(id) FROM attendance GROUP BY session_id, roll_number"
+
+
+def _is_postgres() -> bool:
+    return op.get_bind().dialect.name == 'postgresql'
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('attendance') as batch_op:
+        batch_op.add_column(sa.Column('idempotency_key', sa.String(length=64), nullable=True))
+
+    # Keep the first submission of each student per session; later copies
+    # are the retries the unique index is meant to stop. They are copied to
+    # attendance_duplicates first, so nothing is lost without a trace; drop
+    # that table once the copies have been reviewed.
+    op.execute(f"CREATE TABLE {DUPLICATES_TABLE} AS SELECT * FROM attendance WHERE id NOT IN ({_FIRST_IDS})")
+    if not context.is_offline_mode():
+        ids = [row[0] for row in op.get_bind().execute(sa.text(f"SELECT id FROM {DUPLICATES_TABLE} ORDER BY id"))]
+        if ids:
+            logger.warning(
+                f"Removing {len(ids)} duplicate attendance rows (copied to {DUPLICATES_TABLE}): "
+                f"{', '.join(str(id) for id in ids)}"
+            )
+    op.execute(f"DELETE FROM attendance WHERE id NOT IN ({_FIRST_IDS})")
+
+    concurrently = _is_postgres()
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'uq_attendance_session_id_roll_number', 'attendance', ['session_id', 'roll_number'],
+            unique=True, postgresql_concurrently=concurrently
+        )
+        op.create_index(
+            'ix_attendance_idempotency_key', 'attendance', ['idempotency_key'],
+            unique=True, postgresql_concurrently=concurrently
+        )
+        # Superseded by the unique index on the same columns
+        op.drop_index(
+            'ix_attendance_session_id_roll_number', table_name='attendance',
+            postgresql_concurrently=concurrently
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('ix_attendance_session_id_roll_number', 'attendance', ['session_id', 'roll_number'])
+    op.drop_index('ix_attendance_idempotency_key', table_name='attendance')
+    op.drop_index('uq_attendance_session_id_roll_number', table_name='attendance')
+    connection = op.get_bind()
+    if sa.inspect(connection).has_table(DUPLICATES_TABLE):
+        # Put the removed copies back, so the downgrade loses nothing either
+        columns = ', '.join(column['name'] for column in sa.inspect(connection).get_columns(DUPLICATES_TABLE))
+        op.execute(f"INSERT INTO attendance ({columns}) SELECT {columns} FROM {DUPLICATES_TABLE}")
+        op.drop_table(DUPLICATES_TABLE)
+    with op.batch_alter_table('attendance') as batch_op:
+        batch_op.drop_column('idempotency_key')
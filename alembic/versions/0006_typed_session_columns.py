@@ -0,0 +1,111 @@
+"""typed session columns instead of sessions.data
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+import json
+import secrets
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Keys of the old JSON blob that are already columns, or no longer needed
+_BUILTIN_KEYS = {'session_id', 'expiry_time', 'timestamp', 'rotating_token'}
+_TYPED_KEYS = ('course', 'faculty', 'geofence')
+
+sessions = sa.table(
+    'sessions',
+    sa.column('session_id', sa.String()),
+    sa.column('data', sa.Text()),
+    sa.column('expires_at', sa.DateTime()),
+    sa.column('course', sa.String()),
+    sa.column('faculty', sa.String()),
+    sa.column('geofence', sa.String()),
+    sa.column('token_secret', sa.String()),
+    sa.column('extras', sa.JSON())
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('sessions') as batch_op:
+        batch_op.add_column(sa.Column('course', sa.String(length=100), nullable=True))
+        batch_op.add_column(sa.Column('faculty', sa.String(length=100), nullable=True))
+        batch_op.add_column(sa.Column('geofence', sa.String(length=100), nullable=True))
+        batch_op.add_column(sa.Column('token_secret', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column(
+            'extras', sa.JSON().with_variant(postgresql.JSONB(), 'postgresql'), nullable=True
+        ))
+
+    connection = op.get_bind()
+    rows = connection.execute(
+        sa.select(sessions.c.session_id, sessions.c.data).where(sessions.c.data.is_not(None))
+    ).all()
+    for session_id, data in rows:
+        try:
+            values = json.loads(data)
+        except ValueError:
+            continue
+        if not isinstance(values, dict):
+            continue
+        update = {key: str(values[key])[:100] for key in _TYPED_KEYS if values.get(key)}
+        if values.get('rotating_token'):
+            # Lecture tokens used to be signed with one global key; give each
+            # lecture its own so its projector keeps issuing valid codes
+            update['token_secret'] = secrets.token_hex(32)
+        extras = {key: value for key, value in values.items() if key not in _BUILTIN_KEYS and key not in _TYPED_KEYS}
+        if extras:
+            update['extras'] = extras
+        if update:
+            connection.execute(
+                sessions.update().where(sessions.c.session_id == session_id).values(**update)
+            )
+
+    with op.batch_alter_table('sessions') as batch_op:
+        batch_op.drop_column('data')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('sessions') as batch_op:
+        batch_op.add_column(sa.Column('data', sa.Text(), nullable=True))
+
+    connection = op.get_bind()
+    rows = connection.execute(sa.select(
+        sessions.c.session_id,
+        sessions.c.expires_at,
+        sessions.c.course,
+        sessions.c.faculty,
+        sessions.c.geofence,
+        sessions.c.token_secret,
+        sessions.c.extras
+    )).all()
+    for row in rows:
+        values = dict(row.extras or {})
+        values.update({key: getattr(row, key) for key in _TYPED_KEYS if getattr(row, key)})
+        values['session_id'] = row.session_id
+        if row.expires_at is not None:
+            values['expiry_time'] = row.expires_at.isoformat()
+        if row.token_secret:
+            values['rotating_token'] = True
+        connection.execute(
+            sessions.update().where(sessions.c.session_id == row.session_id).values(data=json.dumps(values))
+        )
+
+    with op.batch_alter_table('sessions') as batch_op:
+        batch_op.drop_column('extras')
+        batch_op.drop_column('token_secret')
+        batch_op.drop_column('geofence')
+        batch_op.drop_column('faculty')
+        batch_op.drop_column('course')
@@ -0,0 +1,47 @@
+"""class roster and expected section on sessions
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'roster',
+        sa.Column('roll_number', sa.String(length=20), nullable=False),
+        sa.Column('full_name', sa.String(length=100), nullable=False),
+        sa.Column('branch', sa.String(length=50), nullable=False),
+        sa.Column('section', sa.String(length=10), nullable=False),
+        sa.Column('active', sa.Boolean(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('roll_number')
+    )
+    op.create_index(op.f('ix_roster_updated_at'), 'roster', ['updated_at'], unique=False)
+
+    with op.batch_alter_table('sessions') as batch_op:
+        batch_op.add_column(sa.Column('branch', sa.String(length=50), nullable=True))
+        batch_op.add_column(sa.Column('section', sa.String(length=10), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('sessions') as batch_op:
+        batch_op.drop_column('section')
+        batch_op.drop_column('branch')
+
+    op.drop_index(op.f('ix_roster_updated_at'), table_name='roster')
+    op.drop_table('roster')
@@ -1,4 +1,152 @@
+import os
+
+
+def _env_bool(name: str, default: str = "false") -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes", "on")
+
+
 class Settings:
     PROJECT_NAME: str = "Attendance System API"
-    
-settings = Settings()
\ No newline at end of file
+
+    # Database engine; each gunicorn worker gets its own pool
+    DB_ECHO: bool = _env_bool("DB_ECHO")
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING: bool = _env_bool("DB_POOL_PRE_PING", "true")
+    DB_STATEMENT_TIMEOUT_MS: int = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "15000"))
+    # 0 means read max_connections from the server at startup
+    DB_MAX_CONNECTIONS: int = int(os.getenv("DB_MAX_CONNECTIONS", "0"))
+    # Connections kept free for migrations, psql sessions and superusers
+    DB_RESERVED_CONNECTIONS: int = int(os.getenv("DB_RESERVED_CONNECTIONS", "5"))
+    WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY", "4"))
+
+    # Selfie blob storage ("local" or "s3")
+    BLOB_STORAGE_BACKEND: str = os.getenv("BLOB_STORAGE_BACKEND", "local")
+    BLOB_STORAGE_PATH: str = os.getenv("BLOB_STORAGE_PATH", "./data/blobs")
+    S3_BUCKET: str = os.getenv("S3_BUCKET", "")
+    S3_PREFIX: str = os.getenv("S3_PREFIX", "selfies/")
+    S3_ENDPOINT_URL: str = os.getenv("S3_ENDPOINT_URL", "")
+    S3_REGION: str = os.getenv("S3_REGION", "us-east-1")
+
+    # Largest selfie accepted by either submit endpoint
+    SELFIE_MAX_BYTES: int = int(os.getenv("SELFIE_MAX_BYTES", str(2 * 1024 * 1024)))
+    SELFIE_UPLOAD_CHUNK_BYTES: int = int(os.getenv("SELFIE_UPLOAD_CHUNK_BYTES", str(64 * 1024)))
+
+    # Request bodies are cut off with 413 past these sizes; the submit
+    # endpoints allow one selfie plus REQUEST_FIELDS_MAX_BYTES for the rest
+    REQUEST_MAX_BYTES: int = int(os.getenv("REQUEST_MAX_BYTES", str(1024 * 1024)))
+    REQUEST_FIELDS_MAX_BYTES: int = int(os.getenv("REQUEST_FIELDS_MAX_BYTES", str(16 * 1024)))
+
+    # In-process cache of session expiry for the submit hot path
+    SESSION_CACHE_MAX_ENTRIES: int = int(os.getenv("SESSION_CACHE_MAX_ENTRIES", "1024"))
+    SESSION_CACHE_TTL_SECONDS: float = float(os.getenv("SESSION_CACHE_TTL_SECONDS", "60"))
+
+    # Write-behind batching of attendance inserts
+    ATTENDANCE_WRITE_BEHIND: bool = _env_bool("ATTENDANCE_WRITE_BEHIND")
+    ATTENDANCE_QUEUE_MAX_SIZE: int = int(os.getenv("ATTENDANCE_QUEUE_MAX_SIZE", "5000"))
+    ATTENDANCE_BATCH_SIZE: int = int(os.getenv("ATTENDANCE_BATCH_SIZE", "200"))
+    ATTENDANCE_FLUSH_INTERVAL_SECONDS: float = float(os.getenv("ATTENDANCE_FLUSH_INTERVAL_SECONDS", "0.5"))
+    ATTENDANCE_ENQUEUE_TIMEOUT_SECONDS: float = float(os.getenv("ATTENDANCE_ENQUEUE_TIMEOUT_SECONDS", "1.0"))
+    ATTENDANCE_DEAD_LETTER_PATH: str = os.getenv("ATTENDANCE_DEAD_LETTER_PATH", "./data/attendance_dead_letter.jsonl")
+
+    # Background sweep of expired sessions
+    SESSION_REAPER_ENABLED: bool = _env_bool("SESSION_REAPER_ENABLED", "true")
+    SESSION_REAPER_INTERVAL_SECONDS: float = float(os.getenv("SESSION_REAPER_INTERVAL_SECONDS", "300"))
+    SESSION_REAPER_BATCH_SIZE: int = int(os.getenv("SESSION_REAPER_BATCH_SIZE", "500"))
+    SESSION_REAPER_MAX_BATCHES: int = int(os.getenv("SESSION_REAPER_MAX_BATCHES", "20"))
+    # Never shorter than BULK_SYNC_MAX_DELAY_SECONDS, so offline uploads find their session
+    SESSION_REAPER_GRACE_SECONDS: float = float(os.getenv("SESSION_REAPER_GRACE_SECONDS", "86400"))
+
+    # QR rendering: "thread" or "process" pool, and rendered-image LRU size
+    QR_RENDER_EXECUTOR: str = os.getenv("QR_RENDER_EXECUTOR", "thread")
+    QR_RENDER_WORKERS: int = int(os.getenv("QR_RENDER_WORKERS", "2"))
+    QR_IMAGE_CACHE_MAX_ENTRIES: int = int(os.getenv("QR_IMAGE_CACHE_MAX_ENTRIES", "256"))
+
+    # Rotating HMAC-signed QR tokens for lecture sessions (signed with Session.token_secret)
+    QR_TOKEN_ROTATE_SECONDS: int = int(os.getenv("QR_TOKEN_ROTATE_SECONDS", "10"))
+    QR_TOKEN_SKEW_WINDOWS: int = int(os.getenv("QR_TOKEN_SKEW_WINDOWS", "1"))
+    LECTURE_DEFAULT_MINUTES: int = int(os.getenv("LECTURE_DEFAULT_MINUTES", "60"))
+
+    # IP reputation (VPN/proxy) lookups
+    IP_REPUTATION_URL: str = os.getenv("IP_REPUTATION_URL", "https://ipapi.co")
+    IP_REPUTATION_TIMEOUT_SECONDS: float = float(os.getenv("IP_REPUTATION_TIMEOUT_SECONDS", "1.5"))
+    IP_REPUTATION_CACHE_TTL_SECONDS: float = float(os.getenv("IP_REPUTATION_CACHE_TTL_SECONDS", "3600"))
+    IP_REPUTATION_CACHE_MAX_ENTRIES: int = int(os.getenv("IP_REPUTATION_CACHE_MAX_ENTRIES", "10000"))
+    IP_REPUTATION_BREAKER_FAILURES: int = int(os.getenv("IP_REPUTATION_BREAKER_FAILURES", "5"))
+    IP_REPUTATION_BREAKER_RESET_SECONDS: float = float(os.getenv("IP_REPUTATION_BREAKER_RESET_SECONDS", "30"))
+
+    # Offline datacenter/VPN/Tor CIDR lists: <dir>/<category>.txt
+    IP_RANGES_DIR: str = os.getenv("IP_RANGES_DIR", "./data/ip_ranges")
+    IP_RANGES_RELOAD_SECONDS: float = float(os.getenv("IP_RANGES_RELOAD_SECONDS", "60"))
+
+    # Named campus/building/room geofences (JSON); falls back to the CAMPUS_* circle
+    GEOFENCES_FILE: str = os.getenv("GEOFENCES_FILE", "")
+    GEOFENCE_CELL_DEGREES: float = float(os.getenv("GEOFENCE_CELL_DEGREES", "0.01"))
+    # Most points accepted by POST /api/validation/location/batch
+    LOCATION_BATCH_MAX_POINTS: int = int(os.getenv("LOCATION_BATCH_MAX_POINTS", "100000"))
+
+    # Pre-submit checks on attendance submissions: user agent, IP ranges/reputation,
+    # and the geofence when the client sends its coordinates
+    ATTENDANCE_PRESUBMIT_CHECKS: bool = _env_bool("ATTENDANCE_PRESUBMIT_CHECKS", "true")
+
+    # Attendance export; EXPORT_API_KEY must be sent as X-API-Key, and the export
+    # is disabled while it is empty
+    EXPORT_API_KEY: str = os.getenv("EXPORT_API_KEY", "")
+    EXPORT_CHUNK_ROWS: int = int(os.getenv("EXPORT_CHUNK_ROWS", "1000"))
+
+    # Live attendance counter (SSE); fanned out across workers with LISTEN/NOTIFY on Postgres
+    LIVE_RECENT_ARRIVALS: int = int(os.getenv("LIVE_RECENT_ARRIVALS", "10"))
+    LIVE_VIEWER_QUEUE_SIZE: int = int(os.getenv("LIVE_VIEWER_QUEUE_SIZE", "100"))
+    LIVE_HEARTBEAT_SECONDS: float = float(os.getenv("LIVE_HEARTBEAT_SECONDS", "15"))
+    LIVE_NOTIFY_CHANNEL: str = os.getenv("LIVE_NOTIFY_CHANNEL", "attendance_events")
+
+    # Background recompression of stored selfies, plus review thumbnails
+    SELFIE_PROCESSING: bool = _env_bool("SELFIE_PROCESSING", "true")
+    SELFIE_PROCESS_WORKERS: int = int(os.getenv("SELFIE_PROCESS_WORKERS", "2"))
+    SELFIE_PROCESS_QUEUE_SIZE: int = int(os.getenv("SELFIE_PROCESS_QUEUE_SIZE", "1000"))
+    SELFIE_MAX_DIMENSION: int = int(os.getenv("SELFIE_MAX_DIMENSION", "640"))
+    SELFIE_THUMBNAIL_DIMENSION: int = int(os.getenv("SELFIE_THUMBNAIL_DIMENSION", "160"))
+    # "webp" or "jpeg"
+    SELFIE_IMAGE_FORMAT: str = os.getenv("SELFIE_IMAGE_FORMAT", "webp")
+    SELFIE_QUALITY: int = int(os.getenv("SELFIE_QUALITY", "70"))
+    SELFIE_DELETE_ORIGINAL: bool = _env_bool("SELFIE_DELETE_ORIGINAL", "true")
+    # Originals are deleted this long after processing, if no row uses them by then;
+    # keep it above the longest a submission can take to reach the table
+    SELFIE_DELETE_DELAY_SECONDS: float = float(os.getenv("SELFIE_DELETE_DELAY_SECONDS", "300"))
+
+    # Offline sync (POST /api/attendance/submit/bulk): rows per upload and per load,
+    # and how late and how far ahead (device clock) a captured_at may be
+    BULK_SYNC_MAX_BYTES: int = int(os.getenv("BULK_SYNC_MAX_BYTES", str(64 * 1024 * 1024)))
+    BULK_SYNC_MAX_ROWS: int = int(os.getenv("BULK_SYNC_MAX_ROWS", "5000"))
+    BULK_SYNC_BATCH_ROWS: int = int(os.getenv("BULK_SYNC_BATCH_ROWS", "500"))
+    BULK_SYNC_MAX_DELAY_SECONDS: float = float(os.getenv("BULK_SYNC_MAX_DELAY_SECONDS", "86400"))
+    BULK_SYNC_CLOCK_SKEW_SECONDS: float = float(os.getenv("BULK_SYNC_CLOCK_SKEW_SECONDS", "120"))
+
+    # Class roster: submissions must match a roster entry and the session's expected
+    # branch/section (checks are skipped while the roster is empty). Workers poll for
+    # roster changes every ROSTER_REFRESH_SECONDS; imports need ROSTER_API_KEY as X-API-Key
+    # and are disabled while it is empty
+    ROSTER_CHECKS: bool = _env_bool("ROSTER_CHECKS", "true")
+    ROSTER_REFRESH_SECONDS: float = float(os.getenv("ROSTER_REFRESH_SECONDS", "30"))
+    ROSTER_API_KEY: str = os.getenv("ROSTER_API_KEY", "")
+
+    # Proxies in front of the app that append to X-Forwarded-For (1 on Render); the
+    # client IP is read from that header instead of the socket when this is above 0
+    TRUSTED_PROXY_HOPS: int = int(os.getenv("TRUSTED_PROXY_HOPS", "0"))
+
+    # Token-bucket rate limits as "<requests>/<seconds>"; an empty value turns a rule off.
+    # "memory" keeps buckets per worker, "redis" shares them across workers and hosts
+    RATE_LIMIT_ENABLED: bool = _env_bool("RATE_LIMIT_ENABLED", "true")
+    RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "memory")
+    RATE_LIMIT_REDIS_URL: str = os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+    RATE_LIMIT_MAX_BUCKETS: int = int(os.getenv("RATE_LIMIT_MAX_BUCKETS", "100000"))
+    # Every route, per client IP; generous because a classroom may share one NAT address
+    RATE_LIMIT_PER_IP: str = os.getenv("RATE_LIMIT_PER_IP", "600/60")
+    # Creating QR sessions, per client IP
+    RATE_LIMIT_QR_CREATE: str = os.getenv("RATE_LIMIT_QR_CREATE", "20/60")
+    # Rotating lecture QR images, per session
+    RATE_LIMIT_PER_SESSION: str = os.getenv("RATE_LIMIT_PER_SESSION", "60/60")
+
+settings = Settings()
@@ -1,8 +1,78 @@
-from fastapi import FastAPI
+import math
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 import app.routers.qr as qr
 import app.routers.attendance as attendance
-app = FastAPI()
+import app.routers.validation as validation
+import app.routers.roster as roster
+from app.services.database import engine, verify_pool_budget
+from app.services.metrics import MetricsMiddleware, render_metrics
+from app.services.request_limits import BodySizeLimitMiddleware
+from app.services.rate_limit import RateLimitMiddleware, default_rules, get_rate_limit_buckets
+from app.core.config import settings
+from app.utils.selfie import base64_length
+from prometheus_client import CONTENT_TYPE_LATEST
+from app.services.attendance_writer import start_attendance_writer, stop_attendance_writer
+from app.services.session_reaper import start_session_reaper, stop_session_reaper
+from app.services.qr_generator import shutdown_render_executor
+from app.services.ip_reputation import close_ip_reputation_client
+from app.services.ip_ranges import load_ip_ranges
+from app.services.live_attendance import start_live_attendance, stop_live_attendance
+from app.services.selfie_processing import start_selfie_processor, stop_selfie_processor
+from app.services.roster import start_roster_refresher, stop_roster_refresher
+
+rate_limit_buckets = get_rate_limit_buckets() if settings.RATE_LIMIT_ENABLED else None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await verify_pool_budget()
+    await load_ip_ranges()
+    await start_attendance_writer()
+    await start_session_reaper()
+    await start_live_attendance()
+    await start_selfie_processor()
+    await start_roster_refresher()
+    yield
+    await stop_roster_refresher()
+    # Flush queued attendance first: its flush callbacks feed the selfie
+    # processor and the live counter, which must still be running
+    await stop_attendance_writer()
+    await stop_selfie_processor()
+    await stop_live_attendance()
+    await stop_session_reaper()
+    shutdown_render_executor()
+    await close_ip_reputation_client()
+    if rate_limit_buckets is not None:
+        await rate_limit_buckets.close()
+
+app = FastAPI(lifespan=lifespan)
+
+# Innermost, so a 413 still carries CORS headers
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    default_limit=settings.REQUEST_MAX_BYTES,
+    limits={
+        "/api/attendance/submit": base64_length(settings.SELFIE_MAX_BYTES) + settings.REQUEST_FIELDS_MAX_BYTES,
+        "/api/attendance/submit/multipart": settings.SELFIE_MAX_BYTES + settings.REQUEST_FIELDS_MAX_BYTES,
+        "/api/attendance/submit/bulk": settings.BULK_SYNC_MAX_BYTES,
+        # Two coordinate lists; a JSON float plus separator is at most 26 bytes
+        "/api/validation/location/batch": 2 * 26 * settings.LOCATION_BATCH_MAX_POINTS + settings.REQUEST_FIELDS_MAX_BYTES
+    }
+)
+
+# Rejects over-limit clients before the body is read; inside CORS so a 429 is readable
+if rate_limit_buckets is not None:
+    app.add_middleware(
+        RateLimitMiddleware,
+        buckets=rate_limit_buckets,
+        rules=default_rules(),
+        exempt_paths=["/", "/metrics"],
+        trusted_hops=settings.TRUSTED_PROXY_HOPS
+    )
 
 # Update CORS settings with specific origins
 app.add_middleware(
@@ -16,17 +86,38 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "OPTIONS"],
     allow_headers=["*"],
-    expose_headers=["session-id", "expiry-time", "content-type"]
+    expose_headers=["session-id", "expiry-time", "content-type", "retry-after"]
 )
 
-# Include both routers
+# Outermost, so the latency includes CORS handling; samples the DB pool per request
+app.add_middleware(MetricsMiddleware, pool=engine.sync_engine.pool)
+
+# Include the routers
 app.include_router(qr.router)
 app.include_router(attendance.router)
+app.include_router(validation.router, prefix="/api/validation")
+app.include_router(roster.router)
+
+@app.exception_handler(RequestValidationError)
+async def validation_exception_handler(request: Request, exc: RequestValidationError):
+    """FastAPI's 422, except that NaN/Infinity inputs are echoed as strings so the body stays valid JSON"""
+    errors = []
+    for error in exc.errors():
+        value = error.get("input")
+        if isinstance(value, float) and not math.isfinite(value):
+            error = {**error, "input": str(value)}
+        errors.append(error)
+    return JSONResponse(status_code=422, content={"detail": jsonable_encoder(errors)})
 
 @app.get("/")
 async def root():
     return {"message": "QR Attendance System API"}
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus exposition, summed over all gunicorn workers"""
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
 
 
 
@@ -1,10 +1,12 @@
-from sqlalchemy import Column, String, DateTime, Text, Integer, Boolean, ForeignKey
-from sqlalchemy.ext.declarative import declarative_base
-
-Base = declarative_base()
+from sqlalchemy import Column, String, DateTime, Text, Integer, Boolean, ForeignKey, Index
+from app.models.base import Base
 
 class Attendance(Base):
     __tablename__ = "attendance"
+    __table_args__ = (
+        # One row per student per session; inserts use ON CONFLICT DO NOTHING
+        Index("uq_attendance_session_id_roll_number", "session_id", "roll_number", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     session_id = Column(String, ForeignKey('sessions.session_id', ondelete='CASCADE'))
@@ -15,9 +17,17 @@ class Attendance(Base):
     section = Column(String(10), nullable=False)
     roll_number = Column(String(20), nullable=False)
     device_info = Column(String(500))
-    # Stores base64 encoded image data from webcam
-    selfie_data = Column(Text, nullable=False)
-    created_at = Column(DateTime(timezone=True), nullable=False)
+    # Legacy inline base64 selfie; new rows store the image in the blob store
+    selfie_data = Column(Text, nullable=True)
+    # SHA-256 key of the selfie in the blob store
+    selfie_key = Column(String(64))
+    selfie_size = Column(Integer)
+    selfie_mime_type = Column(String(50))
+    # Set once the selfie has been recompressed; also marks the row as processed
+    selfie_thumbnail_key = Column(String(64))
+    # Client-supplied Idempotency-Key header, so retried submissions are not stored twice
+    idempotency_key = Column(String(64), unique=True, index=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, index=True)
     verified = Column(Boolean, default=False)
     verification_time = Column(DateTime(timezone=True))
     verified_by = Column(String(100))
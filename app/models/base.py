@@ -0,0 +1,4 @@
+from sqlalchemy.orm import declarative_base
+
+# Shared by every model so create_all and Alembic autogenerate see one schema
+Base = declarative_base()
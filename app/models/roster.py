@@ -0,0 +1,19 @@
+from sqlalchemy import Column, String, DateTime, Boolean
+from app.models.base import Base
+
+class RosterEntry(Base):
+    __tablename__ = "roster"
+
+    # Stored normalized (trimmed, upper case), the same form the roster index uses
+    roll_number = Column(String(20), primary_key=True)
+    full_name = Column(String(100), nullable=False)
+    branch = Column(String(50), nullable=False)
+    section = Column(String(10), nullable=False)
+    # Students who leave are deactivated rather than deleted, so the change is
+    # picked up by the incremental refresh like any other
+    active = Column(Boolean, nullable=False, default=True)
+    # Bumped on every import; workers refresh their roster index from it
+    updated_at = Column(DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<RosterEntry(roll_number={self.roll_number}, section={self.section})>"
@@ -1,12 +1,21 @@
-from sqlalchemy import Column, String, DateTime, Text
-from sqlalchemy.ext.declarative import declarative_base
-
-Base = declarative_base()
+from sqlalchemy import Column, String, DateTime, JSON
+from sqlalchemy.dialects.postgresql import JSONB
+from app.models.base import Base
 
 class Session(Base):
     __tablename__ = "sessions"
 
     session_id = Column(String, primary_key=True)
-    data = Column(Text)
     created_at = Column(DateTime)
-    expires_at = Column(DateTime)
+    expires_at = Column(DateTime, index=True)
+    course = Column(String(100))
+    faculty = Column(String(100))
+    # Expected class; when set, submissions are checked against the roster
+    branch = Column(String(50))
+    section = Column(String(10))
+    # Name of the geofence the session is held in
+    geofence = Column(String(100))
+    # Hex HMAC key for rotating QR tokens; set only for lecture sessions
+    token_secret = Column(String(64))
+    # Free-form extras; nothing on the request path reads them
+    extras = Column(JSON().with_variant(JSONB(), "postgresql"))
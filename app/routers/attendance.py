@@ -1,18 +1,32 @@
+import hmac
 import logging
-import base64
-from fastapi import APIRouter, HTTPException, Depends
-from pydantic import BaseModel, EmailStr, validator
+import re
+from typing import AsyncIterator, Optional
+from fastapi import APIRouter, HTTPException, Depends, Form, File, Header, Query, Request, UploadFile
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, EmailStr, Field, ValidationError, validator
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from app.services.database import get_db
-from app.models.attendance import Attendance
-from app.models.session import Session
-from datetime import datetime
+from app.core.config import settings
+from app.services.database import AsyncSessionLocal, get_db
+from app.services.blob_storage import BlobRef, BlobStorage, BlobTooLarge, get_blob_storage
+from app.utils.asgi import get_client_ip
+from app.utils.selfie import base64_length, check_data_url, decode_data_url, sniff_image_mime_type
+from app.utils.qr_token import ExpiredToken, InvalidToken, verify_token
+from app.services.session_manager import CachedSession, SessionManager
+from app.services.attendance_writer import AttendanceWriter, AttendanceQueueFull, get_attendance_writer
+from app.services.attendance_store import attendance_exists, insert_attendance, insert_attendance_many
+from app.services.selfie_processing import submit_selfie
+from app.services.live_attendance import LiveAttendanceHub, event_stream, get_live_hub, publish_arrival
+from app.services.attendance_export import EXPORT_MEDIA_TYPES, EXPORT_WRITERS, export_query, stream_rows
+from app.services.presubmit import PreSubmitValidator, get_presubmit_validator
+from app.services.roster import RosterIndex, get_roster_index
+from app.services.request_limits import RequestTooLarge
+from datetime import datetime, timedelta, timezone
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-class AttendanceSubmission(BaseModel):
+class AttendanceDetails(BaseModel):
     session_id: str
     full_name: str
     phone_number: str
@@ -21,66 +35,479 @@ class AttendanceSubmission(BaseModel):
     section: str
     roll_number: str
     device_info: str
+    # Rotating QR token, required for lecture sessions
+    token: Optional[str] = None
+    # Device location; checked against the geofences when present
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
+
+class AttendanceSubmission(AttendanceDetails):
     selfie_data: str
 
     @validator('selfie_data')
     def validate_selfie_data(cls, v):
-        if not v.startswith('data:image'):
-            raise ValueError('Invalid image format. Must be a base64 encoded image.')
+        # Bounded check of the header, length and alphabet; the payload is
+        # decoded only once, when it is written to the blob store
+        check_data_url(v, settings.SELFIE_MAX_BYTES)
+        return v
+
+def attendance_form(
+    session_id: str = Form(...),
+    full_name: str = Form(...),
+    phone_number: str = Form(...),
+    email: EmailStr = Form(...),
+    branch: str = Form(...),
+    section: str = Form(...),
+    roll_number: str = Form(...),
+    device_info: str = Form(...),
+    token: Optional[str] = Form(None),
+    latitude: Optional[float] = Form(None),
+    longitude: Optional[float] = Form(None)
+) -> AttendanceDetails:
+    return AttendanceDetails(
+        session_id=session_id,
+        full_name=full_name,
+        phone_number=phone_number,
+        email=email,
+        branch=branch,
+        section=section,
+        roll_number=roll_number,
+        device_info=device_info,
+        token=token,
+        latitude=latitude,
+        longitude=longitude
+    )
+
+def _check_token(session: CachedSession, token: Optional[str], at: Optional[datetime] = None) -> None:
+    """
+    Verify a rotating QR token against the session's own key, in CPU only.
+    `at` (naive UTC) checks the token's window against that time instead of now.
+    """
+    if not token:
+        raise HTTPException(status_code=400, detail="Invalid QR token")
+    try:
+        token_session_id = verify_token(
+            session.token_secret,
+            token,
+            settings.QR_TOKEN_ROTATE_SECONDS,
+            settings.QR_TOKEN_SKEW_WINDOWS,
+            now=at.replace(tzinfo=timezone.utc).timestamp() if at else None
+        )
+    except ExpiredToken:
+        raise HTTPException(status_code=400, detail="QR code expired. Please scan the current code.")
+    except InvalidToken:
+        raise HTTPException(status_code=400, detail="Invalid QR token")
+    if token_session_id != session.session_id:
+        raise HTTPException(status_code=400, detail="Invalid QR token")
+
+async def _check_request(
+    request: Request,
+    details: AttendanceDetails,
+    presubmit: Optional[PreSubmitValidator]
+) -> None:
+    if presubmit is None:
+        return
+    is_valid, message = await presubmit.validate(
+        request.headers.get("user-agent"),
+        get_client_ip(request.scope, settings.TRUSTED_PROXY_HOPS),
+        details.latitude,
+        details.longitude
+    )
+    if not is_valid:
+        raise HTTPException(status_code=400, detail=message)
+
+async def _check_session(
+    db: AsyncSession,
+    session_id: str,
+    token: Optional[str] = None,
+    at: Optional[datetime] = None,
+    seen: Optional[dict] = None,
+    offline: bool = False
+) -> CachedSession:
+    """
+    Check the session was open, and the token current, at `at` (default
+    now). `seen` memoizes lookups across calls, for sessions that have
+    expired and so are not in the session cache. Offline submissions carry
+    a device-reported `at`, which cannot vouch for a rotating token, so
+    they are refused for lecture sessions.
+    """
+    if seen is not None and session_id in seen:
+        session = seen[session_id]
+    else:
+        # Served from the in-process session cache on most calls, otherwise one
+        # primary-key query; either way the checks below are plain comparisons
+        session = await SessionManager(db).lookup_session(session_id)
+        if seen is not None:
+            seen[session_id] = session
+
+    if not session:
+        raise HTTPException(status_code=400, detail="Invalid session")
+
+    if session.expires_at < (at or datetime.utcnow()):
+        raise HTTPException(status_code=400, detail="Session expired")
+
+    if session.requires_token:
+        if offline:
+            raise HTTPException(status_code=400, detail="Lecture sessions cannot be synced offline")
+        _check_token(session, token, at)
+    return session
+
+def _check_roster(details: AttendanceDetails, session: CachedSession, roster: Optional[RosterIndex]) -> None:
+    """One dict lookup against this worker's roster index; no query"""
+    if roster is None:
+        return
+    message = roster.check(details.roll_number, details.branch, details.section, session)
+    if message:
+        raise HTTPException(status_code=400, detail=message)
+
+RECORDED = {"message": "Attendance recorded successfully"}
+ALREADY_RECORDED = {"message": "Attendance already recorded", "already_recorded": True}
+
+def idempotency_key(
+    key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=64)
+) -> Optional[str]:
+    return key
+
+def _attendance_record(
+    details: AttendanceDetails,
+    selfie: BlobRef,
+    key: Optional[str],
+    created_at: datetime
+) -> dict:
+    return dict(
+        session_id=details.session_id,
+        full_name=details.full_name,
+        phone_number=details.phone_number,
+        email=details.email,
+        branch=details.branch,
+        section=details.section,
+        roll_number=details.roll_number,
+        device_info=details.device_info,
+        selfie_key=selfie.key,
+        selfie_size=selfie.size,
+        selfie_mime_type=selfie.mime_type,
+        idempotency_key=key,
+        created_at=created_at,
+        verified=False
+    )
+
+async def _record_attendance(
+    db: AsyncSession,
+    details: AttendanceDetails,
+    selfie: BlobRef,
+    writer: Optional[AttendanceWriter] = None,
+    key: Optional[str] = None
+) -> dict:
+    """
+    Store the row and return the response body. A retry with the same
+    Idempotency-Key, or a second submission by the same roll number, is
+    answered with ALREADY_RECORDED instead of storing a duplicate.
+    """
+    record = _attendance_record(details, selfie, key, datetime.utcnow())
+
+    if writer is not None:
+        # Write-behind mode: the background writer inserts it in a batch and
+        # publishes the arrival once it is stored. Students already in the
+        # table are answered here; the queue catches those still waiting.
+        if await attendance_exists(db, details.session_id, details.roll_number, key):
+            return ALREADY_RECORDED
         try:
-            # Extract the base64 part after the comma
-            base64_part = v.split(',')[1]
-            # Try to decode to verify it's valid base64
-            base64.b64decode(base64_part)
-            return v
-        except Exception as e:
-            raise ValueError('Invalid base64 image data')
+            recorded = await writer.enqueue(record)
+        except AttendanceQueueFull:
+            raise HTTPException(
+                status_code=503,
+                detail="Server is busy, please retry",
+                headers={"Retry-After": "2"}
+            )
+        return RECORDED if recorded else ALREADY_RECORDED
+
+    # INSERT ... ON CONFLICT DO NOTHING RETURNING id: one round trip either way
+    if not await insert_attendance(db, record):
+        return ALREADY_RECORDED
+    # Live counter on the projector screen
+    publish_arrival(record)
+    # Recompress and thumbnail in the background
+    submit_selfie(selfie.key)
+    return RECORDED
 
 @router.post("/api/attendance/submit")
 async def submit_attendance(
+    request: Request,
     submission: AttendanceSubmission,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    blob_storage: BlobStorage = Depends(get_blob_storage),
+    writer: Optional[AttendanceWriter] = Depends(get_attendance_writer),
+    presubmit: Optional[PreSubmitValidator] = Depends(get_presubmit_validator),
+    roster: Optional[RosterIndex] = Depends(get_roster_index),
+    key: Optional[str] = Depends(idempotency_key)
 ):
     try:
-        # Validate session
-        session_query = select(Session).where(Session.session_id == submission.session_id)
-        session_result = await db.execute(session_query)
-        session = session_result.scalar_one_or_none()
-
-        if not session:
-            raise HTTPException(status_code=400, detail="Invalid session")
-
-        if session.expires_at < datetime.utcnow():
-            raise HTTPException(status_code=400, detail="Session expired")
-
-        # Create attendance record
-        new_attendance = Attendance(
-            session_id=submission.session_id,
-            full_name=submission.full_name,
-            phone_number=submission.phone_number,
-            email=submission.email,
-            branch=submission.branch,
-            section=submission.section,
-            roll_number=submission.roll_number,
-            device_info=submission.device_info,
-            selfie_data=submission.selfie_data,  # This will be the base64 image string
-            created_at=datetime.utcnow(),
-            verified=False
-        )
-        
-        db.add(new_attendance)
-        await db.commit()
-        
-        return {"message": "Attendance recorded successfully"}
-        
+        await _check_request(request, submission, presubmit)
+        session = await _check_session(db, submission.session_id, submission.token)
+        _check_roster(submission, session, roster)
+
+        selfie = await _store_selfie(blob_storage, submission.selfie_data)
+        return await _record_attendance(db, submission, selfie, writer, key)
+
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        logger.error(f"Error submitting attendance: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to submit attendance")
+
+async def _store_selfie(blob_storage: BlobStorage, selfie_data: str) -> BlobRef:
+    try:
+        _, selfie_bytes = decode_data_url(selfie_data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Trust the bytes rather than the declared type; checked by the validator
+    mime_type = sniff_image_mime_type(selfie_bytes[:16])
+
+    # Store the image out of line; the row only keeps its key
+    return await blob_storage.put(selfie_bytes, mime_type)
+
+async def _read_upload(upload: UploadFile, first_chunk: bytes) -> AsyncIterator[bytes]:
+    yield first_chunk
+    while True:
+        chunk = await upload.read(settings.SELFIE_UPLOAD_CHUNK_BYTES)
+        if not chunk:
+            break
+        yield chunk
+
+@router.post("/api/attendance/submit/multipart")
+async def submit_attendance_multipart(
+    request: Request,
+    details: AttendanceDetails = Depends(attendance_form),
+    selfie: UploadFile = File(...),
+    db: AsyncSession = Depends(get_db),
+    blob_storage: BlobStorage = Depends(get_blob_storage),
+    writer: Optional[AttendanceWriter] = Depends(get_attendance_writer),
+    presubmit: Optional[PreSubmitValidator] = Depends(get_presubmit_validator),
+    roster: Optional[RosterIndex] = Depends(get_roster_index),
+    key: Optional[str] = Depends(idempotency_key)
+):
+    """
+    Same as /api/attendance/submit, but the selfie is sent as a binary
+    multipart file part and streamed to the blob store in chunks
+    """
+    try:
+        await _check_request(request, details, presubmit)
+        session = await _check_session(db, details.session_id, details.token)
+        _check_roster(details, session, roster)
+
+        first_chunk = await selfie.read(settings.SELFIE_UPLOAD_CHUNK_BYTES)
+        mime_type = sniff_image_mime_type(first_chunk[:16])
+        if not mime_type:
+            raise HTTPException(status_code=400, detail="Invalid image format. Must be a JPEG, PNG or WebP image.")
+
+        try:
+            selfie_ref = await blob_storage.put_stream(
+                _read_upload(selfie, first_chunk),
+                mime_type,
+                max_bytes=settings.SELFIE_MAX_BYTES
+            )
+        except BlobTooLarge:
+            raise HTTPException(status_code=413, detail="Selfie image is too large")
+
+        return await _record_attendance(db, details, selfie_ref, writer, key)
+
     except HTTPException as he:
         raise he
     except Exception as e:
         logger.error(f"Error submitting attendance: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to submit attendance")
+    finally:
+        await selfie.close()
 
+class BulkAttendanceSubmission(AttendanceSubmission):
+    # When the student submitted the form on their device
+    captured_at: datetime
+    # Same meaning as the Idempotency-Key header of the single submit
+    idempotency_key: Optional[str] = Field(None, max_length=64)
 
+    @validator('captured_at')
+    def captured_at_to_utc(cls, v):
+        # Stored and compared as naive UTC, like every other timestamp here
+        if v.tzinfo is not None:
+            v = v.astimezone(timezone.utc).replace(tzinfo=None)
+        return v
 
+async def _ndjson_lines(request: Request, max_line_bytes: int) -> AsyncIterator[bytes]:
+    """Non-empty lines of the request body, as they arrive"""
+    buffer = bytearray()
+    async for chunk in request.stream():
+        buffer += chunk
+        start = 0
+        while True:
+            end = buffer.find(b"\n", start)
+            if end < 0:
+                break
+            line = bytes(buffer[start:end]).strip()
+            start = end + 1
+            if line:
+                yield line
+        del buffer[:start]
+        if len(buffer) > max_line_bytes:
+            raise HTTPException(status_code=413, detail="Submission line too large")
+    line = bytes(buffer).strip()
+    if line:
+        yield line
 
+def _check_capture_time(captured_at: datetime) -> None:
+    now = datetime.utcnow()
+    if captured_at > now + timedelta(seconds=settings.BULK_SYNC_CLOCK_SKEW_SECONDS):
+        raise HTTPException(status_code=400, detail="Capture time is in the future")
+    if captured_at < now - timedelta(seconds=settings.BULK_SYNC_MAX_DELAY_SECONDS):
+        raise HTTPException(status_code=400, detail="Submission is too old to sync")
 
+async def _bulk_record(
+    request: Request,
+    line: bytes,
+    db: AsyncSession,
+    blob_storage: BlobStorage,
+    presubmit: Optional[PreSubmitValidator],
+    roster: Optional[RosterIndex],
+    sessions: dict
+) -> dict:
+    """Validate one queued submission and store its selfie; raises HTTPException to reject it"""
+    try:
+        item = BulkAttendanceSubmission.model_validate_json(line)
+    except ValidationError as e:
+        error = e.errors()[0]
+        location = ".".join(str(part) for part in error["loc"])
+        raise HTTPException(status_code=422, detail=f"{location}: {error['msg']}" if location else error["msg"])
 
+    await _check_request(request, item, presubmit)
+    _check_capture_time(item.captured_at)
+    # The session must have been open when the student filled in the form
+    session = await _check_session(db, item.session_id, at=item.captured_at, seen=sessions, offline=True)
+    _check_roster(item, session, roster)
+    selfie = await _store_selfie(blob_storage, item.selfie_data)
+    return _attendance_record(item, selfie, item.idempotency_key, item.captured_at)
+
+async def _flush_bulk(db: AsyncSession, pending: dict, results: list) -> None:
+    """Load the pending rows (line index -> record) and fill in their results"""
+    inserted = await insert_attendance_many(db, list(pending.values()))
+    for index, record in pending.items():
+        if (record["session_id"], record["roll_number"]) in inserted:
+            results[index] = {"line": index + 1, "status": "recorded"}
+            publish_arrival(record)
+            submit_selfie(record["selfie_key"])
+        else:
+            results[index] = {"line": index + 1, "status": "already_recorded"}
+    pending.clear()
+
+@router.post("/api/attendance/submit/bulk")
+async def submit_attendance_bulk(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    blob_storage: BlobStorage = Depends(get_blob_storage),
+    presubmit: Optional[PreSubmitValidator] = Depends(get_presubmit_validator),
+    roster: Optional[RosterIndex] = Depends(get_roster_index)
+):
+    """
+    Offline sync: an NDJSON body with one queued submission per line, each
+    with the `captured_at` time it was filled in. Every line is checked
+    against its session as of that time. Accepted rows are loaded in
+    batches of BULK_SYNC_BATCH_ROWS (with COPY on Postgres), and the
+    response reports each line as recorded, already_recorded or rejected.
+    """
+    results: list = []
+    # Line index -> record, waiting for the next batch load
+    pending: dict = {}
+    pending_keys: set = set()
+    sessions: dict = {}
+    max_line_bytes = base64_length(settings.SELFIE_MAX_BYTES) + settings.REQUEST_FIELDS_MAX_BYTES
+    try:
+        async for line in _ndjson_lines(request, max_line_bytes):
+            index = len(results)
+            results.append(None)
+            if index >= settings.BULK_SYNC_MAX_ROWS:
+                results[index] = {"line": index + 1, "status": "rejected", "detail": "Too many rows in one upload"}
+                continue
+            try:
+                record = await _bulk_record(request, line, db, blob_storage, presubmit, roster, sessions)
+            except HTTPException as he:
+                results[index] = {"line": index + 1, "status": "rejected", "detail": he.detail}
+                continue
+
+            key = (record["session_id"], record["roll_number"])
+            if key in pending_keys:
+                results[index] = {"line": index + 1, "status": "already_recorded"}
+                continue
+            pending_keys.add(key)
+            pending[index] = record
+            if len(pending) >= settings.BULK_SYNC_BATCH_ROWS:
+                await _flush_bulk(db, pending, results)
+        await _flush_bulk(db, pending, results)
+
+    except HTTPException as he:
+        raise he
+    except RequestTooLarge:
+        # Raised by the body size limit while streaming; it answers 413
+        raise
+    except Exception as e:
+        logger.error(f"Error in bulk attendance sync: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to sync attendance")
+
+    counts = {"recorded": 0, "already_recorded": 0, "rejected": 0}
+    for result in results:
+        counts[result["status"]] += 1
+    return {**counts, "results": results}
+
+def require_export_key(key: Optional[str] = Header(None, alias="X-API-Key")) -> None:
+    # The export and the live feed name students: closed until a key is configured
+    if not settings.EXPORT_API_KEY:
+        raise HTTPException(status_code=503, detail="Attendance export is not configured")
+    if not (key and hmac.compare_digest(key, settings.EXPORT_API_KEY)):
+        raise HTTPException(status_code=401, detail="Invalid API key")
+
+@router.get("/api/attendance/export")
+async def export_attendance(
+    export_format: str = Query("csv", alias="format", pattern="^(csv|xlsx)$"),
+    session_id: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    _: None = Depends(require_export_key)
+):
+    """
+    Stream the attendance of one session, or of a created_at range
+    [start, end), as CSV or XLSX. Rows come from a server-side cursor in
+    EXPORT_CHUNK_ROWS chunks, so memory use does not grow with the export.
+    """
+    if not session_id and not (start and end):
+        raise HTTPException(status_code=400, detail="Give a session_id or both start and end")
+
+    query = export_query(session_id, start, end)
+    body = EXPORT_WRITERS[export_format](
+        stream_rows(AsyncSessionLocal, query, settings.EXPORT_CHUNK_ROWS)
+    )
+    name = re.sub(r"[^A-Za-z0-9_-]", "_", session_id) if session_id else f"{start:%Y%m%d}-{end:%Y%m%d}"
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="attendance-{name}.{export_format}"'}
+    )
+
+@router.get("/api/attendance/live/{session_id}")
+async def live_attendance(
+    session_id: str,
+    request: Request,
+    hub: LiveAttendanceHub = Depends(get_live_hub),
+    _: None = Depends(require_export_key)
+):
+    """
+    Server-sent events for the projector screen: a "snapshot" event with
+    the count and recent arrivals, then an "arrival" event per student.
+    Arrivals carry names and roll numbers, so it needs the export key.
+    """
+    # A short-lived session: a request-scoped one would stay open for the whole stream
+    async with AsyncSessionLocal() as db:
+        session = await SessionManager(db).lookup_session(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return StreamingResponse(
+        event_stream(hub, session_id, request.is_disconnected, settings.LIVE_HEARTBEAT_SECONDS),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,70 +1,205 @@
-from fastapi import APIRouter, Request, Response, HTTPException, Depends
+from fastapi import APIRouter, Request, Response, HTTPException, Depends, Query
 from datetime import datetime, timedelta
 import uuid
 from urllib.parse import quote
 import logging
-from app.services.qr_generator import QRGenerator
+from app.services.qr_generator import QRGenerator, QR_MEDIA_TYPES
 from app.services.database import get_db
+from app.services.session_manager import CachedSession, SessionManager, session_cache
+from app.core.config import settings
+from app.utils.qr_token import current_window, issue_token, new_session_secret
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.session import Session
-import json
+from typing import Optional
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+ATTENDANCE_FORM_URL = "https://attendance-form-bb6b.vercel.app"
+
+def build_attendance_url(session_id: str, expiry_time: datetime, token: str = None) -> str:
+    """URL encoded in the QR code for a session"""
+    encoded_session_id = quote(session_id)
+    encoded_expiry = quote(expiry_time.isoformat())
+    url = f"{ATTENDANCE_FORM_URL}/attendance?sessionId={encoded_session_id}&expiryTime={encoded_expiry}"
+    if token:
+        url += f"&token={token}"
+    return url
+
+_issued_tokens: dict = {}
+
+def _lecture_token(secret: bytes, session_id: str, window: int) -> str:
+    """Issue at most one token per session and window in this worker"""
+    cached = _issued_tokens.get(session_id)
+    if cached and cached[0] == window:
+        return cached[1]
+    token = issue_token(secret, session_id, window)
+    if len(_issued_tokens) > settings.SESSION_CACHE_MAX_ENTRIES:
+        _issued_tokens.clear()
+    _issued_tokens[session_id] = (window, token)
+    return token
+
+def qr_response(qr_image, image_format: str, session_id: str, expiry_time: datetime) -> Response:
+    media_type = QR_MEDIA_TYPES[image_format]
+    headers = {
+        "Session-Id": session_id,
+        "Expiry-Time": expiry_time.isoformat(),
+        "Access-Control-Expose-Headers": "Session-Id, Expiry-Time",
+        "Access-Control-Allow-Origin": "*",
+        "Content-Type": media_type
+    }
+
+    return Response(
+        content=qr_image.getvalue(),
+        media_type=media_type,
+        headers=headers
+    )
+
 @router.get("/api/qr/generate")
 async def generate_qr(
     request: Request,
+    image_format: str = Query("png", alias="format", pattern="^(png|svg)$"),
+    course: Optional[str] = Query(None, max_length=100),
+    faculty: Optional[str] = Query(None, max_length=100),
+    geofence: Optional[str] = Query(None, max_length=100),
+    branch: Optional[str] = Query(None, max_length=50),
+    section: Optional[str] = Query(None, max_length=10),
     db_session: AsyncSession = Depends(get_db)
 ):
     try:
-        attendance_form_url = "https://attendance-form-bb6b.vercel.app"
-        
         # Generate session ID and expiry time
         # Increased to 3 minutes to give more buffer
         session_id = str(uuid.uuid4())
         expiry_time = datetime.utcnow() + timedelta(minutes=3)
-        
+
         # Create session record
         session = Session(
             session_id=session_id,
-            data=json.dumps({
-                "session_id": session_id,
-                "expiry_time": expiry_time.isoformat()
-            }),
             created_at=datetime.utcnow(),
-            expires_at=expiry_time
+            expires_at=expiry_time,
+            course=course,
+            faculty=faculty,
+            geofence=geofence,
+            branch=branch,
+            section=section
         )
-        
+
         # Store session in database
         db_session.add(session)
         await db_session.commit()
-        
-        # Generate QR code URL with encoded parameters
-        encoded_session_id = quote(session_id)
-        encoded_expiry = quote(expiry_time.isoformat())
-        attendance_url = f"{attendance_form_url}/attendance?sessionId={encoded_session_id}&expiryTime={encoded_expiry}"
-        
-        # Generate QR code
+
+        # Warm the cache so the burst of submissions for this QR skips the DB
+        session_cache.put(CachedSession.from_row(session))
+
+        # Generate QR code off the event loop
+        qr_generator = QRGenerator(db_session=db_session)
+        qr_image = await qr_generator.generate_qr_code(
+            build_attendance_url(session_id, expiry_time),
+            image_format
+        )
+
+        return qr_response(qr_image, image_format, session_id, expiry_time)
+    except Exception as e:
+        logger.error(f"Error generating QR code: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to generate QR code")
+
+@router.get("/api/qr/session/{session_id}/image")
+async def get_session_qr(
+    session_id: str,
+    image_format: str = Query("png", alias="format", pattern="^(png|svg)$"),
+    db_session: AsyncSession = Depends(get_db)
+):
+    """
+    QR image for an existing session, so projector refreshes re-use the
+    session and are served from the rendered-image cache
+    """
+    session = await SessionManager(db_session).lookup_session(session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    if session.expires_at < datetime.utcnow():
+        raise HTTPException(status_code=410, detail="Session expired")
+
+    try:
         qr_generator = QRGenerator(db_session=db_session)
-        qr_image = await qr_generator.generate_qr_code(attendance_url)
-
-        headers = {
-            "Session-Id": session_id,
-            "Expiry-Time": expiry_time.isoformat(),
-            "Access-Control-Expose-Headers": "Session-Id, Expiry-Time",
-            "Access-Control-Allow-Origin": "*",
-            "Content-Type": "image/png"
-        }
-        
-        return Response(
-            content=qr_image.getvalue(),
-            media_type="image/png",
-            headers=headers
+        qr_image = await qr_generator.generate_qr_code(
+            build_attendance_url(session.session_id, session.expires_at),
+            image_format
         )
+        response = qr_response(qr_image, image_format, session.session_id, session.expires_at)
+        # The image never changes, so browsers may keep it until the session expires
+        remaining = (session.expires_at - datetime.utcnow()).total_seconds()
+        response.headers["Cache-Control"] = f"max-age={max(0, int(remaining))}"
+        return response
     except Exception as e:
         logger.error(f"Error generating QR code: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to generate QR code")
 
+@router.post("/api/qr/lecture")
+async def create_lecture_session(
+    duration_minutes: int = Query(None, ge=1, le=600),
+    course: Optional[str] = Query(None, max_length=100),
+    faculty: Optional[str] = Query(None, max_length=100),
+    geofence: Optional[str] = Query(None, max_length=100),
+    branch: Optional[str] = Query(None, max_length=50),
+    section: Optional[str] = Query(None, max_length=10),
+    db_session: AsyncSession = Depends(get_db)
+):
+    """
+    Create one session for a whole lecture. Its QR code carries a signed
+    token that rotates every QR_TOKEN_ROTATE_SECONDS, so refreshing the
+    projector does not create new session rows. Tokens are signed with a
+    key generated for this session only.
+    """
+    session_id = str(uuid.uuid4())
+    expiry_time = datetime.utcnow() + timedelta(minutes=duration_minutes or settings.LECTURE_DEFAULT_MINUTES)
+
+    session = Session(
+        session_id=session_id,
+        created_at=datetime.utcnow(),
+        expires_at=expiry_time,
+        course=course,
+        faculty=faculty,
+        geofence=geofence,
+        branch=branch,
+        section=section,
+        token_secret=new_session_secret()
+    )
+    db_session.add(session)
+    await db_session.commit()
 
+    session_cache.put(CachedSession.from_row(session))
 
+    return {
+        "session_id": session_id,
+        "expiry_time": expiry_time.isoformat(),
+        "rotate_seconds": settings.QR_TOKEN_ROTATE_SECONDS
+    }
 
+@router.get("/api/qr/lecture/{session_id}")
+async def get_lecture_qr(
+    session_id: str,
+    image_format: str = Query("png", alias="format", pattern="^(png|svg)$"),
+    db_session: AsyncSession = Depends(get_db)
+):
+    """QR image with the current rotating token for a lecture session"""
+    session = await SessionManager(db_session).lookup_session(session_id)
+    if not session or not session.requires_token:
+        raise HTTPException(status_code=404, detail="Lecture session not found")
+    if session.expires_at < datetime.utcnow():
+        raise HTTPException(status_code=410, detail="Session expired")
+
+    try:
+        # One token per window, so refreshes within a window hit the image cache
+        window = current_window(settings.QR_TOKEN_ROTATE_SECONDS)
+        token = _lecture_token(session.token_secret, session_id, window)
+
+        qr_generator = QRGenerator(db_session=db_session)
+        qr_image = await qr_generator.generate_qr_code(
+            build_attendance_url(session_id, session.expires_at, token),
+            image_format
+        )
+        response = qr_response(qr_image, image_format, session_id, session.expires_at)
+        response.headers["Cache-Control"] = f"max-age={settings.QR_TOKEN_ROTATE_SECONDS}"
+        return response
+    except Exception as e:
+        logger.error(f"Error generating QR code: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to generate QR code")
@@ -0,0 +1,49 @@
+import codecs
+import hmac
+import logging
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Header, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.services.database import get_db
+from app.services.roster import RosterIndex, get_roster_index, import_roster, parse_roster_csv
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+def require_roster_key(key: Optional[str] = Header(None, alias="X-API-Key")) -> None:
+    # An import decides who may check in: closed until a key is configured
+    if not settings.ROSTER_API_KEY:
+        raise HTTPException(status_code=503, detail="Roster import is not configured")
+    if not (key and hmac.compare_digest(key, settings.ROSTER_API_KEY)):
+        raise HTTPException(status_code=401, detail="Invalid API key")
+
+@router.post("/api/roster/import")
+async def import_roster_csv(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    index: Optional[RosterIndex] = Depends(get_roster_index),
+    _: None = Depends(require_roster_key)
+):
+    """
+    Upsert roster rows from a CSV body (roll_number, full_name, branch,
+    section, optional active) in one transaction: nothing is written if
+    any line is invalid or the write fails.
+    This worker's roster index is refreshed at once; the others pick the
+    change up within ROSTER_REFRESH_SECONDS.
+    """
+    try:
+        body = codecs.decode(await request.body(), "utf-8-sig")
+        rows = list(parse_roster_csv(body.splitlines()))
+    except ValueError as e:
+        # Also covers bodies that are not UTF-8
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        written = await import_roster(db, rows)
+        if index is not None:
+            await index.refresh(db)
+        return {"imported": written, "students": len(index) if index is not None else None}
+    except Exception as e:
+        logger.error(f"Error importing roster: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to import roster")
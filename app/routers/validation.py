@@ -1,29 +1,27 @@
 from fastapi import APIRouter, HTTPException, Depends
-from pydantic import BaseModel
-from app.services.geolocation import GeolocationValidator
-from app.utils.security import SecurityValidator
-from typing import Dict
-import os
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, Field, IPvAnyAddress
+from app.core.config import settings
+from app.services.geolocation import GeolocationValidator, get_geolocation_validator
+from app.utils.security import SecurityValidator, get_security_validator
+from typing import Annotated, Dict, List
 
 router = APIRouter()
 
 class LocationCheck(BaseModel):
-    latitude: float
-    longitude: float
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
 
-class SecurityCheck(BaseModel):
-    ip_address: str
-    user_agent: str
+Latitude = Annotated[float, Field(ge=-90, le=90, allow_inf_nan=False)]
+Longitude = Annotated[float, Field(ge=-180, le=180, allow_inf_nan=False)]
 
-def get_geolocation_validator():
-    return GeolocationValidator(
-        campus_lat=float(os.getenv('CAMPUS_LATITUDE')),
-        campus_lng=float(os.getenv('CAMPUS_LONGITUDE')),
-        allowed_radius=float(os.getenv('ALLOWED_RADIUS_METERS'))
-    )
+class LocationBatch(BaseModel):
+    latitudes: List[Latitude] = Field(..., max_length=settings.LOCATION_BATCH_MAX_POINTS)
+    longitudes: List[Longitude] = Field(..., max_length=settings.LOCATION_BATCH_MAX_POINTS)
 
-def get_security_validator():
-    return SecurityValidator()
+class SecurityCheck(BaseModel):
+    ip_address: IPvAnyAddress
+    user_agent: str
 
 @router.post("/location")
 async def validate_location(
@@ -41,12 +39,36 @@ async def validate_location(
         "unit": "meters"
     }
 
+@router.post("/location/batch")
+async def validate_location_batch(
+    batch: LocationBatch,
+    geolocation_validator: GeolocationValidator = Depends(get_geolocation_validator)
+):
+    """
+    Validate many points in one vectorized pass. Returns parallel lists:
+    valid, distance in meters and the matched fence name (null on a miss).
+    """
+    if len(batch.latitudes) != len(batch.longitudes):
+        raise HTTPException(status_code=400, detail="latitudes and longitudes must have the same length")
+
+    valid, distance, fence_index = geolocation_validator.validate_batch(
+        batch.latitudes,
+        batch.longitudes
+    )
+    names = [fence.name for fence in geolocation_validator.geofences.fences]
+    return JSONResponse({
+        "valid": valid.tolist(),
+        "distance": distance.round(2).tolist(),
+        "fence": [names[i] if i >= 0 else None for i in fence_index.tolist()],
+        "unit": "meters"
+    })
+
 @router.post("/security")
 async def validate_security(
     security: SecurityCheck,
     security_validator: SecurityValidator = Depends(get_security_validator)
 ) -> Dict:
-    is_vpn = await security_validator.check_vpn(security.ip_address)
+    is_vpn = await security_validator.check_vpn(str(security.ip_address))
     is_valid_agent = security_validator.validate_user_agent(security.user_agent)
     
     if is_vpn:
@@ -71,7 +93,7 @@ async def check_location_before_submission(
     """
     Check if student's location is within campus bounds before allowing attendance submission
     """
-    is_valid, distance = await geolocation_validator.validate_location(
+    is_valid, distance, fence = await geolocation_validator.match_location(
         location.latitude,
         location.longitude
     )
@@ -80,13 +102,15 @@ async def check_location_before_submission(
         return {
             "valid": False,
             "message": f"You are {round(distance, 2)} meters away from campus. Please ensure you are within the campus premises.",
-            "distance": round(distance, 2)
+            "distance": round(distance, 2),
+            "fence": None
         }
     
     return {
         "valid": True,
         "message": "Location verified. You can proceed with attendance submission.",
-        "distance": round(distance, 2)
+        "distance": round(distance, 2),
+        "fence": fence
     }
 
 
@@ -0,0 +1,201 @@
+import csv
+import io
+import re
+import zipfile
+from datetime import datetime
+from typing import AsyncIterator, Callable, Iterable, List, Optional, Sequence
+from xml.sax.saxutils import escape
+from sqlalchemy import Select, select
+from app.models.attendance import Attendance
+
+# Everything an export needs; selfie_data (legacy inline images) is never selected
+EXPORT_COLUMNS = (
+    Attendance.id,
+    Attendance.session_id,
+    Attendance.roll_number,
+    Attendance.full_name,
+    Attendance.email,
+    Attendance.phone_number,
+    Attendance.branch,
+    Attendance.section,
+    Attendance.created_at,
+    Attendance.verified,
+    Attendance.verified_by,
+    Attendance.verification_time,
+    Attendance.selfie_key
+)
+EXPORT_HEADER = [column.key for column in EXPORT_COLUMNS]
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+}
+
+
+def export_query(
+    session_id: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> Select:
+    query = select(*EXPORT_COLUMNS)
+    if session_id:
+        query = query.where(Attendance.session_id == session_id)
+    if start:
+        query = query.where(Attendance.created_at >= start)
+    if end:
+        query = query.where(Attendance.created_at < end)
+    return query.order_by(Attendance.created_at, Attendance.id)
+
+
+async def stream_rows(
+    session_factory: Callable,
+    query: Select,
+    chunk_size: int = 1000
+) -> AsyncIterator[Sequence[Sequence]]:
+    """
+    Yield result rows in chunks from a server-side cursor, so only one
+    chunk is in memory at a time. Opens its own session because the
+    response body is produced after the request handler has returned.
+    """
+    async with session_factory() as db:
+        result = await db.stream(query.execution_options(yield_per=chunk_size))
+        async for rows in result.partitions():
+            yield rows
+
+
+def _cell_text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+# Leading characters that make a spreadsheet treat a CSV cell as a formula
+_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _csv_cell(value) -> str:
+    """Cell text, with a leading ' on strings a spreadsheet would run as a formula"""
+    text = _cell_text(value)
+    if isinstance(value, str) and text.startswith(_FORMULA_PREFIXES):
+        return "'" + text
+    return text
+
+
+async def iter_csv(chunks: AsyncIterator[Sequence[Sequence]]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_HEADER)
+    async for rows in chunks:
+        writer.writerows([_csv_cell(value) for value in row] for row in rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+class _ChunkSink:
+    """Write-only file for zipfile; the bytes written so far are taken with drain()"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+# Characters XML 1.0 does not allow, even escaped
+_INVALID_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+_XLSX_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Attendance" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    )
+}
+
+
+def _xlsx_cell(value) -> str:
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c><v>{value}</v></c>'
+    if value is None:
+        return '<c/>'
+    text = escape(_INVALID_XML.sub("", _cell_text(value)))
+    return f'<c t="inlineStr"><is><t>{text}</t></is></c>'
+
+
+def _xlsx_row(values: Iterable) -> str:
+    return "<row>" + "".join(_xlsx_cell(value) for value in values) + "</row>"
+
+
+async def iter_xlsx(chunks: AsyncIterator[Sequence[Sequence]]) -> AsyncIterator[bytes]:
+    """
+    Minimal single-sheet XLSX written straight into a streamed zip: rows use
+    inline strings, so no shared-string table has to be held in memory.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_PARTS.items():
+            archive.writestr(name, content)
+        yield sink.drain()
+
+        with archive.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                b'<sheetData>'
+            )
+            sheet.write(_xlsx_row(EXPORT_HEADER).encode("utf-8"))
+            async for rows in chunks:
+                sheet.write("".join(_xlsx_row(row) for row in rows).encode("utf-8"))
+                yield sink.drain()
+            sheet.write(b'</sheetData></worksheet>')
+    yield sink.drain()
+
+
+EXPORT_WRITERS = {
+    "csv": iter_csv,
+    "xlsx": iter_xlsx
+}
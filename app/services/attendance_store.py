@@ -0,0 +1,103 @@
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+from sqlalchemy import insert, or_, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.attendance import Attendance
+
+
+def insert_ignoring_duplicates(dialect_name: str):
+    """
+    INSERT INTO attendance ... ON CONFLICT DO NOTHING. Rows that repeat a
+    (session_id, roll_number) or an idempotency key are skipped by the
+    database instead of raising, so no SELECT is needed beforehand.
+    """
+    if dialect_name == "postgresql":
+        return postgresql.insert(Attendance).on_conflict_do_nothing()
+    if dialect_name == "sqlite":
+        return sqlite.insert(Attendance).on_conflict_do_nothing()
+    return insert(Attendance)
+
+
+async def insert_attendance(db: AsyncSession, record: Dict[str, Any]) -> bool:
+    """
+    Insert one attendance row in a single round trip.
+    Returns False if the student was already recorded for the session.
+    """
+    statement = insert_ignoring_duplicates(db.bind.dialect.name).values(**record).returning(Attendance.id)
+    inserted_id = (await db.execute(statement)).scalar_one_or_none()
+    await db.commit()
+    return inserted_id is not None
+
+
+async def attendance_exists(db: AsyncSession, session_id: str, roll_number: str, key: Optional[str] = None) -> bool:
+    """
+    Whether the student, or the Idempotency-Key, is already recorded. Both
+    lookups hit a unique index; write-behind mode asks before queueing so it
+    only acknowledges a submission as new when it is.
+    """
+    condition = (Attendance.session_id == session_id) & (Attendance.roll_number == roll_number)
+    if key is not None:
+        condition = or_(condition, Attendance.idempotency_key == key)
+    return (await db.execute(select(Attendance.id).where(condition).limit(1))).first() is not None
+
+
+# Columns a bulk load writes; every record passed to insert_attendance_many has these keys
+BULK_COLUMNS = (
+    "session_id",
+    "full_name",
+    "phone_number",
+    "email",
+    "branch",
+    "section",
+    "roll_number",
+    "device_info",
+    "selfie_key",
+    "selfie_size",
+    "selfie_mime_type",
+    "idempotency_key",
+    "created_at",
+    "verified"
+)
+
+
+async def insert_attendance_many(db: AsyncSession, records: Sequence[Dict[str, Any]]) -> Set[Tuple[str, str]]:
+    """
+    Insert a batch of attendance rows, skipping duplicates like
+    insert_attendance. Returns the (session_id, roll_number) pairs that were
+    actually inserted. On Postgres the rows are COPYed into a temporary
+    table and moved over with one INSERT ... SELECT ... ON CONFLICT DO
+    NOTHING, so a duplicate never aborts the batch.
+    """
+    if not records:
+        return set()
+    if db.bind.dialect.name == "postgresql":
+        inserted = await _copy_attendance(db, records)
+    else:
+        statement = insert_ignoring_duplicates(db.bind.dialect.name).returning(
+            Attendance.session_id, Attendance.roll_number
+        )
+        inserted = (await db.execute(statement, list(records))).all()
+    await db.commit()
+    return {(session_id, roll_number) for session_id, roll_number in inserted}
+
+
+async def _copy_attendance(db: AsyncSession, records: Sequence[Dict[str, Any]]) -> List[Tuple[str, str]]:
+    columns = ", ".join(BULK_COLUMNS)
+    # Same column types as attendance, no constraints; dropped with the transaction
+    await db.execute(text(
+        f"CREATE TEMPORARY TABLE attendance_staging ON COMMIT DROP AS "
+        f"SELECT {columns} FROM attendance WITH NO DATA"
+    ))
+    # The asyncpg connection behind the session, inside the same transaction
+    connection = await db.connection()
+    raw_connection = await connection.get_raw_connection()
+    await raw_connection.driver_connection.copy_records_to_table(
+        "attendance_staging",
+        records=[tuple(record[column] for column in BULK_COLUMNS) for record in records],
+        columns=list(BULK_COLUMNS)
+    )
+    result = await db.execute(text(
+        f"INSERT INTO attendance ({columns}) SELECT {columns} FROM attendance_staging "
+        f"ON CONFLICT DO NOTHING RETURNING session_id, roll_number"
+    ))
+    return result.all()
@@ -0,0 +1,235 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, NamedTuple, Optional, Set, Tuple
+from app.core.config import settings
+from app.models.attendance import Attendance
+from app.services.attendance_store import insert_ignoring_duplicates
+
+logger = logging.getLogger(__name__)
+
+
+class AttendanceQueueFull(Exception):
+    pass
+
+
+class FailedRecord(NamedTuple):
+    record: Dict[str, Any]
+    error: str
+    failed_at: datetime
+
+
+class AttendanceWriter:
+    """
+    Write-behind pipeline for attendance rows. Submissions are put on a
+    bounded queue and a background task inserts them in batches with one
+    multi-row INSERT, flushing when batch_size records are waiting or
+    flush_interval seconds have passed.
+
+    If a batch fails, its records are retried one by one; records that still
+    fail are kept in `failures` and appended to the dead-letter file, so an
+    accepted submission is never dropped silently. Rows that are already in
+    the table are skipped by ON CONFLICT DO NOTHING and counted as duplicates.
+
+    on_flushed is called with each record the batch actually inserted, once
+    it has committed, so work that needs the row (the live counter, selfie
+    processing) never runs for a record that failed or was a duplicate.
+    `flushed` counts inserted rows only.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable,
+        max_queue_size: int = 5000,
+        batch_size: int = 200,
+        flush_interval: float = 0.5,
+        enqueue_timeout: float = 1.0,
+        dead_letter_path: Optional[str] = None,
+        dialect_name: str = "default",
+        on_flushed: Optional[Callable[[Dict[str, Any]], None]] = None
+    ):
+        self.session_factory = session_factory
+        self.dialect_name = dialect_name
+        self.on_flushed = on_flushed
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.dead_letter_path = dead_letter_path
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self.failures: Deque[FailedRecord] = deque(maxlen=1000)
+        self.flushed = 0
+        self.failed = 0
+        self.duplicates = 0
+        self.batches = 0
+        # (session_id, roll_number) of records queued but not yet flushed
+        self._pending: Set[Tuple[str, str]] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._closing = False
+            self._task = asyncio.create_task(self._run())
+
+    async def enqueue(self, record: Dict[str, Any]) -> bool:
+        """
+        Queue a record for insertion. Waits up to enqueue_timeout for room
+        when the queue is full, then raises AttendanceQueueFull.
+        Returns False if the same student is already queued for the session.
+        """
+        if self._closing:
+            raise AttendanceQueueFull("Attendance writer is shutting down")
+        key = (record["session_id"], record["roll_number"])
+        if key in self._pending:
+            return False
+        # Claimed before waiting, so a concurrent duplicate sees it
+        self._pending.add(key)
+        try:
+            await asyncio.wait_for(self.queue.put(record), timeout=self.enqueue_timeout)
+        except asyncio.TimeoutError:
+            self._pending.discard(key)
+            raise AttendanceQueueFull("Attendance queue is full")
+        except BaseException:
+            # The request was cancelled while waiting for room
+            self._pending.discard(key)
+            raise
+        return True
+
+    async def stop(self) -> None:
+        """Stop accepting records and flush everything already queued"""
+        self._closing = True
+        if self._task is not None:
+            await self.queue.join()
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self.queue.qsize(),
+            "flushed": self.flushed,
+            "failed": self.failed,
+            "duplicates": self.duplicates,
+            "batches": self.batches
+        }
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self.queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout=timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                await self._flush(batch)
+            except Exception as e:
+                logger.error(f"Unexpected error flushing attendance batch: {str(e)}", exc_info=True)
+                self._record_failures(batch, str(e))
+            finally:
+                for record in batch:
+                    self._pending.discard((record["session_id"], record["roll_number"]))
+                    self.queue.task_done()
+
+    async def _flush(self, batch: List[Dict[str, Any]]) -> None:
+        try:
+            statement = insert_ignoring_duplicates(self.dialect_name).values(batch).returning(
+                Attendance.session_id, Attendance.roll_number
+            )
+            async with self.session_factory() as db:
+                inserted = {tuple(row) for row in (await db.execute(statement)).all()}
+                await db.commit()
+            self.duplicates += len(batch) - len(inserted)
+            self.flushed += len(inserted)
+            self.batches += 1
+        except Exception as e:
+            if len(batch) == 1:
+                logger.error(f"Failed to insert attendance record: {str(e)}")
+                self._record_failures(batch, str(e))
+                return
+            logger.warning(f"Batch insert of {len(batch)} records failed, retrying individually: {str(e)}")
+            for record in batch:
+                await self._flush([record])
+            return
+
+        if self.on_flushed is not None:
+            for record in batch:
+                if (record["session_id"], record["roll_number"]) not in inserted:
+                    # Skipped by ON CONFLICT DO NOTHING: already stored and announced
+                    continue
+                try:
+                    self.on_flushed(record)
+                except Exception as e:
+                    logger.error(f"Attendance flush callback failed: {str(e)}")
+
+    def _record_failures(self, records: List[Dict[str, Any]], error: str) -> None:
+        now = datetime.utcnow()
+        for record in records:
+            self.failures.append(FailedRecord(record=record, error=error, failed_at=now))
+        self.failed += len(records)
+
+        if not self.dead_letter_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.dead_letter_path)), exist_ok=True)
+            with open(self.dead_letter_path, "a") as f:
+                for record in records:
+                    f.write(json.dumps({
+                        "record": record,
+                        "error": error,
+                        "failed_at": now.isoformat()
+                    }, default=str) + "\n")
+        except OSError as e:
+            logger.error(f"Could not write attendance dead-letter file: {str(e)}")
+
+
+attendance_writer: Optional[AttendanceWriter] = None
+
+
+def get_attendance_writer() -> Optional[AttendanceWriter]:
+    return attendance_writer
+
+
+async def start_attendance_writer() -> None:
+    global attendance_writer
+    if not settings.ATTENDANCE_WRITE_BEHIND or attendance_writer is not None:
+        return
+    from app.services.database import AsyncSessionLocal, engine
+    from app.services.live_attendance import publish_arrival
+    from app.services.selfie_processing import submit_selfie
+
+    def on_flushed(record: Dict[str, Any]) -> None:
+        publish_arrival(record)
+        submit_selfie(record["selfie_key"])
+
+    attendance_writer = AttendanceWriter(
+        session_factory=AsyncSessionLocal,
+        max_queue_size=settings.ATTENDANCE_QUEUE_MAX_SIZE,
+        batch_size=settings.ATTENDANCE_BATCH_SIZE,
+        flush_interval=settings.ATTENDANCE_FLUSH_INTERVAL_SECONDS,
+        enqueue_timeout=settings.ATTENDANCE_ENQUEUE_TIMEOUT_SECONDS,
+        dead_letter_path=settings.ATTENDANCE_DEAD_LETTER_PATH,
+        dialect_name=engine.dialect.name,
+        on_flushed=on_flushed
+    )
+    await attendance_writer.start()
+
+
+async def stop_attendance_writer() -> None:
+    global attendance_writer
+    if attendance_writer is not None:
+        await attendance_writer.stop()
+        logger.info(f"Attendance writer drained: {attendance_writer.stats()}")
+        attendance_writer = None
@@ -0,0 +1,249 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import AsyncIterator, NamedTuple, Optional
+from app.core.config import settings
+
+
+class BlobRef(NamedTuple):
+    key: str
+    size: int
+    mime_type: str
+
+
+class BlobNotFound(Exception):
+    pass
+
+
+class BlobTooLarge(Exception):
+    pass
+
+
+def content_key(data: bytes) -> str:
+    """Content address of a blob: hex SHA-256 of its raw bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class BlobStorage(ABC):
+    """
+    Content-addressed blob store. Blobs are keyed by the SHA-256 of their
+    bytes, so storing the same image twice is a no-op.
+    """
+
+    async def put(self, data: bytes, mime_type: str) -> BlobRef:
+        key = content_key(data)
+        if not await self.exists(key):
+            await self._write(key, data, mime_type)
+        return BlobRef(key=key, size=len(data), mime_type=mime_type)
+
+    async def put_stream(
+        self,
+        chunks: AsyncIterator[bytes],
+        mime_type: str,
+        max_bytes: Optional[int] = None
+    ) -> BlobRef:
+        """
+        Store a blob from an async iterator of chunks. The chunks are hashed
+        and spooled to a temp file as they arrive, so the whole blob is never
+        held in memory. Raises BlobTooLarge once more than max_bytes arrive.
+        """
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(prefix="blob-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if max_bytes is not None and size > max_bytes:
+                        raise BlobTooLarge(f"Blob exceeds {max_bytes} bytes")
+                    digest.update(chunk)
+                    await asyncio.to_thread(f.write, chunk)
+
+            key = digest.hexdigest()
+            if not await self.exists(key):
+                await self._write_file(key, tmp_path, mime_type)
+            return BlobRef(key=key, size=size, mime_type=mime_type)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    @abstractmethod
+    async def get(self, key: str) -> bytes:
+        ...
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    async def _write(self, key: str, data: bytes, mime_type: str) -> None:
+        ...
+
+    @abstractmethod
+    async def _write_file(self, key: str, path: str, mime_type: str) -> None:
+        ...
+
+
+class LocalBlobStorage(BlobStorage):
+    """Stores blobs on the local filesystem under root/ab/cd/<key>"""
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key[2:4], key)
+
+    async def get(self, key: str) -> bytes:
+        return await asyncio.to_thread(self._read_sync, key)
+
+    async def exists(self, key: str) -> bool:
+        return await asyncio.to_thread(os.path.exists, self.path_for(key))
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._delete_sync, key)
+
+    async def _write(self, key: str, data: bytes, mime_type: str) -> None:
+        await asyncio.to_thread(self._write_sync, key, data)
+
+    async def _write_file(self, key: str, path: str, mime_type: str) -> None:
+        await asyncio.to_thread(self._move_sync, key, path)
+
+    def _read_sync(self, key: str) -> bytes:
+        try:
+            with open(self.path_for(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            raise BlobNotFound(key)
+
+    def _write_sync(self, key: str, data: bytes) -> None:
+        path = self.path_for(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # Write to a temp file and rename so readers never see a partial blob
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def _move_sync(self, key: str, src_path: str) -> None:
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            os.replace(src_path, path)
+        except OSError:
+            # Temp dir is on another filesystem; fall back to a copy
+            with open(src_path, "rb") as f:
+                self._write_sync(key, f.read())
+
+    def _delete_sync(self, key: str) -> None:
+        try:
+            os.unlink(self.path_for(key))
+        except FileNotFoundError:
+            pass
+
+
+class S3BlobStorage(BlobStorage):
+    """
+    Stores blobs in an S3-compatible bucket. Set endpoint_url to point at
+    MinIO or another local stand-in.
+    """
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        endpoint_url: Optional[str] = None,
+        region: Optional[str] = None,
+        client=None
+    ):
+        self.bucket = bucket
+        self.prefix = prefix
+        if client is None:
+            try:
+                import boto3
+            except ImportError:
+                raise RuntimeError("boto3 is required for the s3 blob storage backend")
+            client = boto3.client(
+                "s3",
+                endpoint_url=endpoint_url or None,
+                region_name=region or None
+            )
+        self.client = client
+
+    def object_key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    async def get(self, key: str) -> bytes:
+        return await asyncio.to_thread(self._get_sync, key)
+
+    async def exists(self, key: str) -> bool:
+        return await asyncio.to_thread(self._exists_sync, key)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(
+            self.client.delete_object, Bucket=self.bucket, Key=self.object_key(key)
+        )
+
+    async def _write(self, key: str, data: bytes, mime_type: str) -> None:
+        await asyncio.to_thread(
+            self.client.put_object,
+            Bucket=self.bucket,
+            Key=self.object_key(key),
+            Body=data,
+            ContentType=mime_type
+        )
+
+    async def _write_file(self, key: str, path: str, mime_type: str) -> None:
+        await asyncio.to_thread(
+            self.client.upload_file,
+            path,
+            self.bucket,
+            self.object_key(key),
+            ExtraArgs={"ContentType": mime_type}
+        )
+
+    def _get_sync(self, key: str) -> bytes:
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self.object_key(key))
+        except self.client.exceptions.NoSuchKey:
+            raise BlobNotFound(key)
+        return response["Body"].read()
+
+    def _exists_sync(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.object_key(key))
+            return True
+        except Exception as e:
+            status = getattr(e, "response", {}).get("Error", {}).get("Code")
+            if status in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+
+@lru_cache()
+def get_blob_storage() -> BlobStorage:
+    backend = settings.BLOB_STORAGE_BACKEND.lower()
+    if backend == "local":
+        return LocalBlobStorage(settings.BLOB_STORAGE_PATH)
+    if backend == "s3":
+        if not settings.S3_BUCKET:
+            raise ValueError("S3_BUCKET must be set for the s3 blob storage backend")
+        return S3BlobStorage(
+            bucket=settings.S3_BUCKET,
+            prefix=settings.S3_PREFIX,
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            region=settings.S3_REGION
+        )
+    raise ValueError(f"Unknown BLOB_STORAGE_BACKEND: {settings.BLOB_STORAGE_BACKEND}")
@@ -1,7 +1,12 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy import text
+from app.core.config import settings
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
 # Get the DATABASE_URL from environment
 DATABASE_URL = os.getenv('DATABASE_URL')
 
@@ -14,14 +19,74 @@ if DATABASE_URL.startswith('postgres://'):
 elif DATABASE_URL.startswith('postgresql://'):
     DATABASE_URL = DATABASE_URL.replace('postgresql://', 'postgresql+asyncpg://', 1)
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+def engine_options(url: str) -> dict:
+    """Engine keyword arguments built from settings"""
+    options = {"echo": settings.DB_ECHO}
+    if url.startswith('postgresql'):
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+            connect_args={
+                "server_settings": {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}
+            }
+        )
+    return options
+
+engine = create_async_engine(DATABASE_URL, **engine_options(DATABASE_URL))
 AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+def check_pool_budget(
+    workers: int,
+    pool_size: int,
+    max_overflow: int,
+    max_connections: int,
+    reserved: int = 0,
+    dedicated: int = 0
+) -> None:
+    """
+    Raise if every worker filling its pool and overflow, plus the
+    connections it holds outside the pool (`dedicated`, e.g. the live
+    attendance LISTEN connection), would exceed the database's connection limit
+    """
+    needed = workers * (pool_size + max_overflow + dedicated)
+    available = max_connections - reserved
+    if needed > available:
+        raise RuntimeError(
+            f"Database pool budget exceeded: {workers} workers x "
+            f"({pool_size} pool + {max_overflow} overflow + {dedicated} dedicated) = {needed} connections, "
+            f"but only {available} of {max_connections} are available"
+        )
+
+async def verify_pool_budget() -> None:
+    """Startup check of the configured pool sizes against max_connections"""
+    if engine.dialect.name != 'postgresql':
+        return
+
+    max_connections = settings.DB_MAX_CONNECTIONS
+    if not max_connections:
+        async with engine.connect() as conn:
+            max_connections = int((await conn.execute(text("SHOW max_connections"))).scalar())
+
+    check_pool_budget(
+        workers=settings.WEB_CONCURRENCY,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        max_connections=max_connections,
+        reserved=settings.DB_RESERVED_CONNECTIONS,
+        # The live attendance LISTEN connection, outside the pool
+        dedicated=1
+    )
+    logger.info(
+        f"Database pool budget OK: {settings.WEB_CONCURRENCY} workers x "
+        f"{settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW + 1} <= {max_connections}"
+    )
+
 async def get_db():
     async with AsyncSessionLocal() as session:
         try:
             yield session
         finally:
             await session.close()
-
-
@@ -0,0 +1,237 @@
+import json
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from math import sin, cos, sqrt, atan2, radians, floor
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+EARTH_RADIUS_METERS = 6371000
+# Degrees of latitude per meter (constant); longitude is scaled by cos(lat)
+DEGREES_PER_METER = 1 / 111320
+
+
+class Origin:
+    """A reference point with its trig terms precomputed for repeated haversine distances"""
+
+    def __init__(self, latitude: float, longitude: float):
+        self.latitude = latitude
+        self.longitude = longitude
+        self.lat_rad = radians(latitude)
+        self.lng_rad = radians(longitude)
+        self.cos_lat = cos(self.lat_rad)
+
+    def distance(self, latitude: float, longitude: float) -> float:
+        lat_rad = radians(latitude)
+        a = sin((lat_rad - self.lat_rad)/2)**2 + \
+            self.cos_lat * cos(lat_rad) * sin((radians(longitude) - self.lng_rad)/2)**2
+        return EARTH_RADIUS_METERS * 2 * atan2(sqrt(a), sqrt(1-a))
+
+    def distance_many(self, lat_rad: np.ndarray, cos_lat: np.ndarray, lng_rad: np.ndarray) -> np.ndarray:
+        """Vectorized haversine; takes points already in radians with cos(lat)"""
+        a = np.sin((lat_rad - self.lat_rad) / 2) ** 2 + \
+            self.cos_lat * cos_lat * np.sin((lng_rad - self.lng_rad) / 2) ** 2
+        return EARTH_RADIUS_METERS * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+class Fence(ABC):
+    """A named area; bbox is (min_lat, min_lng, max_lat, max_lng)"""
+
+    name: str
+    bbox: Tuple[float, float, float, float]
+    center: Origin
+    area: float
+
+    @abstractmethod
+    def contains(self, latitude: float, longitude: float) -> bool:
+        ...
+
+    @abstractmethod
+    def contains_many(self, points: "PointBatch", candidates: np.ndarray) -> np.ndarray:
+        """Containment for the points selected by `candidates` (an index array)"""
+
+    def in_bbox(self, latitude: float, longitude: float) -> bool:
+        min_lat, min_lng, max_lat, max_lng = self.bbox
+        return min_lat <= latitude <= max_lat and min_lng <= longitude <= max_lng
+
+    def in_bbox_many(self, points: "PointBatch") -> np.ndarray:
+        min_lat, min_lng, max_lat, max_lng = self.bbox
+        return (
+            (points.lat >= min_lat) & (points.lat <= max_lat) &
+            (points.lng >= min_lng) & (points.lng <= max_lng)
+        )
+
+    def distance_to_center(self, latitude: float, longitude: float) -> float:
+        return self.center.distance(latitude, longitude)
+
+
+class PointBatch:
+    """Coordinate arrays plus the trig terms every fence test needs, computed once"""
+
+    def __init__(self, latitudes: Sequence[float], longitudes: Sequence[float]):
+        self.lat = np.asarray(latitudes, dtype=np.float64)
+        self.lng = np.asarray(longitudes, dtype=np.float64)
+        if self.lat.shape != self.lng.shape or self.lat.ndim != 1:
+            raise ValueError("latitudes and longitudes must be 1-D arrays of the same length")
+        self.lat_rad = np.radians(self.lat)
+        self.lng_rad = np.radians(self.lng)
+        self.cos_lat = np.cos(self.lat_rad)
+
+    def __len__(self) -> int:
+        return len(self.lat)
+
+
+class CircleFence(Fence):
+    def __init__(self, name: str, latitude: float, longitude: float, radius_meters: float):
+        self.name = name
+        self.center = Origin(latitude, longitude)
+        self.radius_meters = radius_meters
+        self.area = 3.141592653589793 * radius_meters ** 2
+        dlat = radius_meters * DEGREES_PER_METER
+        dlng = dlat / max(cos(radians(latitude)), 1e-6)
+        self.bbox = (latitude - dlat, longitude - dlng, latitude + dlat, longitude + dlng)
+
+    def contains(self, latitude: float, longitude: float) -> bool:
+        return self.distance_to_center(latitude, longitude) <= self.radius_meters
+
+    def contains_many(self, points: PointBatch, candidates: np.ndarray) -> np.ndarray:
+        distance = self.center.distance_many(
+            points.lat_rad[candidates], points.cos_lat[candidates], points.lng_rad[candidates]
+        )
+        return distance <= self.radius_meters
+
+
+class PolygonFence(Fence):
+    """Polygon given as (lat, lng) vertices; fine for campus-sized areas"""
+
+    def __init__(self, name: str, vertices: Sequence[Tuple[float, float]]):
+        if len(vertices) < 3:
+            raise ValueError(f"Polygon fence {name!r} needs at least 3 vertices")
+        self.name = name
+        self.vertices = [(float(lat), float(lng)) for lat, lng in vertices]
+        lats = [lat for lat, _ in self.vertices]
+        lngs = [lng for _, lng in self.vertices]
+        self.bbox = (min(lats), min(lngs), max(lats), max(lngs))
+        self.center = Origin(sum(lats) / len(lats), sum(lngs) / len(lngs))
+        # Shoelace area, scaled from square degrees to square meters
+        twice_area = sum(
+            lat1 * lng2 - lat2 * lng1
+            for (lat1, lng1), (lat2, lng2) in zip(self.vertices, self.vertices[1:] + self.vertices[:1])
+        )
+        meters_per_degree = 1 / DEGREES_PER_METER
+        self.area = abs(twice_area) / 2 * meters_per_degree ** 2 * self.center.cos_lat
+
+    def contains(self, latitude: float, longitude: float) -> bool:
+        # Ray casting along the longitude axis
+        inside = False
+        lat_j, lng_j = self.vertices[-1]
+        for lat_i, lng_i in self.vertices:
+            if (lat_i > latitude) != (lat_j > latitude):
+                crossing = lng_i + (latitude - lat_i) * (lng_j - lng_i) / (lat_j - lat_i)
+                if longitude < crossing:
+                    inside = not inside
+            lat_j, lng_j = lat_i, lng_i
+        return inside
+
+    def contains_many(self, points: PointBatch, candidates: np.ndarray) -> np.ndarray:
+        lat = points.lat[candidates]
+        lng = points.lng[candidates]
+        inside = np.zeros(len(candidates), dtype=bool)
+        lat_j, lng_j = self.vertices[-1]
+        for lat_i, lng_i in self.vertices:
+            if lat_i != lat_j:
+                straddles = (lat_i > lat) != (lat_j > lat)
+                crossing = lng_i + (lat - lat_i) * (lng_j - lng_i) / (lat_j - lat_i)
+                inside ^= straddles & (lng < crossing)
+            lat_j, lng_j = lat_i, lng_i
+        return inside
+
+
+def fence_from_dict(data: Dict) -> Fence:
+    kind = data.get("type", "circle")
+    if kind == "circle":
+        return CircleFence(
+            data["name"],
+            float(data["latitude"]),
+            float(data["longitude"]),
+            float(data["radius_meters"])
+        )
+    if kind == "polygon":
+        return PolygonFence(data["name"], data["coordinates"])
+    raise ValueError(f"Unknown fence type: {kind}")
+
+
+class GeofenceIndex:
+    """
+    Spatial index over many fences. Each fence's bounding box is rasterised
+    onto a fixed lat/lng grid, so a lookup only runs exact containment
+    tests for the few fences registered in the point's grid cell. When
+    fences nest (room inside building inside campus), the smallest one wins.
+    """
+
+    def __init__(self, fences: Sequence[Fence], cell_degrees: float = 0.01):
+        self.cell_degrees = cell_degrees
+        # Smallest area first, so the first hit is the most specific fence
+        self.fences: List[Fence] = sorted(fences, key=lambda fence: fence.area)
+        self._cells: Dict[Tuple[int, int], List[Fence]] = defaultdict(list)
+        for fence in self.fences:
+            min_lat, min_lng, max_lat, max_lng = fence.bbox
+            for i in range(self._cell(min_lat), self._cell(max_lat) + 1):
+                for j in range(self._cell(min_lng), self._cell(max_lng) + 1):
+                    self._cells[(i, j)].append(fence)
+
+    @classmethod
+    def from_file(cls, path: str, cell_degrees: float = 0.01) -> "GeofenceIndex":
+        """
+        Load fences from JSON: {"fences": [{"name", "type": "circle",
+        "latitude", "longitude", "radius_meters"} or {"name",
+        "type": "polygon", "coordinates": [[lat, lng], ...]}]}
+        """
+        with open(path) as f:
+            data = json.load(f)
+        return cls([fence_from_dict(item) for item in data["fences"]], cell_degrees)
+
+    def _cell(self, degrees: float) -> int:
+        return floor(degrees / self.cell_degrees)
+
+    def match(self, latitude: float, longitude: float) -> Optional[Fence]:
+        """The most specific fence containing the point, or None"""
+        for fence in self._cells.get((self._cell(latitude), self._cell(longitude)), ()):
+            if fence.in_bbox(latitude, longitude) and fence.contains(latitude, longitude):
+                return fence
+        return None
+
+    def match_many(self, points: PointBatch) -> np.ndarray:
+        """
+        Vectorized match: index into self.fences of the most specific fence
+        containing each point, or -1. Fences are tried smallest first and
+        only against still-unmatched points inside their bounding box.
+        """
+        matched = np.full(len(points), -1, dtype=np.int64)
+        for fence_index, fence in enumerate(self.fences):
+            candidates = np.flatnonzero((matched < 0) & fence.in_bbox_many(points))
+            if len(candidates):
+                matched[candidates[fence.contains_many(points, candidates)]] = fence_index
+        return matched
+
+    def nearest_distance_many(self, points: PointBatch) -> np.ndarray:
+        """Distance from each point to the nearest fence center"""
+        nearest = np.full(len(points), np.inf)
+        for fence in self.fences:
+            np.minimum(
+                nearest,
+                fence.center.distance_many(points.lat_rad, points.cos_lat, points.lng_rad),
+                out=nearest
+            )
+        return nearest
+
+    def nearest(self, latitude: float, longitude: float) -> Tuple[Optional[Fence], float]:
+        """Closest fence by distance to its center; only used for rejections"""
+        best, best_distance = None, float("inf")
+        for fence in self.fences:
+            distance = fence.distance_to_center(latitude, longitude)
+            if distance < best_distance:
+                best, best_distance = fence, distance
+        return best, best_distance
+
+    def __len__(self) -> int:
+        return len(self.fences)
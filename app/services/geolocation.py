@@ -1,27 +1,89 @@
-from math import sin, cos, sqrt, atan2, radians
-from typing import Tuple
+import os
+from functools import lru_cache
+from typing import Optional, Sequence, Tuple
+import numpy as np
+from app.core.config import settings
+from app.services.geofence import CircleFence, GeofenceIndex, Origin, PointBatch
 
 class GeolocationValidator:
-    def __init__(self, campus_lat: float, campus_lng: float, allowed_radius: float):
-        self.campus_lat = radians(campus_lat)
-        self.campus_lng = radians(campus_lng)
-        self.allowed_radius = allowed_radius  # in meters
-        self.R = 6371000  # Earth's radius in meters
+    def __init__(
+        self,
+        campus_lat: float = None,
+        campus_lng: float = None,
+        allowed_radius: float = None,
+        geofences: Optional[GeofenceIndex] = None
+    ):
+        if geofences is None:
+            # Single campus circle from CAMPUS_LATITUDE/LONGITUDE/ALLOWED_RADIUS_METERS
+            geofences = GeofenceIndex([CircleFence("campus", campus_lat, campus_lng, allowed_radius)])
+        self.geofences = geofences
+        self.campus = None
+        if campus_lat is not None and campus_lng is not None:
+            # sin/cos of the campus latitude are computed once, not per call
+            self.campus = Origin(campus_lat, campus_lng)
+            self.allowed_radius = allowed_radius  # in meters
 
     def calculate_distance(self, lat2: float, lng2: float) -> float:
-        lat2_rad = radians(lat2)
-        lng2_rad = radians(lng2)
+        return self.campus.distance(lat2, lng2)
 
-        dlat = lat2_rad - self.campus_lat
-        dlng = lng2_rad - self.campus_lng
+    async def match_location(self, latitude: float, longitude: float) -> Tuple[bool, float, Optional[str]]:
+        """
+        Returns (is_valid, distance, fence_name). The distance is measured to
+        the center of the matched fence, or of the nearest fence on a miss.
+        """
+        fence = self.geofences.match(latitude, longitude)
+        if fence is not None:
+            return True, fence.distance_to_center(latitude, longitude), fence.name
+        _, distance = self.geofences.nearest(latitude, longitude)
+        return False, distance, None
 
-        a = sin(dlat/2)**2 + cos(self.campus_lat) * cos(lat2_rad) * sin(dlng/2)**2
-        c = 2 * atan2(sqrt(a), sqrt(1-a))
-        distance = self.R * c
+    async def validate_location(self, latitude: float, longitude: float) -> Tuple[bool, float]:
+        is_valid, distance, _ = await self.match_location(latitude, longitude)
+        return is_valid, distance
 
-        return distance
+    def validate_batch(
+        self,
+        latitudes: Sequence[float],
+        longitudes: Sequence[float]
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Vectorized validate_location for many points at once.
+        Returns (valid, distance, fence_index) arrays; fence_index indexes
+        self.geofences.fences and is -1 where no fence matched.
+        """
+        points = PointBatch(latitudes, longitudes)
+        fence_index = self.geofences.match_many(points)
+        valid = fence_index >= 0
 
-    async def validate_location(self, latitude: float, longitude: float) -> Tuple[bool, float]:
-        distance = self.calculate_distance(latitude, longitude)
-        is_valid = distance <= self.allowed_radius
-        return is_valid, distance
\ No newline at end of file
+        distance = np.empty(len(points))
+        fences = self.geofences.fences
+        for i in np.unique(fence_index[valid]):
+            selected = np.flatnonzero(fence_index == i)
+            distance[selected] = fences[i].center.distance_many(
+                points.lat_rad[selected], points.cos_lat[selected], points.lng_rad[selected]
+            )
+        if not valid.all():
+            misses = np.flatnonzero(~valid)
+            distance[misses] = self.geofences.nearest_distance_many(_subset(points, misses))
+        return valid, distance, fence_index
+
+def _subset(points: PointBatch, selected: np.ndarray) -> PointBatch:
+    return PointBatch(points.lat[selected], points.lng[selected])
+
+@lru_cache()
+def load_geofences(path: str) -> GeofenceIndex:
+    return GeofenceIndex.from_file(path, settings.GEOFENCE_CELL_DEGREES)
+
+@lru_cache()
+def get_geolocation_validator() -> GeolocationValidator:
+    """Built once per worker; fences and their trig terms are reused across requests"""
+    if settings.GEOFENCES_FILE:
+        return GeolocationValidator(geofences=load_geofences(settings.GEOFENCES_FILE))
+    return GeolocationValidator(
+        campus_lat=float(os.getenv('CAMPUS_LATITUDE')),
+        campus_lng=float(os.getenv('CAMPUS_LONGITUDE')),
+        allowed_radius=float(os.getenv('ALLOWED_RADIUS_METERS'))
+    )
+
+def geolocation_configured() -> bool:
+    return bool(settings.GEOFENCES_FILE or os.getenv('CAMPUS_LATITUDE'))
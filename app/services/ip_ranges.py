@@ -0,0 +1,227 @@
+import asyncio
+import heapq
+import ipaddress
+import logging
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Optional, Tuple
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Highest priority first: an address in both a Tor and a datacenter list is "tor"
+CATEGORIES = ("tor", "vpn", "datacenter")
+
+
+def parse_range(line: str) -> Tuple[int, int, int]:
+    """Parse "a.b.c.d/n" or "start-end" into (ip_version, first, last)"""
+    if "-" in line:
+        first_text, last_text = line.split("-", 1)
+        first = ipaddress.ip_address(first_text.strip())
+        last = ipaddress.ip_address(last_text.strip())
+        if first.version != last.version or int(last) < int(first):
+            raise ValueError(f"Invalid IP range: {line}")
+        return first.version, int(first), int(last)
+    network = ipaddress.ip_network(line, strict=False)
+    return network.version, int(network.network_address), int(network.broadcast_address)
+
+
+def _flatten(ranges: List[Tuple[int, int, int]]) -> Tuple[List[int], List[int], List[int]]:
+    """
+    Turn possibly overlapping (first, last, priority) ranges into sorted,
+    disjoint segments, each labelled with the highest-priority range that
+    covers it. Adjacent segments with the same label are merged.
+    """
+    ranges.sort()
+    boundaries = sorted({first for first, _, _ in ranges} | {last + 1 for _, last, _ in ranges})
+    starts: List[int] = []
+    ends: List[int] = []
+    labels: List[int] = []
+    active: List[Tuple[int, int]] = []  # heap of (priority, last)
+    i = 0
+    for position, next_position in zip(boundaries, boundaries[1:]):
+        while i < len(ranges) and ranges[i][0] == position:
+            heapq.heappush(active, (ranges[i][2], ranges[i][1]))
+            i += 1
+        while active and active[0][1] < position:
+            heapq.heappop(active)
+        if not active:
+            continue
+        label = active[0][0]
+        if ends and labels[-1] == label and ends[-1] + 1 == position:
+            ends[-1] = next_position - 1
+        else:
+            starts.append(position)
+            ends.append(next_position - 1)
+            labels.append(label)
+    return starts, ends, labels
+
+
+class _FamilyIndex:
+    """Sorted disjoint intervals for one address family, searched with bisect"""
+
+    def __init__(self, ranges: List[Tuple[int, int, int]], version: int):
+        starts, ends, labels = _flatten(ranges)
+        if version == 4:
+            # 32-bit unsigned arrays keep millions of IPv4 ranges compact
+            self.starts = array("I", starts)
+            self.ends = array("I", ends)
+        else:
+            self.starts = starts
+            self.ends = ends
+        self.labels = array("B", labels)
+
+    def lookup(self, value: int) -> Optional[int]:
+        idx = bisect_right(self.starts, value) - 1
+        if idx >= 0 and value <= self.ends[idx]:
+            return self.labels[idx]
+        return None
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+
+class CidrIndex:
+    """
+    Classifies IPs against datacenter, VPN and Tor-exit ranges in
+    O(log n) per lookup, for both IPv4 and IPv6.
+    """
+
+    def __init__(self, ranges: Iterable[Tuple[str, int, int, int]] = ()):
+        by_version: Dict[int, List[Tuple[int, int, int]]] = {4: [], 6: []}
+        for category, version, first, last in ranges:
+            by_version[version].append((first, last, CATEGORIES.index(category)))
+        self.v4 = _FamilyIndex(by_version[4], 4)
+        self.v6 = _FamilyIndex(by_version[6], 6)
+
+    @classmethod
+    def from_files(cls, paths: Dict[str, str]) -> "CidrIndex":
+        """Build from {category: path}; one CIDR or "first-last" range per line, # comments"""
+        def ranges():
+            for category, path in paths.items():
+                with open(path) as f:
+                    for line_number, line in enumerate(f, 1):
+                        line = line.split("#", 1)[0].strip()
+                        if not line:
+                            continue
+                        try:
+                            version, first, last = parse_range(line)
+                        except ValueError:
+                            logger.warning(f"Skipping invalid range at {path}:{line_number}")
+                            continue
+                        yield category, version, first, last
+        return cls(ranges())
+
+    def lookup(self, ip_address: str) -> Optional[str]:
+        """Category of the IP, or None if it is in no list (or not an IP)"""
+        try:
+            ip = ipaddress.ip_address(ip_address)
+        except ValueError:
+            return None
+        if ip.version == 6 and ip.ipv4_mapped is not None:
+            ip = ip.ipv4_mapped
+        family = self.v4 if ip.version == 4 else self.v6
+        label = family.lookup(int(ip))
+        return CATEGORIES[label] if label is not None else None
+
+    def __len__(self) -> int:
+        return len(self.v4) + len(self.v6)
+
+
+class ReloadingCidrIndex:
+    """
+    CidrIndex over <directory>/<category>.txt that picks up edited files
+    without a restart. At most every `check_interval` seconds a lookup
+    compares file mtimes; on a change the index is rebuilt in a background
+    thread and swapped in, while lookups keep using the previous one.
+    With block=False the first load is done the same way, so lookups see an
+    empty index until it is ready.
+    """
+
+    def __init__(self, directory: str, check_interval: float = 60, block: bool = True):
+        self.directory = directory
+        self.check_interval = check_interval
+        self.index = CidrIndex()
+        self._mtimes: Dict[str, float] = {}
+        self._next_check = 0.0
+        self._reloading = False
+        self._lock = threading.Lock()
+        self.reload(block=block)
+
+    def _paths(self) -> Dict[str, str]:
+        paths = {}
+        for category in CATEGORIES:
+            path = os.path.join(self.directory, f"{category}.txt")
+            if os.path.exists(path):
+                paths[category] = path
+        return paths
+
+    def _current_mtimes(self) -> Dict[str, float]:
+        return {path: os.path.getmtime(path) for path in self._paths().values()}
+
+    def reload(self, block: bool = False) -> None:
+        with self._lock:
+            if self._reloading:
+                return
+            self._reloading = True
+        if block:
+            self._rebuild()
+        else:
+            threading.Thread(target=self._rebuild, name="ip-ranges-reload", daemon=True).start()
+
+    def _rebuild(self) -> None:
+        try:
+            mtimes = self._current_mtimes()
+            started = time.perf_counter()
+            index = CidrIndex.from_files(self._paths())
+            self.index = index
+            self._mtimes = mtimes
+            if mtimes:
+                logger.info(
+                    f"Loaded {len(index)} IP ranges from {self.directory} "
+                    f"in {time.perf_counter() - started:.2f}s"
+                )
+        except Exception as e:
+            logger.error(f"Failed to load IP ranges from {self.directory}: {str(e)}")
+        finally:
+            self._reloading = False
+
+    def _maybe_reload(self) -> None:
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.check_interval
+        try:
+            changed = self._current_mtimes() != self._mtimes
+        except OSError:
+            return
+        if changed:
+            self.reload()
+
+    def lookup(self, ip_address: str) -> Optional[str]:
+        self._maybe_reload()
+        return self.index.lookup(ip_address)
+
+
+_index: Optional[ReloadingCidrIndex] = None
+
+
+def get_ip_range_index() -> ReloadingCidrIndex:
+    global _index
+    if _index is None:
+        # Normally built by load_ip_ranges at startup; never block a request on it
+        _index = ReloadingCidrIndex(settings.IP_RANGES_DIR, settings.IP_RANGES_RELOAD_SECONDS, block=False)
+    return _index
+
+
+async def load_ip_ranges() -> None:
+    """Build the index in a worker thread before the worker takes requests"""
+    global _index
+    if _index is None:
+        loop = asyncio.get_running_loop()
+        _index = await loop.run_in_executor(
+            None, ReloadingCidrIndex, settings.IP_RANGES_DIR, settings.IP_RANGES_RELOAD_SECONDS
+        )
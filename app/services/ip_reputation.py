@@ -0,0 +1,200 @@
+import ipaddress
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import httpx
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """Small bounded LRU cache whose entries expire after ttl_seconds"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[bool, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bool]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, deadline = entry
+            if time.monotonic() >= deadline:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: bool) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and stays open for
+    `reset_timeout` seconds; then one trial call is let through (half-open)
+    while concurrent callers are still refused. A trial that never reports
+    back is replaced by another after a further `reset_timeout`.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_started: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state != "half-open":
+            return state == "closed"
+        now = time.monotonic()
+        if self.trial_started is not None and now - self.trial_started < self.reset_timeout:
+            return False
+        self.trial_started = now
+        return True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.trial_started = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.failures >= self.failure_threshold or self.state == "half-open":
+            self.opened_at = time.monotonic()
+        self.trial_started = None
+
+
+def network_prefix(ip_address: str) -> str:
+    """/24 for IPv4 and /64 for IPv6, the usual size of one NAT'd network"""
+    ip = ipaddress.ip_address(ip_address)
+    prefix = 24 if ip.version == 4 else 64
+    return str(ipaddress.ip_network(f"{ip}/{prefix}", strict=False))
+
+
+class IPReputationClient:
+    """
+    Async client for an ipapi.co-style reputation API. Verdicts are cached by
+    IP and by network prefix, since a whole classroom usually shares one NAT
+    address. Errors, timeouts and an open circuit breaker fail open
+    (not suspicious), matching the previous behaviour of check_vpn.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        timeout: float = 1.5,
+        cache_ttl: float = 3600,
+        max_entries: int = 10000,
+        breaker: Optional[CircuitBreaker] = None,
+        http_client: Optional[httpx.AsyncClient] = None
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.ip_cache = TTLCache(max_entries, cache_ttl)
+        self.prefix_cache = TTLCache(max_entries, cache_ttl)
+        self.breaker = breaker or CircuitBreaker()
+        self.http_client = http_client or httpx.AsyncClient(
+            timeout=httpx.Timeout(timeout),
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)
+        )
+        self.lookups = 0
+        self.errors = 0
+
+    async def is_suspicious(self, ip_address: str) -> bool:
+        try:
+            prefix = network_prefix(ip_address)
+        except ValueError:
+            return False
+
+        cached = self.ip_cache.get(ip_address)
+        if cached is None:
+            cached = self.prefix_cache.get(prefix)
+        if cached is not None:
+            return cached
+
+        if not self.breaker.allow():
+            return False
+
+        try:
+            self.lookups += 1
+            response = await self.http_client.get(f"{self.base_url}/{ip_address}/json/")
+            response.raise_for_status()
+            data = response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            self.errors += 1
+            self.breaker.record_failure()
+            logger.warning(f"IP reputation lookup failed for {ip_address}: {e!r}")
+            return False
+        self.breaker.record_success()
+
+        # Check for common VPN indicators
+        suspicious = any([
+            data.get('hosting', False),
+            data.get('proxy', False),
+            data.get('tor', False),
+            data.get('vpn', False)
+        ])
+        self.ip_cache.put(ip_address, suspicious)
+        self.prefix_cache.put(prefix, suspicious)
+        return suspicious
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "lookups": self.lookups,
+            "errors": self.errors,
+            "cached_ips": len(self.ip_cache),
+            "cached_prefixes": len(self.prefix_cache),
+            "breaker": self.breaker.state
+        }
+
+    async def aclose(self) -> None:
+        await self.http_client.aclose()
+
+
+_client: Optional[IPReputationClient] = None
+
+
+def get_ip_reputation_client() -> IPReputationClient:
+    """One client per worker so the connection pool and caches are shared"""
+    global _client
+    if _client is None:
+        _client = IPReputationClient(
+            settings.IP_REPUTATION_URL,
+            timeout=settings.IP_REPUTATION_TIMEOUT_SECONDS,
+            cache_ttl=settings.IP_REPUTATION_CACHE_TTL_SECONDS,
+            max_entries=settings.IP_REPUTATION_CACHE_MAX_ENTRIES,
+            breaker=CircuitBreaker(
+                settings.IP_REPUTATION_BREAKER_FAILURES,
+                settings.IP_REPUTATION_BREAKER_RESET_SECONDS
+            )
+        )
+    return _client
+
+
+async def close_ip_reputation_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,270 @@
+import asyncio
+import json
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# (roll numbers already recorded, most recent arrivals oldest first)
+Loader = Callable[[str, int], Awaitable[Tuple[List[str], List[Dict[str, Any]]]]]
+
+
+class SessionFeed:
+    """Running state of one session, kept only while someone is watching it"""
+
+    def __init__(self, recent_size: int):
+        self.roll_numbers: Set[str] = set()
+        self.recent: Deque[Dict[str, Any]] = deque(maxlen=recent_size)
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.loaded = asyncio.Event()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"count": len(self.roll_numbers), "recent": list(self.recent)}
+
+
+class LiveAttendanceHub:
+    """
+    In-process pub/sub for live attendance counts. The first viewer of a
+    session loads its roll numbers once; after that the count is kept up to
+    date from published arrivals, so viewers cost no queries. Counting
+    distinct roll numbers makes a replayed or duplicated event harmless.
+    """
+
+    def __init__(self, loader: Loader, recent_size: int = 10, queue_size: int = 100):
+        self.loader = loader
+        self.recent_size = recent_size
+        self.queue_size = queue_size
+        self._feeds: Dict[str, SessionFeed] = {}
+
+    async def subscribe(self, session_id: str) -> asyncio.Queue:
+        """A queue that first receives a snapshot, then one message per arrival"""
+        while True:
+            feed = self._feeds.get(session_id)
+            if feed is None:
+                feed = self._feeds[session_id] = SessionFeed(self.recent_size)
+                loaded = False
+                try:
+                    await self._load(session_id, feed)
+                    loaded = True
+                finally:
+                    if not loaded and self._feeds.get(session_id) is feed:
+                        # Cancelled or failed while loading: drop the feed so
+                        # the next viewer loads it again instead of seeing 0
+                        del self._feeds[session_id]
+                    feed.loaded.set()
+                break
+            await feed.loaded.wait()
+            if self._feeds.get(session_id) is feed:
+                break
+            # Its load was cancelled or failed; start over with a fresh feed
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        queue.put_nowait(("snapshot", feed.snapshot()))
+        feed.subscribers.add(queue)
+        return queue
+
+    async def _load(self, session_id: str, feed: SessionFeed) -> None:
+        try:
+            roll_numbers, recent = await self.loader(session_id, self.recent_size)
+        except Exception as e:
+            logger.error(f"Could not load live attendance for {session_id}: {str(e)}")
+            raise
+        # Arrivals published while loading are already in the feed
+        arrived = list(feed.recent)
+        feed.roll_numbers.update(roll_numbers)
+        feed.recent.clear()
+        feed.recent.extend(recent)
+        seen = {item["roll_number"] for item in recent}
+        feed.recent.extend(item for item in arrived if item["roll_number"] not in seen)
+
+    def unsubscribe(self, session_id: str, queue: asyncio.Queue) -> None:
+        feed = self._feeds.get(session_id)
+        if feed is None:
+            return
+        feed.subscribers.discard(queue)
+        if not feed.subscribers and feed.loaded.is_set():
+            del self._feeds[session_id]
+
+    def apply(self, event: Dict[str, Any]) -> None:
+        """Record an arrival and push it to this worker's viewers of the session"""
+        feed = self._feeds.get(event["session_id"])
+        if feed is None or event["roll_number"] in feed.roll_numbers:
+            return
+        feed.roll_numbers.add(event["roll_number"])
+        feed.recent.append(event)
+        message = ("arrival", {"count": len(feed.roll_numbers), "student": event})
+        for queue in feed.subscribers:
+            if queue.full():
+                # A slow viewer loses old arrivals, never the current count
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "sessions": len(self._feeds),
+            "viewers": sum(len(feed.subscribers) for feed in self._feeds.values())
+        }
+
+
+class PgNotifyBridge:
+    """
+    Fans arrivals out to every gunicorn worker with Postgres LISTEN/NOTIFY.
+    Each worker holds one dedicated connection that listens on `channel`;
+    published events are sent with pg_notify from a background task, so the
+    submit request never waits on it. Every worker, the sender included,
+    applies the notification to its own hub.
+    """
+
+    def __init__(self, dsn: str, hub: LiveAttendanceHub, channel: str = "attendance_events"):
+        self.dsn = dsn
+        self.hub = hub
+        self.channel = channel
+        self.outbox: asyncio.Queue = asyncio.Queue(maxsize=10000)
+        self._connection = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        try:
+            self.outbox.put_nowait(event)
+        except asyncio.QueueFull:
+            logger.warning("Live attendance outbox full, dropping event")
+
+    def _on_notification(self, connection, pid, channel, payload) -> None:
+        try:
+            self.hub.apply(json.loads(payload))
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Ignoring malformed live attendance event: {str(e)}")
+
+    async def _run(self) -> None:
+        import asyncpg
+
+        delay = 1
+        while True:
+            try:
+                self._connection = await asyncpg.connect(self.dsn)
+                await self._connection.add_listener(self.channel, self._on_notification)
+                delay = 1
+                while True:
+                    event = await self.outbox.get()
+                    await self._connection.execute(
+                        "SELECT pg_notify($1, $2)", self.channel, json.dumps(event, default=str)
+                    )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Live attendance LISTEN connection failed, retrying in {delay}s: {str(e)}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30)
+            finally:
+                if self._connection is not None:
+                    await self._connection.close()
+                    self._connection = None
+
+
+def sse_message(event: str, data: Dict[str, Any]) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n".encode("utf-8")
+
+
+async def event_stream(
+    hub: LiveAttendanceHub,
+    session_id: str,
+    is_disconnected: Callable[[], Awaitable[bool]],
+    heartbeat: float = 15
+):
+    """Server-sent events for one viewer, with a comment line as heartbeat"""
+    try:
+        queue = await hub.subscribe(session_id)
+    except Exception:
+        # Already logged; ending the stream makes the browser reconnect and retry
+        return
+    try:
+        while not await is_disconnected():
+            try:
+                event, data = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield b": keep-alive\n\n"
+                continue
+            yield sse_message(event, data)
+    finally:
+        hub.unsubscribe(session_id, queue)
+
+
+async def load_session_attendance(session_id: str, recent_size: int):
+    from sqlalchemy import select
+    from app.models.attendance import Attendance
+    from app.services.database import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as db:
+        roll_numbers = (await db.execute(
+            select(Attendance.roll_number).where(Attendance.session_id == session_id)
+        )).scalars().all()
+        recent = (await db.execute(
+            select(Attendance.roll_number, Attendance.full_name, Attendance.created_at)
+            .where(Attendance.session_id == session_id)
+            .order_by(Attendance.created_at.desc())
+            .limit(recent_size)
+        )).all()
+    return list(roll_numbers), [
+        {"session_id": session_id, "roll_number": row.roll_number, "full_name": row.full_name, "at": row.created_at}
+        for row in reversed(recent)
+    ]
+
+
+live_hub = LiveAttendanceHub(
+    load_session_attendance,
+    recent_size=settings.LIVE_RECENT_ARRIVALS,
+    queue_size=settings.LIVE_VIEWER_QUEUE_SIZE
+)
+_bridge: Optional[PgNotifyBridge] = None
+
+
+def get_live_hub() -> LiveAttendanceHub:
+    return live_hub
+
+
+def publish_arrival(record: Dict[str, Any]) -> None:
+    """Called once an attendance record is accepted; never blocks"""
+    event = {
+        "session_id": record["session_id"],
+        "roll_number": record["roll_number"],
+        "full_name": record["full_name"],
+        "at": record["created_at"].isoformat()
+    }
+    if _bridge is not None:
+        _bridge.publish(event)
+    else:
+        live_hub.apply(event)
+
+
+async def start_live_attendance() -> None:
+    global _bridge
+    from app.services.database import engine
+
+    if engine.dialect.name != "postgresql" or _bridge is not None:
+        return
+    # asyncpg takes a plain postgresql:// DSN
+    dsn = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+    _bridge = PgNotifyBridge(dsn, live_hub, settings.LIVE_NOTIFY_CHANNEL)
+    await _bridge.start()
+
+
+async def stop_live_attendance() -> None:
+    global _bridge
+    if _bridge is not None:
+        await _bridge.stop()
+        _bridge = None
@@ -0,0 +1,127 @@
+import os
+import time
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+    multiprocess
+)
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.utils.asgi import get_content_length
+
+# With PROMETHEUS_MULTIPROC_DIR set (see gunicorn_config.py) every worker
+# writes its samples to mmap'd files in that directory, and /metrics on any
+# worker reports the sum over all of them.
+
+REQUEST_COUNT = Counter(
+    "http_requests_total",
+    "HTTP requests",
+    ["method", "route", "status"]
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency",
+    ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+REQUEST_SIZE = Histogram(
+    "http_request_size_bytes",
+    "Request body size from Content-Length",
+    ["method", "route"],
+    buckets=(1024, 16384, 65536, 131072, 262144, 524288, 1048576, 2097152, 5242880)
+)
+QR_RENDER_SECONDS = Histogram(
+    "qr_render_seconds",
+    "Time to render a QR image, excluding rendered-image cache hits",
+    ["format"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+)
+SESSION_CACHE_LOOKUPS = Counter(
+    "session_cache_lookups_total",
+    "Session cache lookups; hit ratio is rate(result=hit) / rate(all)",
+    ["result"]
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections",
+    "Connections currently checked out of the pool",
+    multiprocess_mode="livesum"
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow_connections",
+    "Connections open beyond the pool size",
+    multiprocess_mode="livesum"
+)
+DB_POOL_SIZE = Gauge(
+    "db_pool_size_connections",
+    "Configured pool size",
+    multiprocess_mode="livesum"
+)
+
+
+def record_pool_usage(pool) -> None:
+    """Sample a QueuePool; other pool classes (e.g. SQLite's) are skipped"""
+    if not hasattr(pool, "checkedout"):
+        return
+    DB_POOL_CHECKED_OUT.set(pool.checkedout())
+    DB_POOL_OVERFLOW.set(max(pool.overflow(), 0))
+    DB_POOL_SIZE.set(pool.size())
+
+
+def route_template(app, scope: Scope) -> str:
+    """The matched route path ("/api/qr/session/{session_id}/image"), keeping label cardinality bounded"""
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware, so streamed responses pass through untouched.
+    Records count, latency and request size per route template.
+    """
+
+    def __init__(self, app: ASGIApp, pool=None):
+        self.app = app
+        self.pool = pool
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            method = scope["method"]
+            route = route_template(scope["app"], scope)
+            REQUEST_COUNT.labels(method, route, str(status)).inc()
+            REQUEST_LATENCY.labels(method, route).observe(time.perf_counter() - started)
+            content_length = get_content_length(scope)
+            if content_length is not None:
+                REQUEST_SIZE.labels(method, route).observe(content_length)
+            if self.pool is not None:
+                record_pool_usage(self.pool)
+
+
+def render_metrics() -> bytes:
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
@@ -0,0 +1,59 @@
+from functools import lru_cache
+from typing import Optional, Tuple
+from app.core.config import settings
+from app.services.geolocation import GeolocationValidator, geolocation_configured, get_geolocation_validator
+from app.utils.security import SecurityValidator, get_security_validator
+
+
+class PreSubmitValidator:
+    """
+    Checks an attendance submission before anything is written, cheapest
+    first: the compiled user-agent pattern, the offline CIDR lists, the
+    geofence index (when the client sent coordinates) and finally the
+    cached IP reputation API, which is the only check that can do I/O.
+    """
+
+    def __init__(
+        self,
+        security: SecurityValidator,
+        geolocation: Optional[GeolocationValidator] = None
+    ):
+        self.security = security
+        self.geolocation = geolocation
+
+    async def validate(
+        self,
+        user_agent: Optional[str],
+        ip_address: Optional[str],
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None
+    ) -> Tuple[bool, str]:
+        """Returns (is_valid, message)"""
+        if not self.security.validate_user_agent(user_agent):
+            return False, "Invalid user agent"
+
+        if ip_address and self.security.classify_ip(ip_address):
+            return False, "VPN usage detected"
+
+        if self.geolocation is not None and latitude is not None and longitude is not None:
+            is_valid, distance, _ = await self.geolocation.match_location(latitude, longitude)
+            if not is_valid:
+                return False, f"You are {round(distance, 2)} meters away from campus."
+
+        if ip_address and await self.security.check_vpn(ip_address):
+            return False, "VPN usage detected"
+
+        return True, "Request validated successfully"
+
+
+@lru_cache()
+def _presubmit_validator() -> PreSubmitValidator:
+    geolocation = get_geolocation_validator() if geolocation_configured() else None
+    return PreSubmitValidator(get_security_validator(), geolocation)
+
+
+def get_presubmit_validator() -> Optional[PreSubmitValidator]:
+    """App-lifetime pipeline, or None when ATTENDANCE_PRESUBMIT_CHECKS is off"""
+    if not settings.ATTENDANCE_PRESUBMIT_CHECKS:
+        return None
+    return _presubmit_validator()
@@ -1,91 +1,163 @@
+import asyncio
 import qrcode
+import qrcode.image.svg
 import json
+import threading
+import time
 import uuid
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pytz import timezone
-from typing import Dict, Tuple
+from typing import Dict, Optional, Tuple
 from io import BytesIO
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
+from app.core.config import settings
 from app.models.session import Session
+from app.services.metrics import QR_RENDER_SECONDS
+
+# Output formats: PIL's black/white output is already a 1-bit PNG,
+# SVG is a single path element
+QR_MEDIA_TYPES = {
+    "png": "image/png",
+    "svg": "image/svg+xml"
+}
+
+def render_qr(data: str, image_format: str = "png") -> bytes:
+    """
+    Render a QR code to image bytes. Module-level so it can run in a
+    process pool as well as a thread pool.
+    """
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=10,
+        border=4,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+
+    img_buffer = BytesIO()
+    if image_format == "svg":
+        img = qr.make_image(image_factory=qrcode.image.svg.SvgPathImage)
+        img.save(img_buffer)
+    else:
+        img = qr.make_image(fill_color="black", back_color="white")
+        img.save(img_buffer, format='PNG')
+    return img_buffer.getvalue()
+
+class RenderedQRCache:
+    """LRU cache of rendered QR images keyed by (payload, format)"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, data: str, image_format: str) -> Optional[bytes]:
+        with self._lock:
+            image = self._entries.get((data, image_format))
+            if image is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((data, image_format))
+            self.hits += 1
+            return image
+
+    def put(self, data: str, image_format: str, image: bytes) -> None:
+        with self._lock:
+            self._entries[(data, image_format)] = image
+            self._entries.move_to_end((data, image_format))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+qr_image_cache = RenderedQRCache(max_entries=settings.QR_IMAGE_CACHE_MAX_ENTRIES)
+
+_render_executor: Optional[Executor] = None
+_executor_lock = threading.Lock()
+
+def get_render_executor() -> Executor:
+    """QR rendering is CPU-bound, so it runs off the event loop"""
+    global _render_executor
+    with _executor_lock:
+        if _render_executor is None:
+            if settings.QR_RENDER_EXECUTOR == "process":
+                _render_executor = ProcessPoolExecutor(max_workers=settings.QR_RENDER_WORKERS)
+            else:
+                _render_executor = ThreadPoolExecutor(
+                    max_workers=settings.QR_RENDER_WORKERS,
+                    thread_name_prefix="qr-render"
+                )
+        return _render_executor
+
+def shutdown_render_executor() -> None:
+    global _render_executor
+    with _executor_lock:
+        if _render_executor is not None:
+            _render_executor.shutdown(wait=False, cancel_futures=True)
+            _render_executor = None
 
 class QRGenerator:
     def __init__(self, db_session: AsyncSession):
         self.db_session = db_session
         self.india_tz = timezone('Asia/Kolkata')
-        self.qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
 
-    async def generate_qr_code(self, data: str) -> BytesIO:
-        """Generate QR code and store session"""
+    async def generate_qr_code(self, data: str, image_format: str = "png") -> BytesIO:
+        """Render a QR code in the render pool, or return the cached image"""
         try:
-            # Generate QR image
-            self.qr.clear()
-            self.qr.add_data(data)
-            self.qr.make(fit=True)
-            img = self.qr.make_image(fill_color="black", back_color="white")
-            
-            # Convert to bytes
-            img_buffer = BytesIO()
-            img.save(img_buffer, format='PNG')
-            img_buffer.seek(0)
-            
-            return img_buffer
-            
+            image = qr_image_cache.get(data, image_format)
+            if image is None:
+                loop = asyncio.get_running_loop()
+                started = time.perf_counter()
+                image = await loop.run_in_executor(
+                    get_render_executor(), render_qr, data, image_format
+                )
+                QR_RENDER_SECONDS.labels(image_format).observe(time.perf_counter() - started)
+                qr_image_cache.put(data, image_format, image)
+
+            return BytesIO(image)
+
         except Exception as e:
             print(f"Error generating QR code: {str(e)}")
             raise
 
-    async def cleanup_expired_sessions(self):
-        current_time = datetime.utcnow()
-        query = delete(Session).where(Session.expires_at < current_time)
-        await self.db_session.execute(query)
-        await self.db_session.commit()
-
     async def create_new_session(self, expiry_seconds: int) -> Tuple[str, BytesIO]:
-        # Cleanup expired sessions first
-        await self.cleanup_expired_sessions()
-        
+        # Expired sessions are removed by the background SessionReaper
         session_id = self.generate_session_id()
-        
+
         # Get current time in IST
         timestamp = datetime.now(self.india_tz)
         expiry_time = timestamp + timedelta(seconds=expiry_seconds)
-        
+
         # Create QR data with timezone info
         qr_data = {
             "session_id": session_id,
             "timestamp": timestamp.isoformat(),
             "expiry_time": expiry_time.isoformat()
         }
-        
+
         # Convert to naive datetime for PostgreSQL storage
         new_session = Session(
             session_id=session_id,
-            data=json.dumps(qr_data),
             created_at=timestamp.replace(tzinfo=None),
             expires_at=expiry_time.replace(tzinfo=None)
         )
-        
+
         self.db_session.add(new_session)
         await self.db_session.commit()
-        
+
         self._current_session_id = session_id
         self._current_qr_data = qr_data
-        
-        return session_id, self.generate_qr_code(qr_data)
+
+        return session_id, await self.generate_qr_code(json.dumps(qr_data))
 
     async def get_current_session(self) -> Tuple[str, Dict]:
         if not self._current_session_id or not self._current_qr_data:
             return None, None
         return self._current_session_id, self._current_qr_data
-
-
-
-
-
-
@@ -0,0 +1,231 @@
+import json
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Sequence, Tuple
+from urllib.parse import parse_qs
+from starlette.routing import Match
+from starlette.types import ASGIApp, Receive, Scope, Send
+from app.core.config import settings
+from app.utils.asgi import get_client_ip
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimit(NamedTuple):
+    """A bucket of `requests` tokens that refills completely every `seconds`"""
+    requests: int
+    seconds: float
+
+    @property
+    def rate(self) -> float:
+        return self.requests / self.seconds
+
+    @classmethod
+    def parse(cls, value: str) -> Optional["RateLimit"]:
+        """"30/60" is 30 requests per 60 seconds; empty or "0/..." disables the limit"""
+        if not value.strip():
+            return None
+        requests, _, seconds = value.partition("/")
+        limit = cls(int(requests), float(seconds or 1))
+        if limit.requests <= 0 or limit.seconds <= 0:
+            return None
+        return limit
+
+
+def take_token(tokens: float, updated: float, now: float, limit: RateLimit) -> Tuple[float, float]:
+    """
+    Refill a bucket for the time since `updated` and take one token.
+    Returns (tokens left, seconds until a token is available); the wait is
+    0 when the token was taken.
+    """
+    tokens = min(limit.requests, tokens + max(0.0, now - updated) * limit.rate)
+    if tokens >= 1:
+        return tokens - 1, 0.0
+    return tokens, (1 - tokens) / limit.rate
+
+
+class InMemoryBuckets:
+    """
+    Token buckets for this worker only, in a bounded LRU. An evicted bucket
+    was idle the longest, and a fresh one starts full, which is what it
+    would have refilled to anyway in most cases.
+    """
+
+    def __init__(self, max_entries: int = 100000):
+        self.max_entries = max_entries
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def take(self, key: str, limit: RateLimit) -> float:
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (limit.requests, now))
+        tokens, wait = take_token(tokens, updated, now, limit)
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_entries:
+            self._buckets.popitem(last=False)
+        return wait
+
+    async def close(self) -> None:
+        pass
+
+
+# Same arithmetic as take_token, run atomically inside Redis
+_TAKE_TOKEN_SCRIPT = """
+local requests = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or requests
+local updated = tonumber(state[2]) or now
+tokens = math.min(requests, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(requests / rate * 1000))
+return tostring(wait)
+"""
+
+
+class RedisBuckets:
+    """
+    Token buckets shared by every worker through Redis. Each take is one
+    script call; the key expires once the bucket would be full again. If
+    Redis is unreachable requests are let through rather than failing
+    check-ins, and the error is logged.
+    """
+
+    def __init__(self, client, prefix: str = "ratelimit:"):
+        self.client = client
+        self.prefix = prefix
+        self._script = client.register_script(_TAKE_TOKEN_SCRIPT)
+
+    async def take(self, key: str, limit: RateLimit) -> float:
+        try:
+            wait = await self._script(
+                keys=[self.prefix + key],
+                args=[limit.requests, limit.rate, time.time()]
+            )
+        except Exception as e:
+            logger.warning(f"Rate limit backend unavailable, allowing request: {str(e)}")
+            return 0.0
+        return float(wait)
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+class RateLimitRule(NamedTuple):
+    name: str
+    limit: RateLimit
+    # Route templates the rule applies to; empty for every route
+    paths: Tuple[str, ...] = ()
+    # Key on the session_id path/query parameter instead of the client IP
+    per_session: bool = False
+
+
+class RateLimitMiddleware:
+    """
+    Pure ASGI admission control in front of the routes. Every matching rule
+    takes a token from its bucket (keyed by client IP, or by session for
+    per-session rules); if any bucket is empty the request is answered with
+    429 and a Retry-After header before the route runs. Behind a proxy, set
+    trusted_hops so the client IP comes from X-Forwarded-For.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        buckets,
+        rules: Sequence[RateLimitRule],
+        exempt_paths: Sequence[str] = (),
+        trusted_hops: int = 0
+    ):
+        self.app = app
+        self.buckets = buckets
+        self.rules = list(rules)
+        self.exempt_paths = set(exempt_paths)
+        self.trusted_hops = trusted_hops
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.rules or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        wait = await self.admit(scope)
+        if wait > 0:
+            await _send_too_many_requests(send, wait)
+            return
+        await self.app(scope, receive, send)
+
+    async def admit(self, scope: Scope) -> float:
+        """Seconds the client has to wait; 0 when the request is admitted"""
+        template, path_params = _match_route(scope["app"], scope)
+        client_ip = get_client_ip(scope, self.trusted_hops) or "unknown"
+        wait = 0.0
+        for rule in self.rules:
+            if rule.paths and template not in rule.paths:
+                continue
+            if rule.per_session:
+                session_id = path_params.get("session_id") or _query_param(scope, "session_id")
+                if not session_id:
+                    continue
+                key = f"{rule.name}:{session_id}"
+            else:
+                key = f"{rule.name}:{client_ip}"
+            wait = max(wait, await self.buckets.take(key, rule.limit))
+        return wait
+
+
+def _match_route(app, scope: Scope) -> Tuple[Optional[str], Dict[str, str]]:
+    for route in app.router.routes:
+        match, child_scope = route.matches(scope)
+        if match == Match.FULL:
+            return route.path, child_scope.get("path_params", {})
+    return None, {}
+
+
+def _query_param(scope: Scope, name: str) -> Optional[str]:
+    values = parse_qs(scope.get("query_string", b"").decode("latin-1")).get(name)
+    return values[0] if values else None
+
+
+async def _send_too_many_requests(send: Send, wait: float) -> None:
+    body = json.dumps({"detail": "Too many requests"}).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": 429,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("latin-1")),
+            (b"retry-after", str(max(1, math.ceil(wait))).encode("latin-1"))
+        ]
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def default_rules() -> Sequence[RateLimitRule]:
+    candidates = [
+        ("ip", RateLimit.parse(settings.RATE_LIMIT_PER_IP), (), False),
+        ("qr_create", RateLimit.parse(settings.RATE_LIMIT_QR_CREATE), ("/api/qr/generate", "/api/qr/lecture"), False),
+        ("session", RateLimit.parse(settings.RATE_LIMIT_PER_SESSION), ("/api/qr/lecture/{session_id}",), True)
+    ]
+    return [RateLimitRule(name, limit, paths, per_session) for name, limit, paths, per_session in candidates if limit]
+
+
+def get_rate_limit_buckets():
+    backend = settings.RATE_LIMIT_BACKEND.lower()
+    if backend == "memory":
+        return InMemoryBuckets(settings.RATE_LIMIT_MAX_BUCKETS)
+    if backend == "redis":
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError:
+            raise RuntimeError("redis is required for the redis rate limit backend")
+        return RedisBuckets(redis_asyncio.from_url(settings.RATE_LIMIT_REDIS_URL, socket_timeout=0.5))
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {settings.RATE_LIMIT_BACKEND}")
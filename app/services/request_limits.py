@@ -0,0 +1,88 @@
+import json
+from typing import Dict, Optional
+from starlette.exceptions import HTTPException
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.utils.asgi import get_content_length
+
+TOO_LARGE_DETAIL = "Request body too large"
+
+
+class RequestTooLarge(HTTPException):
+    """
+    Raised from receive() once a body passes its limit. It is an
+    HTTPException, so FastAPI's body parsing re-raises it and the app
+    answers 413 itself.
+    """
+
+    def __init__(self):
+        super().__init__(status_code=413, detail=TOO_LARGE_DETAIL)
+
+
+class BodySizeLimitMiddleware:
+    """
+    Pure ASGI middleware that caps request bodies per path. A declared
+    Content-Length over the limit is answered with 413 before any of the
+    body is read; chunked or understated bodies are counted as they stream
+    in and cut off as soon as they pass the limit, so an oversized upload
+    is never buffered in full.
+    """
+
+    def __init__(self, app: ASGIApp, default_limit: int, limits: Optional[Dict[str, int]] = None):
+        self.app = app
+        self.default_limit = default_limit
+        self.limits = limits or {}
+
+    def limit_for(self, path: str) -> int:
+        return self.limits.get(path, self.default_limit)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.limit_for(scope["path"])
+        content_length = get_content_length(scope)
+        if content_length is not None and content_length > limit:
+            await _send_too_large(send)
+            return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise RequestTooLarge()
+            return message
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, send_wrapper)
+        except RequestTooLarge:
+            # Read outside FastAPI's body parsing, e.g. by a raw request.stream()
+            if response_started:
+                raise
+            await _send_too_large(send)
+
+
+async def _send_too_large(send: Send) -> None:
+    body = json.dumps({"detail": TOO_LARGE_DETAIL}).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": 413,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("latin-1")),
+            # The unread body is left on the socket, so do not reuse it
+            (b"connection", b"close")
+        ]
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,260 @@
+"""
+Class roster: the students expected to submit attendance.
+
+The roster table is mirrored in every worker as a dict keyed by roll
+number, so a submission is checked with one lookup and no query. Each
+worker refreshes its copy incrementally from roster.updated_at. Import a
+CSV (roll_number, full_name, branch, section and an optional active
+column) with:
+
+    python -m app.services.roster roster.csv
+"""
+import argparse
+import asyncio
+import csv
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, NamedTuple, Optional
+from sqlalchemy import insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.models.roster import RosterEntry
+
+logger = logging.getLogger(__name__)
+
+ROSTER_COLUMNS = ("roll_number", "full_name", "branch", "section")
+_INACTIVE = {"0", "false", "no", "n", "inactive"}
+
+
+def normalize_roll_number(roll_number: str) -> str:
+    return roll_number.strip().upper()
+
+
+def _same(a: str, b: str) -> bool:
+    return a.strip().casefold() == b.strip().casefold()
+
+
+class RosterStudent(NamedTuple):
+    roll_number: str
+    full_name: str
+    branch: str
+    section: str
+
+
+class RosterIndex:
+    """
+    In-memory copy of the active roster, keyed by normalized roll number.
+    refresh() only reads rows changed since the newest updated_at already
+    applied, minus `overlap` seconds so an import that committed late or on
+    a host with a slower clock is not missed. Re-reading rows is harmless
+    because applying a row is idempotent.
+    """
+
+    def __init__(self, overlap: float = 60):
+        self.overlap = overlap
+        self._students: Dict[str, RosterStudent] = {}
+        self.watermark: Optional[datetime] = None
+        self.refreshes = 0
+
+    def __len__(self) -> int:
+        return len(self._students)
+
+    def get(self, roll_number: str) -> Optional[RosterStudent]:
+        return self._students.get(normalize_roll_number(roll_number))
+
+    def apply(self, rows: Iterable) -> int:
+        """Upsert or remove rows with RosterEntry's columns; returns how many were applied"""
+        applied = 0
+        for row in rows:
+            if row.active:
+                self._students[row.roll_number] = RosterStudent(
+                    row.roll_number, row.full_name, row.branch, row.section
+                )
+            else:
+                self._students.pop(row.roll_number, None)
+            if self.watermark is None or row.updated_at > self.watermark:
+                self.watermark = row.updated_at
+            applied += 1
+        return applied
+
+    async def refresh(self, db: AsyncSession) -> int:
+        query = select(
+            RosterEntry.roll_number,
+            RosterEntry.full_name,
+            RosterEntry.branch,
+            RosterEntry.section,
+            RosterEntry.active,
+            RosterEntry.updated_at
+        ).order_by(RosterEntry.updated_at)
+        if self.watermark is not None:
+            query = query.where(RosterEntry.updated_at >= self.watermark - timedelta(seconds=self.overlap))
+        applied = self.apply((await db.execute(query)).all())
+        self.refreshes += 1
+        return applied
+
+    def check(self, roll_number: str, branch: str, section: str, session=None) -> Optional[str]:
+        """
+        None if the submission matches the roster and the session's expected
+        class, otherwise the reason it does not. An empty roster checks nothing.
+        """
+        if not self._students:
+            return None
+        student = self.get(roll_number)
+        if student is None:
+            return "Roll number is not on the class roster"
+        if not (_same(student.branch, branch) and _same(student.section, section)):
+            return "Branch or section does not match the class roster"
+        if session is not None:
+            if session.branch and not _same(student.branch, session.branch):
+                return "This session is for a different branch"
+            if session.section and not _same(student.section, session.section):
+                return "This session is for a different section"
+        return None
+
+
+def parse_roster_csv(lines: Iterable[str]) -> Iterator[dict]:
+    """
+    Rows of a roster CSV with a header line; raises ValueError on a malformed
+    row, including a value longer than its roster column
+    """
+    reader = csv.DictReader(lines)
+    missing = [column for column in ROSTER_COLUMNS if column not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f"Roster CSV is missing columns: {', '.join(missing)}")
+    for row in reader:
+        values = {column: (row[column] or "").strip() for column in ROSTER_COLUMNS}
+        if not all(values.values()):
+            raise ValueError(f"Roster CSV line {reader.line_num} has an empty field")
+        for column in ROSTER_COLUMNS:
+            length = RosterEntry.__table__.c[column].type.length
+            if len(values[column]) > length:
+                raise ValueError(f"Roster CSV line {reader.line_num}: {column} is longer than {length} characters")
+        values["roll_number"] = normalize_roll_number(values["roll_number"])
+        values["active"] = (row.get("active") or "").strip().lower() not in _INACTIVE
+        yield values
+
+
+def _upsert(dialect_name: str):
+    if dialect_name == "postgresql":
+        statement = postgresql.insert(RosterEntry)
+    elif dialect_name == "sqlite":
+        statement = sqlite.insert(RosterEntry)
+    else:
+        return insert(RosterEntry)
+    return statement.on_conflict_do_update(
+        index_elements=[RosterEntry.roll_number],
+        set_={
+            "full_name": statement.excluded.full_name,
+            "branch": statement.excluded.branch,
+            "section": statement.excluded.section,
+            "active": statement.excluded.active,
+            "updated_at": statement.excluded.updated_at
+        }
+    )
+
+
+async def import_roster(db: AsyncSession, rows: Iterable[dict], batch_size: int = 1000) -> int:
+    """
+    Upsert roster rows in batches of batch_size, all in one transaction, so
+    a failure part-way leaves the roster as it was. Returns the number of
+    rows written.
+    """
+    statement = _upsert(db.bind.dialect.name)
+    # A roll number listed twice keeps its last row; one upsert cannot touch a row twice
+    unique_rows = list({row["roll_number"]: row for row in rows}.values())
+    updated_at = datetime.utcnow()
+    try:
+        for start in range(0, len(unique_rows), batch_size):
+            batch = unique_rows[start:start + batch_size]
+            await db.execute(statement, [dict(row, updated_at=updated_at) for row in batch])
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    return len(unique_rows)
+
+
+roster_index = RosterIndex()
+
+
+def get_roster_index() -> Optional[RosterIndex]:
+    return roster_index if settings.ROSTER_CHECKS else None
+
+
+class RosterRefresher:
+    """Keeps a worker's roster index current by polling roster.updated_at"""
+
+    def __init__(self, session_factory, index: RosterIndex, interval: float = 30):
+        self.session_factory = session_factory
+        self.index = index
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self._task is None:
+            # Load the full roster before the first request is served
+            await self.refresh()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def refresh(self) -> None:
+        try:
+            async with self.session_factory() as db:
+                applied = await self.index.refresh(db)
+            if applied:
+                logger.info(f"Roster index refreshed: {applied} changes, {len(self.index)} students")
+        except Exception as e:
+            logger.error(f"Roster refresh failed: {str(e)}")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.refresh()
+
+
+roster_refresher: Optional[RosterRefresher] = None
+
+
+async def start_roster_refresher() -> None:
+    global roster_refresher
+    if not settings.ROSTER_CHECKS or roster_refresher is not None:
+        return
+    from app.services.database import AsyncSessionLocal
+
+    roster_refresher = RosterRefresher(AsyncSessionLocal, roster_index, settings.ROSTER_REFRESH_SECONDS)
+    await roster_refresher.start()
+
+
+async def stop_roster_refresher() -> None:
+    global roster_refresher
+    if roster_refresher is not None:
+        await roster_refresher.stop()
+        roster_refresher = None
+
+
+async def main(path: str) -> None:
+    from app.services.database import AsyncSessionLocal
+
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        # Parse everything first, so a bad line leaves the table untouched
+        rows = list(parse_roster_csv(f))
+    async with AsyncSessionLocal() as db:
+        written = await import_roster(db, rows)
+    print(f"Imported {written} roster rows")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("csv_file")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(args.csv_file))
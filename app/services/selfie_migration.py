@@ -0,0 +1,86 @@
+"""
+Moves legacy inline selfies out of the attendance table into the blob store.
+
+Run after `alembic upgrade head`:
+
+    python -m app.services.selfie_migration [--batch-size 100]
+
+Rows are processed in id order in small batches, and each batch is committed
+on its own, so the script can be stopped and re-run at any point.
+"""
+import argparse
+import asyncio
+import logging
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.attendance import Attendance
+from app.services.blob_storage import BlobStorage, get_blob_storage
+from app.utils.selfie import decode_data_url
+
+logger = logging.getLogger(__name__)
+
+
+async def migrate_legacy_selfies(
+    db: AsyncSession,
+    blob_storage: BlobStorage,
+    batch_size: int = 100
+) -> int:
+    """Returns the number of rows moved to the blob store"""
+    migrated = 0
+    last_id = 0
+    while True:
+        query = (
+            select(Attendance.id, Attendance.selfie_data)
+            .where(
+                Attendance.id > last_id,
+                Attendance.selfie_key.is_(None),
+                Attendance.selfie_data.is_not(None)
+            )
+            .order_by(Attendance.id)
+            .limit(batch_size)
+        )
+        rows = (await db.execute(query)).all()
+        if not rows:
+            break
+
+        for row_id, selfie_data in rows:
+            last_id = row_id
+            try:
+                mime_type, selfie_bytes = decode_data_url(selfie_data)
+            except ValueError:
+                logger.warning(f"Skipping attendance {row_id}: undecodable selfie_data")
+                continue
+
+            selfie = await blob_storage.put(selfie_bytes, mime_type)
+            await db.execute(
+                update(Attendance)
+                .where(Attendance.id == row_id)
+                .values(
+                    selfie_key=selfie.key,
+                    selfie_size=selfie.size,
+                    selfie_mime_type=selfie.mime_type,
+                    selfie_data=None
+                )
+            )
+            migrated += 1
+
+        await db.commit()
+        logger.info(f"Migrated {migrated} selfies (last id {last_id})")
+
+    return migrated
+
+
+async def main(batch_size: int) -> None:
+    from app.services.database import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as db:
+        migrated = await migrate_legacy_selfies(db, get_blob_storage(), batch_size)
+    print(f"Moved {migrated} selfies to the blob store")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(args.batch_size))
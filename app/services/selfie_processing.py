@@ -0,0 +1,342 @@
+"""
+Recompresses stored selfies and makes review thumbnails in the background.
+
+Accepted submissions queue their selfie key; workers decode the image in a
+process pool, drop EXIF (after applying its rotation), downscale it, store
+the re-encoded image and a thumbnail, point the attendance rows at them and,
+a while later, delete the original if no row uses it any more. Rows that
+were missed, e.g. during a restart, can be processed with:
+
+    python -m app.services.selfie_processing [--batch-size 100]
+"""
+import argparse
+import asyncio
+import logging
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from io import BytesIO
+from typing import Callable, NamedTuple, Optional, Tuple
+from PIL import Image, ImageOps
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.models.attendance import Attendance
+from app.services.blob_storage import BlobNotFound, BlobRef, BlobStorage, get_blob_storage
+
+logger = logging.getLogger(__name__)
+
+IMAGE_FORMATS = {
+    "webp": ("WEBP", "image/webp"),
+    "jpeg": ("JPEG", "image/jpeg")
+}
+
+
+class ProcessedSelfie(NamedTuple):
+    image: bytes
+    thumbnail: bytes
+    mime_type: str
+
+
+def _encode(image: Image.Image, image_format: str, quality: int) -> bytes:
+    pil_format, _ = IMAGE_FORMATS[image_format]
+    buffer = BytesIO()
+    options = {"quality": quality}
+    if pil_format == "WEBP":
+        options["method"] = 4
+    else:
+        options.update(optimize=True, progressive=True)
+    # No exif= argument, so no metadata is written
+    image.save(buffer, format=pil_format, **options)
+    return buffer.getvalue()
+
+
+def process_image(
+    data: bytes,
+    max_dimension: int = 640,
+    thumbnail_dimension: int = 160,
+    image_format: str = "webp",
+    quality: int = 70
+) -> ProcessedSelfie:
+    """
+    Decode, upright and downscale one image. Module-level so it can run in
+    a process pool; raises PIL's errors for undecodable input.
+    """
+    with Image.open(BytesIO(data)) as original:
+        # Phones store rotation in EXIF; apply it before the metadata is dropped
+        image = ImageOps.exif_transpose(original).convert("RGB")
+    image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+    processed = _encode(image, image_format, quality)
+    image.thumbnail((thumbnail_dimension, thumbnail_dimension), Image.LANCZOS)
+    thumbnail = _encode(image, image_format, max(quality - 10, 30))
+    return ProcessedSelfie(processed, thumbnail, IMAGE_FORMATS[image_format][1])
+
+
+class SelfieJob(NamedTuple):
+    key: str
+    attempts: int = 0
+    # Set once the images are stored, so a retry only redoes the row update
+    result: Optional[Tuple[BlobRef, BlobRef]] = None
+
+
+class SelfieProcessor:
+    """
+    Bounded queue of selfie keys drained by `concurrency` tasks that hand
+    the CPU work to `executor`. A full queue drops the job (the backfill CLI
+    picks it up later) instead of slowing down submissions.
+
+    With write-behind inserts the row may not exist yet when a job runs; the
+    job is then retried after retry_delay, and the original is deleted only
+    once a row points at the processed image.
+
+    Blob keys are content hashes, so a resubmission of the same photo shares
+    the original's key and may still be in a request or the write-behind
+    queue when its twin is processed. Originals are therefore deleted
+    delete_delay seconds later, and only if no row references them by then;
+    a row that does gets its own job, which deletes the original after it.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable,
+        blob_storage: BlobStorage,
+        executor: Executor,
+        concurrency: int = 2,
+        max_queue_size: int = 1000,
+        max_attempts: int = 5,
+        retry_delay: float = 2.0,
+        delete_original: bool = True,
+        delete_delay: float = 300
+    ):
+        self.session_factory = session_factory
+        self.blob_storage = blob_storage
+        self.executor = executor
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.delete_original = delete_original
+        self.delete_delay = delete_delay
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        # (monotonic due time, original key), due times in order
+        self.deletions: asyncio.Queue = asyncio.Queue()
+        self.processed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._tasks = []
+
+    async def start(self) -> None:
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._run()) for _ in range(self.concurrency)]
+            self._tasks.append(asyncio.create_task(self._run_deletions()))
+
+    async def stop(self) -> None:
+        if self.deletions.qsize():
+            # Kept, not lost: an unreferenced original only costs storage
+            logger.info(f"Keeping {self.deletions.qsize()} originals that were not yet due for deletion")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, key: str) -> None:
+        self._put(SelfieJob(key))
+
+    def _put(self, job: SelfieJob) -> None:
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    def stats(self):
+        return {
+            "queued": self.queue.qsize(),
+            "processed": self.processed,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out
+        }
+
+    async def _run(self) -> None:
+        while True:
+            job = await self.queue.get()
+            try:
+                await self.process(job)
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Failed to process selfie {job.key}: {str(e)}")
+            finally:
+                self.queue.task_done()
+
+    async def _run_deletions(self) -> None:
+        while True:
+            due, key = await self.deletions.get()
+            try:
+                await asyncio.sleep(due - time.monotonic())
+                await self.delete_if_unreferenced(key)
+            except Exception as e:
+                logger.error(f"Failed to delete original selfie {key}: {str(e)}")
+            finally:
+                self.deletions.task_done()
+
+    async def delete_if_unreferenced(self, key: str) -> bool:
+        """Delete an original no attendance row points at; returns whether it was deleted"""
+        async with self.session_factory() as db:
+            referenced = (await db.execute(
+                select(Attendance.id).where(Attendance.selfie_key == key).limit(1)
+            )).first()
+        if referenced is not None:
+            # A later submission with the same photo; its own job deletes the original
+            return False
+        await self.blob_storage.delete(key)
+        return True
+
+    async def process(self, job: SelfieJob) -> bool:
+        """Returns True once the rows point at the processed image"""
+        if job.result is None:
+            original = await self.blob_storage.get(job.key)
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(
+                self.executor,
+                process_image,
+                original,
+                settings.SELFIE_MAX_DIMENSION,
+                settings.SELFIE_THUMBNAIL_DIMENSION,
+                settings.SELFIE_IMAGE_FORMAT,
+                settings.SELFIE_QUALITY
+            )
+            image = await self.blob_storage.put(result.image, result.mime_type)
+            thumbnail = await self.blob_storage.put(result.thumbnail, result.mime_type)
+            self.bytes_in += len(original)
+            self.bytes_out += image.size
+            job = job._replace(result=(image, thumbnail))
+
+        image, thumbnail = job.result
+        async with self.session_factory() as db:
+            updated = await point_rows_at(db, job.key, image, thumbnail)
+
+        if not updated:
+            if job.attempts + 1 < self.max_attempts:
+                loop = asyncio.get_running_loop()
+                loop.call_later(self.retry_delay, self._put, job._replace(attempts=job.attempts + 1))
+            else:
+                logger.warning(f"No attendance row references selfie {job.key}; keeping the original")
+            return False
+
+        if self.delete_original and image.key != job.key:
+            if self.delete_delay > 0:
+                self.deletions.put_nowait((time.monotonic() + self.delete_delay, job.key))
+            else:
+                await self.delete_if_unreferenced(job.key)
+        self.processed += 1
+        return True
+
+
+async def point_rows_at(db: AsyncSession, original_key: str, image: BlobRef, thumbnail: BlobRef) -> int:
+    result = await db.execute(
+        update(Attendance)
+        .where(Attendance.selfie_key == original_key)
+        .values(
+            selfie_key=image.key,
+            selfie_size=image.size,
+            selfie_mime_type=image.mime_type,
+            selfie_thumbnail_key=thumbnail.key
+        )
+    )
+    await db.commit()
+    return result.rowcount
+
+
+selfie_processor: Optional[SelfieProcessor] = None
+
+
+def submit_selfie(key: str) -> None:
+    """Queue a stored selfie for processing; no-op when processing is off"""
+    if selfie_processor is not None:
+        selfie_processor.submit(key)
+
+
+async def start_selfie_processor() -> None:
+    global selfie_processor
+    if not settings.SELFIE_PROCESSING or selfie_processor is not None:
+        return
+    from app.services.database import AsyncSessionLocal
+
+    selfie_processor = SelfieProcessor(
+        session_factory=AsyncSessionLocal,
+        blob_storage=get_blob_storage(),
+        executor=ProcessPoolExecutor(max_workers=settings.SELFIE_PROCESS_WORKERS),
+        concurrency=settings.SELFIE_PROCESS_WORKERS,
+        max_queue_size=settings.SELFIE_PROCESS_QUEUE_SIZE,
+        delete_original=settings.SELFIE_DELETE_ORIGINAL,
+        delete_delay=settings.SELFIE_DELETE_DELAY_SECONDS
+    )
+    await selfie_processor.start()
+
+
+async def stop_selfie_processor() -> None:
+    global selfie_processor
+    if selfie_processor is not None:
+        await selfie_processor.stop()
+        selfie_processor.executor.shutdown(wait=False, cancel_futures=True)
+        logger.info(f"Selfie processor stopped: {selfie_processor.stats()}")
+        selfie_processor = None
+
+
+async def process_pending_selfies(processor: SelfieProcessor, db: AsyncSession, batch_size: int = 100) -> int:
+    """Process every stored selfie that has no thumbnail yet; returns the count"""
+    done = 0
+    last_id = 0
+    while True:
+        rows = (await db.execute(
+            select(Attendance.id, Attendance.selfie_key)
+            .where(
+                Attendance.id > last_id,
+                Attendance.selfie_key.is_not(None),
+                Attendance.selfie_thumbnail_key.is_(None)
+            )
+            .order_by(Attendance.id)
+            .limit(batch_size)
+        )).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        for key in dict.fromkeys(row.selfie_key for row in rows):
+            try:
+                # attempts=max_attempts: rows exist already, so never schedule a retry
+                if await processor.process(SelfieJob(key, attempts=processor.max_attempts)):
+                    done += 1
+            except BlobNotFound:
+                logger.warning(f"Selfie {key} is missing from the blob store")
+            except Exception as e:
+                logger.warning(f"Skipping selfie {key}: {str(e)}")
+        logger.info(f"Processed {done} selfies (last id {last_id})")
+    return done
+
+
+async def main(batch_size: int) -> None:
+    from app.services.database import AsyncSessionLocal
+
+    with ProcessPoolExecutor(max_workers=settings.SELFIE_PROCESS_WORKERS) as executor:
+        processor = SelfieProcessor(
+            AsyncSessionLocal,
+            get_blob_storage(),
+            executor,
+            delete_original=settings.SELFIE_DELETE_ORIGINAL,
+            delete_delay=settings.SELFIE_DELETE_DELAY_SECONDS
+        )
+        await processor.start()
+        async with AsyncSessionLocal() as db:
+            done = await process_pending_selfies(processor, db, batch_size)
+        print(f"Processed {done} selfies; deleting originals once they are due")
+        await processor.deletions.join()
+        await processor.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(args.batch_size))
@@ -1,34 +1,141 @@
+from collections import OrderedDict
 from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
+from sqlalchemy import select
+from app.core.config import settings
 from app.models.session import Session
-import json
-from typing import Dict, Optional
+from app.services.metrics import SESSION_CACHE_LOOKUPS
+import threading
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
 from pytz import timezone
 
+class CachedSession(NamedTuple):
+    session_id: str
+    expires_at: datetime  # naive UTC, same as Session.expires_at
+    # Key for rotating QR tokens, decoded from Session.token_secret
+    token_secret: Optional[bytes] = None
+    # Expected class, checked against the roster when set
+    branch: Optional[str] = None
+    section: Optional[str] = None
+
+    @property
+    def requires_token(self) -> bool:
+        """Lecture sessions only accept submissions carrying a rotating QR token"""
+        return self.token_secret is not None
+
+    @classmethod
+    def from_row(cls, row) -> "CachedSession":
+        return cls(
+            session_id=row.session_id,
+            expires_at=row.expires_at,
+            token_secret=bytes.fromhex(row.token_secret) if row.token_secret else None,
+            branch=row.branch,
+            section=row.section
+        )
+
+class SessionCache:
+    """
+    Bounded LRU cache of session expiry times. An entry lives for at most
+    ttl_seconds and never past the session's own expires_at, so a hit is
+    always a session that is still valid.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 60):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[CachedSession, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, session_id: str) -> Optional[CachedSession]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                self.misses += 1
+                SESSION_CACHE_LOOKUPS.labels("miss").inc()
+                return None
+            session, deadline = entry
+            if now >= deadline:
+                del self._entries[session_id]
+                self.misses += 1
+                SESSION_CACHE_LOOKUPS.labels("miss").inc()
+                return None
+            self._entries.move_to_end(session_id)
+            self.hits += 1
+            SESSION_CACHE_LOOKUPS.labels("hit").inc()
+            return session
+
+    def put(self, session: CachedSession) -> None:
+        remaining = (session.expires_at - datetime.utcnow()).total_seconds()
+        if remaining <= 0:
+            return
+        deadline = time.monotonic() + min(self.ttl_seconds, remaining)
+        with self._lock:
+            self._entries[session.session_id] = (session, deadline)
+            self._entries.move_to_end(session.session_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, session_id: str) -> None:
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0
+            }
+
+session_cache = SessionCache(
+    max_entries=settings.SESSION_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.SESSION_CACHE_TTL_SECONDS
+)
+
 class SessionManager:
     def __init__(self, db_session: AsyncSession):
         self.db_session = db_session
         self.india_tz = timezone('Asia/Kolkata')
 
-    async def validate_session(self, session_id: str) -> tuple[bool, str]:
-        query = select(Session).where(Session.session_id == session_id)
+    async def lookup_session(self, session_id: str) -> Optional[CachedSession]:
+        """Get a session's expiry, from the session cache when possible"""
+        cached = session_cache.get(session_id)
+        if cached is not None:
+            return cached
+
+        # Primary-key lookup of typed columns; no JSON is parsed
+        query = select(
+            Session.session_id, Session.expires_at, Session.token_secret, Session.branch, Session.section
+        ).where(Session.session_id == session_id)
         result = await self.db_session.execute(query)
-        session = result.scalar_one_or_none()
+        row = result.one_or_none()
+        if row is None:
+            return None
+
+        session = CachedSession.from_row(row)
+        session_cache.put(session)
+        return session
+
+    async def validate_session(self, session_id: str) -> tuple[bool, str]:
+        session = await self.lookup_session(session_id)
 
         if not session:
             return False, "Session not found"
 
-        session_data = json.loads(session.data)
-        expiry_time = datetime.fromisoformat(session_data["expiry_time"])
-        current_time = datetime.now(self.india_tz)
-
-        if current_time > expiry_time:
-            # Clean up expired session
-            await self.db_session.execute(
-                delete(Session).where(Session.session_id == session_id)
-            )
-            await self.db_session.commit()
+        if session.expires_at < datetime.utcnow():
+            # Expired rows are removed by the background SessionReaper
             return False, "Session expired"
 
         return True, "Session valid"
@@ -39,40 +146,6 @@ class SessionManager:
         result = await self.db_session.execute(query)
         return result.scalar_one_or_none()
 
-    async def store_attendance(self, session_id: str, attendance_data: Dict) -> bool:
-        try:
-            # Get existing session
-            session = await self.get_session(session_id)
-            if not session:
-                print(f"Session {session_id} not found")
-                return False
-            
-            # Update the session data to include attendance
-            current_data = json.loads(session.data)
-            current_data['attendance'] = attendance_data
-            current_data['attendance_timestamp'] = datetime.now(self.india_tz).isoformat()
-            
-            # Update session in database
-            session.data = json.dumps(current_data)
-            await self.db_session.commit()
-            
-            print(f"Successfully stored attendance for session {session_id}")
-            return True
-            
-        except Exception as e:
-            print(f"Error storing attendance: {str(e)}")
-            await self.db_session.rollback()
-            return False
-
-    async def get_attendance_data(self, session_id: str) -> Optional[Dict]:
-        """Get attendance data from session"""
-        session = await self.get_session(session_id)
-        if not session:
-            return None
-            
-        session_data = json.loads(session.data)
-        return session_data.get('attendance')
-
     async def end_session(self, session_id: str) -> bool:
         session_key = f"session:{session_id}"
         attendance_key = f"attendance:{session_id}"
@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Dict, NamedTuple, Optional
+from sqlalchemy import delete, exists, select, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from app.core.config import settings
+from app.models.attendance import Attendance
+from app.models.session import Session
+
+logger = logging.getLogger(__name__)
+
+# Postgres advisory lock key shared by every worker's reaper
+REAPER_LOCK_ID = 720_431_005
+
+
+class SweepResult(NamedTuple):
+    removed: int
+    duration: float
+    skipped: bool
+
+
+class SessionReaper:
+    """
+    Periodically deletes expired sessions in bounded batches, off the request
+    path. On Postgres, a session-level advisory lock makes sure only one
+    gunicorn worker sweeps at a time; the others skip that round.
+
+    Sessions that still have attendance rows are never deleted, because the
+    attendance foreign key cascades on delete.
+    """
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        interval: float = 300,
+        batch_size: int = 500,
+        max_batches: int = 20,
+        grace_seconds: float = 3600
+    ):
+        self.engine = engine
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self.grace_seconds = grace_seconds
+        self.sweeps = 0
+        self.total_removed = 0
+        self.last_result: Optional[SweepResult] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, float]:
+        last = self.last_result
+        return {
+            "sweeps": self.sweeps,
+            "total_removed": self.total_removed,
+            "last_removed": last.removed if last else 0,
+            "last_duration_seconds": last.duration if last else 0.0,
+            "last_skipped": bool(last and last.skipped)
+        }
+
+    async def sweep(self) -> SweepResult:
+        started = time.perf_counter()
+        removed = 0
+        use_lock = self.engine.dialect.name == "postgresql"
+
+        async with self.engine.connect() as conn:
+            if use_lock:
+                locked = (await conn.execute(
+                    text("SELECT pg_try_advisory_lock(:lock_id)"), {"lock_id": REAPER_LOCK_ID}
+                )).scalar()
+                await conn.commit()
+                if not locked:
+                    result = SweepResult(removed=0, duration=time.perf_counter() - started, skipped=True)
+                    self.last_result = result
+                    return result
+
+            try:
+                cutoff = datetime.utcnow() - timedelta(seconds=self.grace_seconds)
+                expired = (
+                    select(Session.session_id)
+                    .where(Session.expires_at < cutoff)
+                    .where(~exists().where(Attendance.session_id == Session.session_id))
+                    .limit(self.batch_size)
+                )
+                for _ in range(self.max_batches):
+                    # One short transaction per batch keeps row locks brief
+                    result = await conn.execute(
+                        delete(Session)
+                        .where(Session.session_id.in_(expired))
+                        .execution_options(synchronize_session=False)
+                    )
+                    await conn.commit()
+                    removed += result.rowcount
+                    if result.rowcount < self.batch_size:
+                        break
+            finally:
+                if use_lock:
+                    await conn.execute(
+                        text("SELECT pg_advisory_unlock(:lock_id)"), {"lock_id": REAPER_LOCK_ID}
+                    )
+                    await conn.commit()
+
+        result = SweepResult(removed=removed, duration=time.perf_counter() - started, skipped=False)
+        self.sweeps += 1
+        self.total_removed += removed
+        self.last_result = result
+        return result
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                result = await self.sweep()
+                if not result.skipped:
+                    logger.info(
+                        f"Session reaper removed {result.removed} expired sessions "
+                        f"in {result.duration * 1000:.1f} ms"
+                    )
+            except Exception as e:
+                logger.error(f"Session reaper sweep failed: {str(e)}", exc_info=True)
+            await asyncio.sleep(self.interval)
+
+
+session_reaper: Optional[SessionReaper] = None
+
+
+async def start_session_reaper() -> None:
+    global session_reaper
+    if not settings.SESSION_REAPER_ENABLED or session_reaper is not None:
+        return
+    from app.services.database import engine
+
+    # Offline sync accepts rows for sessions that expired up to BULK_SYNC_MAX_DELAY_SECONDS ago
+    grace_seconds = settings.SESSION_REAPER_GRACE_SECONDS
+    if grace_seconds < settings.BULK_SYNC_MAX_DELAY_SECONDS:
+        logger.warning(
+            f"SESSION_REAPER_GRACE_SECONDS={grace_seconds:g} is shorter than the offline sync window; "
+            f"keeping expired sessions for {settings.BULK_SYNC_MAX_DELAY_SECONDS:g}s instead"
+        )
+        grace_seconds = settings.BULK_SYNC_MAX_DELAY_SECONDS
+
+    session_reaper = SessionReaper(
+        engine,
+        interval=settings.SESSION_REAPER_INTERVAL_SECONDS,
+        batch_size=settings.SESSION_REAPER_BATCH_SIZE,
+        max_batches=settings.SESSION_REAPER_MAX_BATCHES,
+        grace_seconds=grace_seconds
+    )
+    await session_reaper.start()
+
+
+async def stop_session_reaper() -> None:
+    global session_reaper
+    if session_reaper is not None:
+        await session_reaper.stop()
+        session_reaper = None
@@ -0,0 +1,30 @@
+from typing import Optional
+from starlette.types import Scope
+
+
+def get_content_length(scope: Scope) -> Optional[int]:
+    """The request's Content-Length header, or None when it is missing or not a number"""
+    for name, value in scope["headers"]:
+        if name == b"content-length":
+            try:
+                return int(value)
+            except ValueError:
+                return None
+    return None
+
+
+def get_client_ip(scope: Scope, trusted_hops: int = 0) -> Optional[str]:
+    """
+    The client's address. Behind `trusted_hops` proxies, each appending the
+    address it was connected from to X-Forwarded-For, it is the entry that
+    many places from the right; anything further left was sent by the
+    client and could be forged.
+    """
+    if trusted_hops > 0:
+        for name, value in scope["headers"]:
+            if name == b"x-forwarded-for":
+                hops = [hop.strip() for hop in value.decode("latin-1").split(",") if hop.strip()]
+                if hops:
+                    return hops[-min(trusted_hops, len(hops))]
+    client = scope.get("client")
+    return client[0] if client else None
@@ -0,0 +1,78 @@
+import base64
+import binascii
+import hashlib
+import hmac
+import os
+import secrets
+import struct
+import time
+import uuid
+from typing import Optional
+
+# Token layout before base64url: session UUID (16) | window (4) | nonce (4) | MAC (12)
+_PAYLOAD = struct.Struct(">16sI4s")
+_MAC_BYTES = 12
+_TOKEN_BYTES = _PAYLOAD.size + _MAC_BYTES
+
+
+class InvalidToken(ValueError):
+    pass
+
+
+class ExpiredToken(InvalidToken):
+    pass
+
+
+def new_session_secret() -> str:
+    """Random per-session signing key, hex encoded for Session.token_secret"""
+    return secrets.token_hex(32)
+
+
+def current_window(rotate_seconds: int, now: Optional[float] = None) -> int:
+    """Index of the rotation window containing `now` (unix seconds)"""
+    if now is None:
+        now = time.time()
+    return int(now // rotate_seconds)
+
+
+def _mac(secret: bytes, payload: bytes) -> bytes:
+    return hmac.new(secret, payload, hashlib.sha256).digest()[:_MAC_BYTES]
+
+
+def issue_token(secret: bytes, session_id: str, window: int) -> str:
+    """
+    Sign a compact QR token for a session and rotation window. The nonce
+    makes every issued token unique even within one window.
+    """
+    payload = _PAYLOAD.pack(uuid.UUID(session_id).bytes, window, os.urandom(4))
+    token = payload + _mac(secret, payload)
+    return base64.urlsafe_b64encode(token).rstrip(b"=").decode("ascii")
+
+
+def verify_token(
+    secret: bytes,
+    token: str,
+    rotate_seconds: int,
+    skew_windows: int = 1,
+    now: Optional[float] = None
+) -> str:
+    """
+    Check a token's signature and window, CPU only. Returns the session id.
+    Raises InvalidToken, or ExpiredToken if the window is more than
+    skew_windows away from the current one.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+    except (binascii.Error, ValueError):
+        raise InvalidToken("Malformed token")
+    if len(raw) != _TOKEN_BYTES:
+        raise InvalidToken("Malformed token")
+
+    payload, mac = raw[:_PAYLOAD.size], raw[_PAYLOAD.size:]
+    if not hmac.compare_digest(mac, _mac(secret, payload)):
+        raise InvalidToken("Bad token signature")
+
+    session_bytes, window, _nonce = _PAYLOAD.unpack(payload)
+    if abs(current_window(rotate_seconds, now) - window) > skew_windows:
+        raise ExpiredToken("Token expired")
+    return str(uuid.UUID(bytes=session_bytes))
@@ -0,0 +1,75 @@
+import base64
+import binascii
+import re
+from typing import Optional, Tuple
+
+
+def split_data_url(data_url: str) -> Tuple[str, str]:
+    """
+    Split a "data:image/...;base64,<payload>" string into (mime_type, payload)
+    Raises ValueError if the string is not a base64 image data URL
+    """
+    if not data_url.startswith('data:image'):
+        raise ValueError('Invalid image format. Must be a base64 encoded image.')
+    header, sep, payload = data_url.partition(',')
+    if not sep or not header.endswith(';base64'):
+        raise ValueError('Invalid base64 image data')
+    mime_type = header[len('data:'):-len(';base64')]
+    return mime_type, payload
+
+
+def decode_data_url(data_url: str) -> Tuple[str, bytes]:
+    """Decode a base64 image data URL into (mime_type, raw_bytes)"""
+    mime_type, payload = split_data_url(data_url)
+    try:
+        return mime_type, base64.b64decode(payload, validate=True)
+    except (binascii.Error, ValueError):
+        raise ValueError('Invalid base64 image data')
+
+
+def sniff_image_mime_type(head: bytes) -> Optional[str]:
+    """Identify an image from its first bytes; returns None if unrecognised"""
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'image/jpeg'
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'image/png'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    return None
+
+
+_BASE64_PAYLOAD = re.compile(r'[A-Za-z0-9+/]*={0,2}')
+
+
+def base64_length(size: int) -> int:
+    """Length of the padded base64 encoding of `size` bytes"""
+    return 4 * ((size + 2) // 3)
+
+
+def check_data_url(data_url: str, max_bytes: int) -> str:
+    """
+    Validate a base64 image data URL without decoding or copying the
+    payload: checks the header, the payload length and alphabet, and
+    sniffs the image type from the first few bytes. Returns the sniffed
+    MIME type; raises ValueError otherwise.
+    """
+    if not data_url.startswith('data:image'):
+        raise ValueError('Invalid image format. Must be a base64 encoded image.')
+    # The header is short; do not scan a huge string for a missing comma
+    start = data_url.find(',', 0, 128) + 1
+    if not start or not data_url.endswith(';base64', 0, start - 1):
+        raise ValueError('Invalid base64 image data')
+
+    length = len(data_url) - start
+    if length % 4:
+        raise ValueError('Invalid base64 image data')
+    if length > base64_length(max_bytes):
+        raise ValueError('Selfie image is too large')
+    if not _BASE64_PAYLOAD.fullmatch(data_url, start):
+        raise ValueError('Invalid base64 image data')
+
+    # 24 characters decode to the 18 bytes the signatures need
+    mime_type = sniff_image_mime_type(base64.b64decode(data_url[start:start + 24]))
+    if not mime_type:
+        raise ValueError('Invalid image format. Must be a JPEG, PNG or WebP image.')
+    return mime_type
@@ -0,0 +1,309 @@
+"""
+Load test for the classroom check-in spike: a burst of QR generations,
+then attendance submissions arriving at a fixed rate.
+
+    python -m benchmarks.bench_checkin --submissions 300 --seconds 10 --selfie-kb 200
+
+By default it starts uvicorn against a throwaway SQLite database and blob
+directory. Pass --url to drive an already running server instead (peak RSS
+is then not reported). Latency percentiles, throughput and the server's
+peak RSS are printed and written as JSON; with --baseline the run fails if
+any p95 regressed by more than --tolerance.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+import httpx
+
+USER_AGENT = "Mozilla/5.0 (Linux; Android 14) AppleWebKit/537.36 Chrome/120.0 Mobile Safari/537.36"
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies: List[float], statuses: List[int], elapsed: float) -> Dict[str, float]:
+    ordered = sorted(latencies)
+    ok = sum(1 for status in statuses if status < 400)
+    return {
+        "requests": len(statuses),
+        "ok": ok,
+        "errors": len(statuses) - ok,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2) if ordered else 0.0,
+        "throughput_rps": round(ok / elapsed, 2) if elapsed else 0.0
+    }
+
+
+def fake_selfie(size: int, rng: random.Random) -> str:
+    """A JPEG-signed payload of the given size as a data URL"""
+    raw = b"\xff\xd8\xff\xe0" + rng.randbytes(size - 4)
+    return "data:image/jpeg;base64," + base64.b64encode(raw).decode()
+
+
+async def timed(client: httpx.AsyncClient, method: str, url: str, **kwargs):
+    started = time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+        status = response.status_code
+    except httpx.HTTPError:
+        response, status = None, 599
+    return time.perf_counter() - started, status, response
+
+
+async def qr_burst(client: httpx.AsyncClient, count: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    results = []
+
+    async def one():
+        async with semaphore:
+            results.append(await timed(client, "GET", "/api/qr/generate"))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(count)))
+    return results, time.perf_counter() - started
+
+
+async def submit_spike(
+    client: httpx.AsyncClient,
+    session_id: str,
+    count: int,
+    seconds: float,
+    selfie: str,
+    rng: random.Random
+):
+    """Open-loop arrivals: request i is sent at i * seconds / count, whether or not earlier ones finished"""
+    interval = seconds / count
+
+    async def one(i: int, start_at: float):
+        await asyncio.sleep(max(0.0, start_at - time.perf_counter()))
+        return await timed(client, "POST", "/api/attendance/submit", json={
+            "session_id": session_id,
+            "full_name": f"Student {i}",
+            "phone_number": f"9{rng.randrange(10**9):09d}",
+            "email": f"student{i}@example.com",
+            "branch": "CSE",
+            "section": "A",
+            "roll_number": f"21CS{i:04d}",
+            "device_info": USER_AGENT,
+            "selfie_data": selfie
+        })
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one(i, started + i * interval) for i in range(count)))
+    return results, time.perf_counter() - started
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def create_schema(database_path: str) -> None:
+    from sqlalchemy import create_engine
+    from app.models.base import Base
+    from app.models import attendance, roster, session  # noqa: F401 (register tables)
+    engine = create_engine(f"sqlite:///{database_path}")
+    Base.metadata.create_all(engine)
+    engine.dispose()
+
+
+def start_server(workdir: str, port: int, workers: int) -> subprocess.Popen:
+    database_path = os.path.join(workdir, "bench.db")
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite+aiosqlite:///{database_path}",
+        BLOB_STORAGE_BACKEND="local",
+        BLOB_STORAGE_PATH=os.path.join(workdir, "blobs"),
+        SESSION_REAPER_ENABLED="false",
+        # Loopback clients would otherwise be sent to the IP reputation API
+        ATTENDANCE_PRESUBMIT_CHECKS=os.getenv("ATTENDANCE_PRESUBMIT_CHECKS", "false"),
+        # The synthetic selfies are random bytes, not decodable images
+        SELFIE_PROCESSING="false",
+        # Every request comes from one loopback address
+        RATE_LIMIT_ENABLED="false"
+    )
+    create_schema(database_path)
+    command = [
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(workers), "--log-level", "warning"
+    ]
+    return subprocess.Popen(command, env=env)
+
+
+def wait_until_up(url: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{url}/").status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not come up within {timeout}s")
+
+
+def process_tree(pid: int) -> List[int]:
+    pids = [pid]
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            for child in f.read().split():
+                pids.extend(process_tree(int(child)))
+    except OSError:
+        pass
+    return pids
+
+
+def peak_rss_mb(pid: int) -> Optional[float]:
+    """Sum of VmHWM over the server and its workers (Linux only)"""
+    total_kb = 0
+    for process_id in process_tree(pid):
+        try:
+            with open(f"/proc/{process_id}/status") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        total_kb += int(line.split()[1])
+        except OSError:
+            return None
+    return round(total_kb / 1024, 1)
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    regressions = []
+    for name, current in results["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(name)
+        if not previous or not previous["p95_ms"]:
+            continue
+        change = current["p95_ms"] / previous["p95_ms"] - 1
+        print(f"{name:<20} p95 {previous['p95_ms']:.1f} -> {current['p95_ms']:.1f} ms ({change:+.0%})")
+        if change > tolerance:
+            regressions.append(name)
+    return regressions
+
+
+async def run(args, url: str) -> Dict:
+    rng = random.Random(args.seed)
+    limits = httpx.Limits(max_connections=args.connections, max_keepalive_connections=args.connections)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60, headers={"User-Agent": USER_AGENT}) as client:
+        qr_results, qr_elapsed = await qr_burst(client, args.qr_requests, args.qr_concurrency)
+        session_ids = [response.headers["Session-Id"] for _, status, response in qr_results if status == 200]
+        if not session_ids:
+            raise RuntimeError("No QR session could be created")
+
+        selfie = fake_selfie(args.selfie_kb * 1024, rng)
+        submit_results, submit_elapsed = await submit_spike(
+            client, session_ids[-1], args.submissions, args.seconds, selfie, rng
+        )
+
+    return {
+        "qr_generate": summarize(
+            [latency for latency, _, _ in qr_results],
+            [status for _, status, _ in qr_results],
+            qr_elapsed
+        ),
+        "attendance_submit": summarize(
+            [latency for latency, _, _ in submit_results],
+            [status for _, status, _ in submit_results],
+            submit_elapsed
+        )
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the attendance check-in spike")
+    parser.add_argument("--url", help="Existing server to drive instead of a local SQLite one")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--qr-requests", type=int, default=50)
+    parser.add_argument("--qr-concurrency", type=int, default=10)
+    parser.add_argument("--submissions", type=int, default=300)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--selfie-kb", type=int, default=200)
+    parser.add_argument("--connections", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=f"benchmarks/results/checkin-{datetime.utcnow():%Y%m%dT%H%M%S}.json")
+    parser.add_argument("--baseline", help="Earlier result JSON to compare p95 latencies with")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p95 increase, 0.2 = 20%%")
+    args = parser.parse_args()
+
+    server = None
+    with tempfile.TemporaryDirectory() as workdir:
+        url = args.url
+        if not url:
+            port = free_port()
+            url = f"http://127.0.0.1:{port}"
+            server = start_server(workdir, port, args.workers)
+        try:
+            wait_until_up(url)
+            endpoints = asyncio.run(run(args, url))
+            server_rss = peak_rss_mb(server.pid) if server else None
+        finally:
+            if server:
+                server.terminate()
+                server.wait(timeout=30)
+
+    results = {
+        "timestamp": datetime.utcnow().isoformat(),
+        "revision": git_revision(),
+        "config": {
+            "url": args.url or "local-sqlite",
+            "workers": args.workers,
+            "qr_requests": args.qr_requests,
+            "submissions": args.submissions,
+            "seconds": args.seconds,
+            "selfie_kb": args.selfie_kb
+        },
+        "endpoints": endpoints,
+        "server_peak_rss_mb": server_rss
+    }
+
+    for name, stats in endpoints.items():
+        print(
+            f"{name:<20} {stats['ok']}/{stats['requests']} ok  "
+            f"p50 {stats['p50_ms']:.1f}  p95 {stats['p95_ms']:.1f}  p99 {stats['p99_ms']:.1f} ms  "
+            f"{stats['throughput_rps']:.1f} req/s"
+        )
+    if server_rss is not None:
+        print(f"server peak RSS      {server_rss:.0f} MB")
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"p95 regression over {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
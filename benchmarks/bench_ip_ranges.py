@@ -0,0 +1,61 @@
+"""
+Benchmark for the offline CIDR index (app/services/ip_ranges.py).
+
+    python -m benchmarks.bench_ip_ranges --ranges 2000000 --lookups 200000
+
+Builds an index from random IPv4 and IPv6 ranges and reports build time,
+memory and per-lookup latency.
+"""
+import argparse
+import ipaddress
+import random
+import time
+import resource
+from app.services.ip_ranges import CATEGORIES, CidrIndex
+
+
+def random_ranges(count: int, seed: int):
+    rng = random.Random(seed)
+    for i in range(count):
+        category = CATEGORIES[i % len(CATEGORIES)]
+        if i % 10 == 0:
+            prefix = rng.randint(32, 64)
+            first = rng.getrandbits(128) >> (128 - prefix) << (128 - prefix)
+            yield category, 6, first, first + (1 << (128 - prefix)) - 1
+        else:
+            prefix = rng.randint(16, 32)
+            first = rng.getrandbits(32) >> (32 - prefix) << (32 - prefix)
+            yield category, 4, first, first + (1 << (32 - prefix)) - 1
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the offline CIDR index")
+    parser.add_argument("--ranges", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    index = CidrIndex(random_ranges(args.ranges, args.seed))
+    build_seconds = time.perf_counter() - started
+    # ru_maxrss is in KB on Linux
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    rng = random.Random(args.seed + 1)
+    ips = [
+        str(ipaddress.IPv6Address(rng.getrandbits(128))) if i % 10 == 0
+        else str(ipaddress.IPv4Address(rng.getrandbits(32)))
+        for i in range(args.lookups)
+    ]
+    started = time.perf_counter()
+    matched = sum(1 for ip in ips if index.lookup(ip) is not None)
+    lookup_seconds = time.perf_counter() - started
+
+    print(f"ranges:          {args.ranges:,} -> {len(index):,} disjoint segments")
+    print(f"build:           {build_seconds:.2f} s (peak RSS {peak_rss_mb:.0f} MB)")
+    print(f"lookups:         {args.lookups:,} ({matched:,} matched)")
+    print(f"per lookup:      {lookup_seconds / args.lookups * 1e6:.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,21 @@
-workers = 4
+import os
+import shutil
+
+# WEB_CONCURRENCY is also read by the DB pool budget check at startup
+workers = int(os.getenv('WEB_CONCURRENCY', '4'))
 worker_class = 'uvicorn.workers.UvicornWorker'
 bind = '0.0.0.0:$PORT'
 timeout = 120
 
+# Workers write Prometheus samples here; /metrics on any worker sums them
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/prometheus_multiproc')
+
+def on_starting(server):
+    # Samples from a previous run would be counted again
+    path = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
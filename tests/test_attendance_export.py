@@ -0,0 +1,94 @@
+import csv
+import io
+import zipfile
+import pytest
+from datetime import datetime, timedelta
+from xml.etree import ElementTree
+from fastapi import HTTPException
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from app.core.config import settings
+from app.models.base import Base
+from app.models.attendance import Attendance
+from app.models.session import Session
+from app.routers.attendance import require_export_key
+from app.services.attendance_export import EXPORT_HEADER, export_query, iter_csv, iter_xlsx, stream_rows
+
+pytest.importorskip("aiosqlite")
+
+START = datetime(2026, 1, 5, 9, 0)
+
+@pytest.fixture
+async def session_factory():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        for session_id in ("s1", "s2"):
+            await conn.execute(insert(Session).values(
+                session_id=session_id, created_at=START, expires_at=START
+            ))
+        await conn.execute(insert(Attendance), [
+            dict(
+                session_id="s1" if i % 2 else "s2",
+                full_name=f"Student <{i}> & co",
+                phone_number="9000000000",
+                email=f"s{i}@example.com",
+                branch="CSE",
+                section="A",
+                roll_number=f"R{i:04d}",
+                selfie_data="data:image/jpeg;base64,AAAA",
+                created_at=START + timedelta(minutes=i),
+                verified=i % 3 == 0
+            )
+            for i in range(2500)
+        ])
+    yield lambda: AsyncSession(engine)
+    await engine.dispose()
+
+async def _collect(body):
+    return b"".join([chunk async for chunk in body])
+
+@pytest.mark.asyncio
+async def test_csv_export_of_one_session(session_factory):
+    body = iter_csv(stream_rows(session_factory, export_query(session_id="s1"), chunk_size=100))
+    rows = list(csv.reader(io.StringIO((await _collect(body)).decode())))
+    assert rows[0] == EXPORT_HEADER
+    assert "selfie_data" not in rows[0]
+    assert len(rows) == 1 + 1250
+    assert {row[1] for row in rows[1:]} == {"s1"}
+    assert rows[1][2] == "R0001"
+
+@pytest.mark.asyncio
+async def test_xlsx_export_of_date_range(session_factory):
+    query = export_query(start=START, end=START + timedelta(minutes=300))
+    data = await _collect(iter_xlsx(stream_rows(session_factory, query, chunk_size=64)))
+
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert "xl/workbook.xml" in archive.namelist()
+        sheet = ElementTree.fromstring(archive.read("xl/worksheets/sheet1.xml"))
+    ns = {"x": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+    rows = sheet.findall(".//x:row", ns)
+    assert len(rows) == 1 + 300
+    name_cell = rows[1].findall("x:c", ns)[EXPORT_HEADER.index("full_name")]
+    assert name_cell.find(".//x:t", ns).text == "Student <0> & co"
+
+async def _chunks(*rows):
+    yield rows
+
+@pytest.mark.asyncio
+async def test_csv_cells_that_look_like_formulas_are_escaped():
+    body = iter_csv(_chunks((1, "=HYPERLINK(\"http://x\")", "+91 9000000000", "@SUM(A1)", "-1", "Asha", -1)))
+    rows = list(csv.reader(io.StringIO((await _collect(body)).decode())))
+    assert rows[1] == ["1", "'=HYPERLINK(\"http://x\")", "'+91 9000000000", "'@SUM(A1)", "'-1", "Asha", "-1"]
+
+def test_export_is_closed_without_a_key(monkeypatch):
+    monkeypatch.setattr(settings, "EXPORT_API_KEY", "")
+    with pytest.raises(HTTPException) as exc:
+        require_export_key("anything")
+    assert exc.value.status_code == 503
+
+    monkeypatch.setattr(settings, "EXPORT_API_KEY", "secret")
+    with pytest.raises(HTTPException) as exc:
+        require_export_key("wrong")
+    assert exc.value.status_code == 401
+    require_export_key("secret")
@@ -0,0 +1,69 @@
+import pytest
+from datetime import datetime
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from app.models.base import Base
+from app.models.attendance import Attendance
+from app.models.session import Session
+from app.services.attendance_store import attendance_exists, insert_attendance, insert_attendance_many
+
+pytest.importorskip("aiosqlite")
+
+@pytest.fixture
+async def db():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        session.add(Session(session_id="s1", created_at=datetime.utcnow(), expires_at=datetime.utcnow()))
+        await session.commit()
+        yield session
+    await engine.dispose()
+
+def _record(roll_number, key=None):
+    return dict(
+        session_id="s1",
+        full_name="Student",
+        phone_number="9000000000",
+        email="student@example.com",
+        branch="CSE",
+        section="A",
+        roll_number=roll_number,
+        idempotency_key=key,
+        created_at=datetime.utcnow()
+    )
+
+async def _count(db):
+    return (await db.execute(select(func.count()).select_from(Attendance))).scalar()
+
+@pytest.mark.asyncio
+async def test_second_submission_for_roll_number_is_skipped(db):
+    assert await insert_attendance(db, _record("21CS001")) is True
+    assert await insert_attendance(db, _record("21CS001")) is False
+    assert await insert_attendance(db, _record("21CS002")) is True
+    assert await _count(db) == 2
+
+@pytest.mark.asyncio
+async def test_retry_with_same_idempotency_key_is_skipped(db):
+    assert await insert_attendance(db, _record("21CS001", key="retry-1")) is True
+    assert await insert_attendance(db, _record("21CS009", key="retry-1")) is False
+    assert await _count(db) == 1
+
+@pytest.mark.asyncio
+async def test_insert_many_reports_inserted_rows(db):
+    await insert_attendance(db, _record("21CS001"))
+    inserted = await insert_attendance_many(db, [
+        _record("21CS001"),
+        _record("21CS002"),
+        _record("21CS003", key="retry-1"),
+        _record("21CS004", key="retry-1")
+    ])
+    assert inserted == {("s1", "21CS002"), ("s1", "21CS003")}
+    assert await _count(db) == 3
+
+@pytest.mark.asyncio
+async def test_attendance_exists_checks_roll_number_and_key(db):
+    await insert_attendance(db, _record("21CS001", key="retry-1"))
+    assert await attendance_exists(db, "s1", "21CS001") is True
+    assert await attendance_exists(db, "s1", "21CS002", "retry-1") is True
+    assert await attendance_exists(db, "s1", "21CS002", "retry-2") is False
@@ -0,0 +1,96 @@
+import pytest
+from datetime import datetime, timedelta
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+import app.routers.attendance as attendance
+from app.core.config import settings
+from app.models.base import Base
+from app.models.attendance import Attendance
+from app.models.session import Session
+from app.services.blob_storage import LocalBlobStorage, content_key, get_blob_storage
+from app.services.database import get_db
+from app.services.presubmit import get_presubmit_validator
+from app.services.roster import get_roster_index
+
+pytest.importorskip("aiosqlite")
+
+JPEG_BYTES = b"\xff\xd8\xff\xe0" + b"\x00" * 60
+
+FORM = {
+    "session_id": "open",
+    "full_name": "Student",
+    "phone_number": "9000000000",
+    "email": "student@example.com",
+    "branch": "CSE",
+    "section": "A",
+    "roll_number": "21CS001",
+    "device_info": "Mozilla/5.0"
+}
+
+@pytest.fixture
+def client(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/submit.db")
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with AsyncSession(engine) as db:
+            now = datetime.utcnow()
+            db.add(Session(session_id="open", created_at=now, expires_at=now + timedelta(hours=1)))
+            await db.commit()
+
+    async def override_db():
+        async with AsyncSession(engine) as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(attendance.router)
+    app.dependency_overrides[get_db] = override_db
+    app.dependency_overrides[get_blob_storage] = lambda: LocalBlobStorage(str(tmp_path / "blobs"))
+    app.dependency_overrides[get_presubmit_validator] = lambda: None
+    app.dependency_overrides[get_roster_index] = lambda: None
+    with TestClient(app) as test_client:
+        test_client.portal.call(setup)
+        test_client.engine = engine
+        test_client.blobs = LocalBlobStorage(str(tmp_path / "blobs"))
+        yield test_client
+        test_client.portal.call(engine.dispose)
+
+def _submit(client, data, filename="selfie.jpg", content_type="image/jpeg"):
+    return client.post(
+        "/api/attendance/submit/multipart",
+        data=FORM,
+        files={"selfie": (filename, data, content_type)}
+    )
+
+def test_multipart_selfie_is_stored_as_a_blob(client):
+    response = _submit(client, JPEG_BYTES)
+    assert response.status_code == 200
+    assert response.json() == {"message": "Attendance recorded successfully"}
+
+    async def stored():
+        async with AsyncSession(client.engine) as db:
+            return (await db.execute(select(Attendance))).scalar_one()
+
+    row = client.portal.call(stored)
+    assert row.selfie_key == content_key(JPEG_BYTES)
+    assert row.selfie_size == len(JPEG_BYTES)
+    assert row.selfie_mime_type == "image/jpeg"
+    assert row.selfie_data is None
+    assert client.portal.call(client.blobs.get, row.selfie_key) == JPEG_BYTES
+
+    assert _submit(client, JPEG_BYTES).json()["already_recorded"] is True
+
+def test_multipart_rejects_a_file_that_is_not_an_image(client):
+    response = _submit(client, b"just some text", filename="selfie.txt", content_type="text/plain")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid image format. Must be a JPEG, PNG or WebP image."
+
+def test_multipart_rejects_an_oversize_selfie(client, monkeypatch):
+    monkeypatch.setattr(settings, "SELFIE_MAX_BYTES", 1024)
+    monkeypatch.setattr(settings, "SELFIE_UPLOAD_CHUNK_BYTES", 256)
+    response = _submit(client, JPEG_BYTES + b"\x00" * 2048)
+    assert response.status_code == 413
+    assert response.json()["detail"] == "Selfie image is too large"
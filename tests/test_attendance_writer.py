@@ -0,0 +1,124 @@
+import asyncio
+import json
+import pytest
+from types import SimpleNamespace
+from app.services.attendance_writer import AttendanceWriter, AttendanceQueueFull
+
+class FakeDB:
+    """
+    Stands in for an AsyncSession; rejects any batch containing a 'bad' roll
+    number and skips roll numbers in `existing`, like ON CONFLICT DO NOTHING
+    """
+
+    def __init__(self, inserted, existing=()):
+        self.inserted = inserted
+        self.existing = set(existing)
+        self.pending = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement):
+        rows = [
+            {col.key: value for col, value in row.items()}
+            for row in statement._multi_values[0]
+        ]
+        if any(row["roll_number"] == "bad" for row in rows):
+            raise ValueError("constraint violation")
+        rows = [row for row in rows if row["roll_number"] not in self.existing]
+        self.pending.extend(rows)
+        returned = [(row["session_id"], row["roll_number"]) for row in rows]
+        return SimpleNamespace(all=lambda: returned)
+
+    async def commit(self):
+        self.inserted.append([row["roll_number"] for row in self.pending])
+
+def _record(roll_number):
+    return {"session_id": "s1", "roll_number": roll_number}
+
+@pytest.mark.asyncio
+async def test_records_are_flushed_in_batches():
+    inserted = []
+    writer = AttendanceWriter(lambda: FakeDB(inserted), batch_size=3, flush_interval=0.05)
+    await writer.start()
+    for i in range(7):
+        await writer.enqueue(_record(f"r{i}"))
+    await writer.stop()
+
+    assert [roll for batch in inserted for roll in batch] == [f"r{i}" for i in range(7)]
+    assert max(len(batch) for batch in inserted) == 3
+    assert writer.stats()["flushed"] == 7
+
+@pytest.mark.asyncio
+async def test_failed_records_are_reported(tmp_path):
+    inserted = []
+    dead_letter = tmp_path / "dead.jsonl"
+    writer = AttendanceWriter(
+        lambda: FakeDB(inserted),
+        batch_size=10,
+        flush_interval=0.05,
+        dead_letter_path=str(dead_letter)
+    )
+    await writer.start()
+    for roll_number in ("a", "bad", "b"):
+        await writer.enqueue(_record(roll_number))
+    await writer.stop()
+
+    assert sorted(roll for batch in inserted for roll in batch) == ["a", "b"]
+    assert [f.record["roll_number"] for f in writer.failures] == ["bad"]
+    lines = dead_letter.read_text().splitlines()
+    assert json.loads(lines[0])["record"]["roll_number"] == "bad"
+
+@pytest.mark.asyncio
+async def test_full_queue_applies_backpressure():
+    writer = AttendanceWriter(lambda: FakeDB([]), max_queue_size=1, enqueue_timeout=0.01)
+    # Not started, so nothing drains the queue
+    await writer.enqueue(_record("a"))
+    with pytest.raises(AttendanceQueueFull):
+        await writer.enqueue(_record("b"))
+
+@pytest.mark.asyncio
+async def test_duplicate_in_queue_is_not_enqueued_twice():
+    inserted = []
+    writer = AttendanceWriter(lambda: FakeDB(inserted), flush_interval=0.05)
+    assert await writer.enqueue(_record("a")) is True
+    assert await writer.enqueue(_record("a")) is False
+    await writer.start()
+    await writer.stop()
+    assert inserted == [["a"]]
+
+@pytest.mark.asyncio
+async def test_on_flushed_runs_only_for_stored_records():
+    inserted, flushed = [], []
+    writer = AttendanceWriter(
+        lambda: FakeDB(inserted, existing=["stored"]),
+        batch_size=10,
+        flush_interval=0.05,
+        on_flushed=lambda record: flushed.append(record["roll_number"])
+    )
+    await writer.start()
+    for roll_number in ("a", "bad", "stored", "b"):
+        await writer.enqueue(_record(roll_number))
+    await writer.stop()
+    assert sorted(flushed) == ["a", "b"]
+    assert writer.stats()["flushed"] == 2
+    assert writer.stats()["duplicates"] == 1
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicates_are_enqueued_once():
+    writer = AttendanceWriter(lambda: FakeDB([]), flush_interval=0.05)
+    results = await asyncio.gather(writer.enqueue(_record("a")), writer.enqueue(_record("a")))
+    assert sorted(results) == [False, True]
+    assert writer.queue.qsize() == 1
+
+@pytest.mark.asyncio
+async def test_timed_out_enqueue_releases_the_student():
+    writer = AttendanceWriter(lambda: FakeDB([]), max_queue_size=1, enqueue_timeout=0.01)
+    await writer.enqueue(_record("a"))
+    with pytest.raises(AttendanceQueueFull):
+        await writer.enqueue(_record("b"))
+    writer.queue.get_nowait()
+    assert await writer.enqueue(_record("b")) is True
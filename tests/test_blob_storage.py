@@ -0,0 +1,109 @@
+import base64
+import hashlib
+import pytest
+from app.services.blob_storage import BlobStorage, LocalBlobStorage, S3BlobStorage, BlobNotFound, BlobTooLarge
+from app.utils.selfie import check_data_url, decode_data_url, sniff_image_mime_type
+
+JPEG_BYTES = b'\xff\xd8\xff\xe0' + b'\x00' * 64
+
+@pytest.fixture
+def local_storage(tmp_path):
+    return LocalBlobStorage(str(tmp_path))
+
+@pytest.mark.asyncio
+async def test_local_put_is_content_addressed(local_storage):
+    ref = await local_storage.put(JPEG_BYTES, "image/jpeg")
+    assert ref.key == hashlib.sha256(JPEG_BYTES).hexdigest()
+    assert ref.size == len(JPEG_BYTES)
+    assert ref.mime_type == "image/jpeg"
+    assert await local_storage.get(ref.key) == JPEG_BYTES
+
+@pytest.mark.asyncio
+async def test_local_put_same_bytes_twice(local_storage):
+    first = await local_storage.put(JPEG_BYTES, "image/jpeg")
+    second = await local_storage.put(JPEG_BYTES, "image/jpeg")
+    assert first == second
+
+@pytest.mark.asyncio
+async def test_local_delete(local_storage):
+    ref = await local_storage.put(JPEG_BYTES, "image/jpeg")
+    await local_storage.delete(ref.key)
+    assert not await local_storage.exists(ref.key)
+    with pytest.raises(BlobNotFound):
+        await local_storage.get(ref.key)
+
+@pytest.mark.asyncio
+async def test_s3_backend_against_local_stand_in():
+    moto = pytest.importorskip("moto")
+    import boto3
+
+    with moto.mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket="selfies")
+        storage = S3BlobStorage(bucket="selfies", prefix="test/", client=client)
+
+        ref = await storage.put(JPEG_BYTES, "image/jpeg")
+        assert await storage.exists(ref.key)
+        assert await storage.get(ref.key) == JPEG_BYTES
+        await storage.delete(ref.key)
+        assert not await storage.exists(ref.key)
+
+def test_incomplete_backend_fails_when_created():
+    class ReadOnlyStorage(BlobStorage):
+        async def get(self, key):
+            return b""
+
+    with pytest.raises(TypeError):
+        ReadOnlyStorage()
+
+def test_decode_data_url():
+    data_url = "data:image/jpeg;base64," + base64.b64encode(JPEG_BYTES).decode()
+    mime_type, raw = decode_data_url(data_url)
+    assert mime_type == "image/jpeg"
+    assert raw == JPEG_BYTES
+
+def test_decode_data_url_rejects_bad_base64():
+    with pytest.raises(ValueError):
+        decode_data_url("data:image/jpeg;base64,not*base64")
+
+async def _chunks(data, size=16):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+@pytest.mark.asyncio
+async def test_local_put_stream_matches_put(local_storage):
+    ref = await local_storage.put_stream(_chunks(JPEG_BYTES), "image/jpeg")
+    assert ref == await local_storage.put(JPEG_BYTES, "image/jpeg")
+    assert await local_storage.get(ref.key) == JPEG_BYTES
+
+@pytest.mark.asyncio
+async def test_local_put_stream_size_cap(local_storage):
+    with pytest.raises(BlobTooLarge):
+        await local_storage.put_stream(_chunks(JPEG_BYTES), "image/jpeg", max_bytes=32)
+
+def test_sniff_image_mime_type():
+    assert sniff_image_mime_type(JPEG_BYTES) == "image/jpeg"
+    assert sniff_image_mime_type(b'\x89PNG\r\n\x1a\n' + b'\x00' * 8) == "image/png"
+    assert sniff_image_mime_type(b'RIFF\x00\x00\x00\x00WEBPVP8 ') == "image/webp"
+    assert sniff_image_mime_type(b'GIF89a') is None
+
+def test_check_data_url_sniffs_without_decoding():
+    data_url = "data:image/png;base64," + base64.b64encode(JPEG_BYTES).decode()
+    # The declared type is ignored in favour of the bytes
+    assert check_data_url(data_url, max_bytes=len(JPEG_BYTES)) == "image/jpeg"
+
+@pytest.mark.parametrize("data_url", [
+    "data:text/plain;base64,aGVsbG8=",
+    "data:image/jpeg,/9j/4AAQ",
+    "data:image/jpeg;base64,/9j/4AAQ*A==",
+    "data:image/jpeg;base64,/9j/4AA",
+    "data:image/gif;base64," + base64.b64encode(b"GIF89a" + b"\x00" * 12).decode()
+])
+def test_check_data_url_rejects_malformed(data_url):
+    with pytest.raises(ValueError):
+        check_data_url(data_url, max_bytes=1024)
+
+def test_check_data_url_rejects_oversized_payload():
+    data_url = "data:image/jpeg;base64," + base64.b64encode(JPEG_BYTES + b"\x00" * 4096).decode()
+    with pytest.raises(ValueError, match="too large"):
+        check_data_url(data_url, max_bytes=1024)
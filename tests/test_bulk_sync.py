@@ -0,0 +1,126 @@
+import base64
+import json
+import pytest
+from datetime import datetime, timedelta
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+import app.routers.attendance as attendance
+from app.models.base import Base
+from app.models.attendance import Attendance
+from app.models.session import Session
+from app.services.blob_storage import LocalBlobStorage, get_blob_storage
+from app.services.database import get_db
+from app.services.presubmit import get_presubmit_validator
+from app.services.request_limits import BodySizeLimitMiddleware
+
+pytest.importorskip("aiosqlite")
+
+BODY_LIMIT = 64 * 1024
+NOW = datetime.utcnow()
+SELFIE = "data:image/jpeg;base64," + base64.b64encode(b"\xff\xd8\xff\xe0" + b"\x00" * 60).decode()
+
+@pytest.fixture
+def client(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/bulk.db")
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with AsyncSession(engine) as db:
+            db.add_all([
+                # Ended an hour ago: rows captured before that are still accepted
+                Session(session_id="lecture", created_at=NOW - timedelta(hours=2), expires_at=NOW - timedelta(hours=1)),
+                Session(session_id="open", created_at=NOW, expires_at=NOW + timedelta(hours=1)),
+                Session(
+                    session_id="rotating", created_at=NOW, expires_at=NOW + timedelta(hours=1),
+                    token_secret="0" * 64
+                )
+            ])
+            await db.commit()
+
+    async def override_db():
+        async with AsyncSession(engine) as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(attendance.router)
+    app.add_middleware(BodySizeLimitMiddleware, default_limit=BODY_LIMIT)
+    app.dependency_overrides[get_db] = override_db
+    app.dependency_overrides[get_blob_storage] = lambda: LocalBlobStorage(str(tmp_path / "blobs"))
+    app.dependency_overrides[get_presubmit_validator] = lambda: None
+    with TestClient(app) as test_client:
+        test_client.portal.call(setup)
+        test_client.engine = engine
+        yield test_client
+        test_client.portal.call(engine.dispose)
+
+def _line(roll_number, session_id="lecture", captured_at=NOW - timedelta(hours=1, minutes=30), **extra):
+    return json.dumps({
+        "session_id": session_id,
+        "full_name": "Student",
+        "phone_number": "9000000000",
+        "email": "student@example.com",
+        "branch": "CSE",
+        "section": "A",
+        "roll_number": roll_number,
+        "device_info": "Mozilla/5.0",
+        "selfie_data": SELFIE,
+        "captured_at": captured_at.isoformat() + "Z",
+        **extra
+    })
+
+def test_bulk_sync_reports_each_line(client):
+    body = "\n".join([
+        _line("21CS001"),
+        _line("21CS002", session_id="open", captured_at=NOW),
+        _line("21CS001"),
+        _line("21CS003", captured_at=NOW - timedelta(minutes=30)),
+        _line("21CS004", session_id="missing"),
+        "{not json",
+        ""
+    ])
+    response = client.post("/api/attendance/submit/bulk", content=body, headers={"content-type": "application/x-ndjson"})
+    assert response.status_code == 200
+    payload = response.json()
+    assert [result["status"] for result in payload["results"]] == [
+        "recorded", "recorded", "already_recorded", "rejected", "rejected", "rejected"
+    ]
+    assert payload["results"][3]["detail"] == "Session expired"
+    assert payload["results"][4]["detail"] == "Invalid session"
+    assert (payload["recorded"], payload["already_recorded"], payload["rejected"]) == (2, 1, 3)
+
+    async def rows():
+        async with AsyncSession(client.engine) as db:
+            return (await db.execute(select(Attendance.roll_number, Attendance.created_at).order_by(Attendance.roll_number))).all()
+
+    stored = client.portal.call(rows)
+    assert [row.roll_number for row in stored] == ["21CS001", "21CS002"]
+    # The capture time is kept as the attendance time
+    assert stored[0].created_at.replace(tzinfo=None) == NOW - timedelta(hours=1, minutes=30)
+
+def test_second_upload_is_idempotent(client):
+    body = _line("21CS001", idempotency_key="device-1:1")
+    assert client.post("/api/attendance/submit/bulk", content=body).json()["recorded"] == 1
+    assert client.post("/api/attendance/submit/bulk", content=body).json()["already_recorded"] == 1
+
+def test_capture_time_far_in_the_future_is_rejected(client):
+    body = _line("21CS001", session_id="open", captured_at=NOW + timedelta(hours=1))
+    result = client.post("/api/attendance/submit/bulk", content=body).json()["results"][0]
+    assert result == {"line": 1, "status": "rejected", "detail": "Capture time is in the future"}
+
+def test_lecture_sessions_with_rotating_codes_are_rejected(client):
+    body = _line("21CS001", session_id="rotating", captured_at=NOW, token="copied-from-a-screenshot")
+    result = client.post("/api/attendance/submit/bulk", content=body).json()["results"][0]
+    assert result == {"line": 1, "status": "rejected", "detail": "Lecture sessions cannot be synced offline"}
+
+def test_oversized_chunked_upload_is_rejected(client):
+    def body():
+        # No Content-Length: the limit is only hit while the lines stream in
+        for i in range(BODY_LIMIT // 200):
+            yield (_line(f"21CS{i:04d}") + "\n").encode()
+
+    response = client.post("/api/attendance/submit/bulk", content=body())
+    assert response.status_code == 413
+    assert response.json() == {"detail": "Request body too large"}
@@ -0,0 +1,48 @@
+import importlib.util
+import pytest
+import app.core.config as config
+from app.core.config import _env_bool, settings
+from app.services.database import check_pool_budget, engine_options
+
+def _load_settings():
+    """A fresh Settings built from the current environment, leaving the app's own untouched"""
+    spec = importlib.util.spec_from_file_location("config_under_test", config.__file__)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.settings
+
+@pytest.mark.parametrize("value, expected", [
+    ("1", True), ("true", True), ("YES", True), ("on", True),
+    ("0", False), ("false", False), ("off", False), ("", False)
+])
+def test_env_bool(monkeypatch, value, expected):
+    monkeypatch.setenv("SOME_FLAG", value)
+    assert _env_bool("SOME_FLAG") is expected
+
+def test_pool_settings_are_read_from_the_environment(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "12")
+    monkeypatch.setenv("DB_POOL_TIMEOUT", "2.5")
+    monkeypatch.setenv("DB_POOL_PRE_PING", "false")
+    monkeypatch.delenv("DB_MAX_OVERFLOW", raising=False)
+    loaded = _load_settings()
+    assert loaded.DB_POOL_SIZE == 12
+    assert loaded.DB_POOL_TIMEOUT == 2.5
+    assert loaded.DB_POOL_PRE_PING is False
+    assert loaded.DB_MAX_OVERFLOW == 5
+
+def test_postgres_engine_gets_pool_and_statement_timeout():
+    options = engine_options("postgresql+asyncpg://user@localhost/attendance")
+    assert options["pool_size"] == settings.DB_POOL_SIZE
+    assert options["max_overflow"] == settings.DB_MAX_OVERFLOW
+    assert options["pool_pre_ping"] == settings.DB_POOL_PRE_PING
+    assert options["connect_args"]["server_settings"]["statement_timeout"] == str(settings.DB_STATEMENT_TIMEOUT_MS)
+
+def test_sqlite_engine_gets_no_pool_options():
+    assert engine_options("sqlite+aiosqlite:///attendance.db") == {"echo": settings.DB_ECHO}
+
+def test_pool_budget_within_limit():
+    check_pool_budget(workers=4, pool_size=5, max_overflow=5, max_connections=50, reserved=5, dedicated=1)
+
+def test_pool_budget_rejects_an_oversubscribed_pool():
+    with pytest.raises(RuntimeError, match="4 workers x \\(5 pool \\+ 5 overflow \\+ 1 dedicated\\) = 44"):
+        check_pool_budget(workers=4, pool_size=5, max_overflow=5, max_connections=45, reserved=5, dedicated=1)
@@ -0,0 +1,100 @@
+import json
+import time
+import numpy as np
+import pytest
+from app.services.geofence import CircleFence, Fence, GeofenceIndex, PolygonFence
+from app.services.geolocation import GeolocationValidator
+
+CAMPUS = (17.3850, 78.4867)
+
+# Roughly 200 m x 200 m square around the campus center
+BLOCK_A = [
+    (17.3841, 78.4858),
+    (17.3841, 78.4876),
+    (17.3859, 78.4876),
+    (17.3859, 78.4858),
+]
+
+@pytest.fixture
+def index():
+    return GeofenceIndex([
+        CircleFence("Main Campus", *CAMPUS, 1000),
+        PolygonFence("Block A", BLOCK_A),
+        CircleFence("Other Campus", 17.4400, 78.3489, 500),
+    ])
+
+def test_most_specific_fence_wins(index):
+    assert index.match(*CAMPUS).name == "Block A"
+    assert index.match(17.3900, 78.4867).name == "Main Campus"
+    assert index.match(17.4401, 78.3490).name == "Other Campus"
+    assert index.match(17.5000, 78.6000) is None
+
+def test_polygon_contains():
+    fence = PolygonFence("Block A", BLOCK_A)
+    assert fence.contains(*CAMPUS)
+    assert not fence.contains(17.3860, 78.4867)
+    assert not fence.contains(17.3850, 78.4877)
+
+def test_fence_without_containment_fails_when_created():
+    class BoxOnly(Fence):
+        def contains(self, latitude, longitude):
+            return self.in_bbox(latitude, longitude)
+
+    with pytest.raises(TypeError):
+        BoxOnly()
+
+def test_load_from_file(tmp_path):
+    path = tmp_path / "fences.json"
+    path.write_text(json.dumps({"fences": [
+        {"name": "Main Campus", "type": "circle", "latitude": CAMPUS[0], "longitude": CAMPUS[1], "radius_meters": 1000},
+        {"name": "Block A", "type": "polygon", "coordinates": BLOCK_A},
+    ]}))
+    index = GeofenceIndex.from_file(str(path))
+    assert len(index) == 2
+    assert index.match(*CAMPUS).name == "Block A"
+
+@pytest.mark.asyncio
+async def test_validator_reports_matched_fence(index):
+    validator = GeolocationValidator(geofences=index)
+    assert await validator.match_location(17.3900, 78.4867) == (True, pytest.approx(556, abs=1), "Main Campus")
+    is_valid, distance, fence = await validator.match_location(17.5000, 78.6000)
+    assert (is_valid, fence) == (False, None)
+    assert distance > 1000
+
+@pytest.mark.asyncio
+async def test_single_circle_validator_still_works():
+    validator = GeolocationValidator(campus_lat=40.7128, campus_lng=-74.0060, allowed_radius=100)
+    assert await validator.validate_location(40.7128, -74.0060) == (True, 0)
+    assert (await validator.validate_location(40.7228, -74.0160))[0] is False
+
+def test_only_nearby_fences_are_tested():
+    fences = [CircleFence(f"room-{i}", 17.0 + i * 0.01, 78.0, 20) for i in range(500)]
+    index = GeofenceIndex(fences)
+    assert index.match(17.0 + 250 * 0.01, 78.0).name == "room-250"
+    assert len(index._cells[(index._cell(19.5), index._cell(78.0))]) <= 2
+
+def test_batch_matches_scalar(index):
+    validator = GeolocationValidator(geofences=index)
+    rng = np.random.default_rng(7)
+    lats = rng.uniform(17.37, 17.45, 2000)
+    lngs = rng.uniform(78.33, 78.50, 2000)
+    valid, distance, fence_index = validator.validate_batch(lats, lngs)
+    for i in range(0, 2000, 50):
+        fence = index.match(lats[i], lngs[i])
+        assert valid[i] == (fence is not None)
+        if fence is None:
+            assert fence_index[i] == -1
+            assert distance[i] == pytest.approx(index.nearest(lats[i], lngs[i])[1])
+        else:
+            assert index.fences[fence_index[i]] is fence
+            assert distance[i] == pytest.approx(fence.distance_to_center(lats[i], lngs[i]))
+
+def test_batch_of_100k_points_is_fast(index):
+    validator = GeolocationValidator(geofences=index)
+    rng = np.random.default_rng(7)
+    lats = rng.uniform(17.37, 17.45, 100_000)
+    lngs = rng.uniform(78.33, 78.50, 100_000)
+    started = time.perf_counter()
+    valid, _, _ = validator.validate_batch(lats, lngs)
+    assert time.perf_counter() - started < 1.0
+    assert 0 < valid.sum() < len(valid)
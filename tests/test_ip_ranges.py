@@ -0,0 +1,55 @@
+import os
+import time
+from app.services.ip_ranges import CidrIndex, ReloadingCidrIndex, parse_range
+
+def _index(*entries):
+    return CidrIndex((category, *parse_range(text)) for category, text in entries)
+
+def test_ipv4_and_ipv6_lookup():
+    index = _index(("datacenter", "203.0.113.0/24"), ("vpn", "2001:db8::/32"))
+    assert index.lookup("203.0.113.7") == "datacenter"
+    assert index.lookup("203.0.114.1") is None
+    assert index.lookup("2001:db8:1::1") == "vpn"
+    assert index.lookup("2001:db9::1") is None
+    assert index.lookup("::ffff:203.0.113.9") == "datacenter"
+    assert index.lookup("not-an-ip") is None
+
+def test_overlapping_ranges_use_highest_priority_category():
+    index = _index(
+        ("datacenter", "10.0.0.0/8"),
+        ("tor", "10.1.2.3/32"),
+        ("vpn", "10.1.0.0-10.1.255.255"),
+    )
+    assert index.lookup("10.0.0.1") == "datacenter"
+    assert index.lookup("10.1.0.1") == "vpn"
+    assert index.lookup("10.1.2.3") == "tor"
+    assert index.lookup("10.1.2.4") == "vpn"
+    assert index.lookup("10.2.0.0") == "datacenter"
+    assert index.lookup("11.0.0.0") is None
+
+def test_adjacent_segments_are_merged():
+    index = _index(("vpn", "192.0.2.0/25"), ("vpn", "192.0.2.128/25"))
+    assert len(index) == 1
+
+def test_reloads_changed_files(tmp_path):
+    (tmp_path / "vpn.txt").write_text("# VPN exits\n198.51.100.0/24\n")
+    index = ReloadingCidrIndex(str(tmp_path), check_interval=0)
+    assert index.lookup("198.51.100.1") == "vpn"
+
+    (tmp_path / "tor.txt").write_text("198.51.100.1\n")
+    future = time.time() + 5
+    os.utime(tmp_path / "tor.txt", (future, future))
+    index.lookup("198.51.100.1")  # notices the change, reloads in the background
+    deadline = time.monotonic() + 5
+    while index.lookup("198.51.100.1") != "tor" and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert index.lookup("198.51.100.1") == "tor"
+    assert index.lookup("198.51.100.2") == "vpn"
+
+def test_non_blocking_load_serves_empty_index_until_ready(tmp_path):
+    (tmp_path / "vpn.txt").write_text("198.51.100.0/24\n")
+    index = ReloadingCidrIndex(str(tmp_path), check_interval=60, block=False)
+    deadline = time.monotonic() + 5
+    while index.lookup("198.51.100.1") != "vpn" and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert index.lookup("198.51.100.1") == "vpn"
@@ -0,0 +1,90 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from app.services.ip_reputation import CircuitBreaker, IPReputationClient, network_prefix
+
+class FakeReputationHandler(BaseHTTPRequestHandler):
+    """Serves ipapi.co-style JSON; 10.9.x.x is flagged as hosting, 10.99.x.x stalls"""
+
+    requests = []
+
+    def do_GET(self):
+        ip = self.path.strip("/").split("/")[0]
+        FakeReputationHandler.requests.append(ip)
+        if ip.startswith("10.99."):
+            time.sleep(0.5)
+        body = json.dumps({"ip": ip, "hosting": ip.startswith("10.9.")}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class QuietServer(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        # Timed-out clients hang up before the slow response is written
+        pass
+
+@pytest.fixture(scope="module")
+def fake_server():
+    server = QuietServer(("127.0.0.1", 0), FakeReputationHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+@pytest.fixture
+async def client(fake_server):
+    FakeReputationHandler.requests = []
+    client = IPReputationClient(
+        fake_server,
+        timeout=0.2,
+        breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    )
+    yield client
+    await client.aclose()
+
+def test_network_prefix():
+    assert network_prefix("192.168.1.77") == "192.168.1.0/24"
+    assert network_prefix("2001:db8::1") == "2001:db8::/64"
+
+@pytest.mark.asyncio
+async def test_verdicts_are_cached_by_ip_and_prefix(client):
+    assert await client.is_suspicious("10.9.0.1") is True
+    assert await client.is_suspicious("10.9.0.1") is True
+    # Same /24 as a looked-up address: no new request
+    assert await client.is_suspicious("10.9.0.2") is True
+    assert await client.is_suspicious("172.16.0.1") is False
+    assert FakeReputationHandler.requests == ["10.9.0.1", "172.16.0.1"]
+
+@pytest.mark.asyncio
+async def test_timeouts_fail_open_and_trip_the_breaker(client):
+    assert await client.is_suspicious("10.99.0.1") is False
+    assert await client.is_suspicious("10.99.1.1") is False
+    assert client.breaker.state == "open"
+    # Breaker open: no further requests are made
+    assert await client.is_suspicious("10.99.2.1") is False
+    assert FakeReputationHandler.requests == ["10.99.0.1", "10.99.1.1"]
+    assert client.stats()["errors"] == 2
+
+@pytest.mark.asyncio
+async def test_invalid_ip_is_not_looked_up(client):
+    assert await client.is_suspicious("not-an-ip") is False
+    assert FakeReputationHandler.requests == []
+
+def test_half_open_breaker_lets_one_trial_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    assert not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow()
+    # Concurrent callers wait for the trial's result
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow() and breaker.allow()
@@ -0,0 +1,125 @@
+import base64
+import pytest
+from datetime import datetime, timedelta
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+import app.routers.attendance as attendance
+import app.routers.qr as qr
+from app.core.config import settings
+from app.models.base import Base
+from app.models.session import Session
+from app.services.blob_storage import LocalBlobStorage, get_blob_storage
+from app.services.database import get_db
+from app.services.presubmit import get_presubmit_validator
+from app.services.roster import get_roster_index
+from app.services.session_manager import session_cache
+from app.utils.qr_token import current_window, issue_token
+
+pytest.importorskip("aiosqlite")
+
+SELFIE = "data:image/jpeg;base64," + base64.b64encode(b"\xff\xd8\xff\xe0" + b"\x00" * 60).decode()
+
+@pytest.fixture
+def client(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/lecture.db")
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    async def override_db():
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(qr.router)
+    app.include_router(attendance.router)
+    app.dependency_overrides[get_db] = override_db
+    app.dependency_overrides[get_blob_storage] = lambda: LocalBlobStorage(str(tmp_path / "blobs"))
+    app.dependency_overrides[get_presubmit_validator] = lambda: None
+    app.dependency_overrides[get_roster_index] = lambda: None
+    with TestClient(app) as test_client:
+        test_client.portal.call(setup)
+        test_client.engine = engine
+        yield test_client
+        test_client.portal.call(engine.dispose)
+
+def _submit(client, session_id, roll_number, token):
+    return client.post("/api/attendance/submit", json={
+        "session_id": session_id,
+        "full_name": "Student",
+        "phone_number": "9000000000",
+        "email": "student@example.com",
+        "branch": "CSE",
+        "section": "A",
+        "roll_number": roll_number,
+        "device_info": "Mozilla/5.0",
+        "selfie_data": SELFIE,
+        "token": token
+    })
+
+def _start_lecture(client):
+    response = client.post("/api/qr/lecture?duration_minutes=60")
+    assert response.status_code == 200
+    session_id = response.json()["session_id"]
+
+    image = client.get(f"/api/qr/lecture/{session_id}")
+    assert image.status_code == 200
+    assert image.headers["content-type"] == "image/png"
+    assert image.headers["cache-control"] == f"max-age={settings.QR_TOKEN_ROTATE_SECONDS}"
+    # The token the QR code's URL carries for the current window
+    return session_id, qr._issued_tokens[session_id][1]
+
+def _secret(client, session_id):
+    async def load():
+        async with AsyncSession(client.engine) as db:
+            return (await db.execute(select(Session.token_secret).where(Session.session_id == session_id))).scalar_one()
+
+    return bytes.fromhex(client.portal.call(load))
+
+def test_lecture_accepts_the_current_token(client):
+    session_id, token = _start_lecture(client)
+    response = _submit(client, session_id, "21CS001", token)
+    assert response.status_code == 200
+    assert response.json() == {"message": "Attendance recorded successfully"}
+
+def test_lecture_rejects_missing_tampered_and_stale_tokens(client):
+    session_id, token = _start_lecture(client)
+    tampered = token[:-2] + ("AA" if not token.endswith("AA") else "BB")
+    stale = issue_token(
+        _secret(client, session_id),
+        session_id,
+        current_window(settings.QR_TOKEN_ROTATE_SECONDS) - settings.QR_TOKEN_SKEW_WINDOWS - 2
+    )
+    _, other_token = _start_lecture(client)
+
+    for bad_token, detail in [
+        (None, "Invalid QR token"),
+        (tampered, "Invalid QR token"),
+        (other_token, "Invalid QR token"),
+        (stale, "QR code expired. Please scan the current code.")
+    ]:
+        response = _submit(client, session_id, "21CS001", bad_token)
+        assert response.status_code == 400
+        assert response.json()["detail"] == detail
+
+def test_expired_lecture_is_rejected(client):
+    session_id, token = _start_lecture(client)
+
+    async def end_lecture():
+        async with AsyncSession(client.engine) as db:
+            await db.execute(
+                update(Session)
+                .where(Session.session_id == session_id)
+                .values(expires_at=datetime.utcnow() - timedelta(minutes=1))
+            )
+            await db.commit()
+        session_cache.invalidate(session_id)
+
+    client.portal.call(end_lecture)
+    response = _submit(client, session_id, "21CS001", token)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Session expired"
+    assert client.get(f"/api/qr/lecture/{session_id}").status_code == 410
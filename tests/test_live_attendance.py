@@ -0,0 +1,147 @@
+import asyncio
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.core.config import settings
+from app.routers.attendance import router
+from app.services.live_attendance import LiveAttendanceHub, event_stream
+
+def _event(roll_number, session_id="s1"):
+    return {"session_id": session_id, "roll_number": roll_number, "full_name": roll_number, "at": "2026-01-05T09:00:00"}
+
+def make_hub(existing=("r1", "r2")):
+    loads = []
+
+    async def loader(session_id, recent_size):
+        loads.append(session_id)
+        return list(existing), [_event(roll) for roll in existing][-recent_size:]
+
+    return LiveAttendanceHub(loader, recent_size=3, queue_size=5), loads
+
+@pytest.mark.asyncio
+async def test_viewers_share_one_load_and_get_arrivals():
+    hub, loads = make_hub()
+    first = await hub.subscribe("s1")
+    second = await hub.subscribe("s1")
+    assert loads == ["s1"]
+    assert first.get_nowait() == ("snapshot", {"count": 2, "recent": [_event("r1"), _event("r2")]})
+    second.get_nowait()
+
+    hub.apply(_event("r3"))
+    hub.apply(_event("r3"))  # duplicate delivery is ignored
+    hub.apply(_event("x", session_id="other"))  # nobody watching
+    for queue in (first, second):
+        assert queue.get_nowait() == ("arrival", {"count": 3, "student": _event("r3")})
+        assert queue.empty()
+
+@pytest.mark.asyncio
+async def test_feed_is_dropped_with_its_last_viewer():
+    hub, loads = make_hub()
+    queue = await hub.subscribe("s1")
+    hub.unsubscribe("s1", queue)
+    assert hub.stats() == {"sessions": 0, "viewers": 0}
+    await hub.subscribe("s1")
+    assert loads == ["s1", "s1"]
+
+@pytest.mark.asyncio
+async def test_viewer_cancelled_during_load_leaves_no_feed():
+    loads = []
+    release = asyncio.Event()
+
+    async def loader(session_id, recent_size):
+        loads.append(session_id)
+        await release.wait()
+        return ["r1"], []
+
+    hub = LiveAttendanceHub(loader)
+    first = asyncio.create_task(hub.subscribe("s1"))
+    await asyncio.sleep(0)
+    first.cancel()
+    await asyncio.gather(first, return_exceptions=True)
+    assert hub.stats() == {"sessions": 0, "viewers": 0}
+
+    # A viewer waiting on a cancelled load loads a fresh feed itself
+    first = asyncio.create_task(hub.subscribe("s1"))
+    await asyncio.sleep(0)
+    waiting = asyncio.create_task(hub.subscribe("s1"))
+    await asyncio.sleep(0)
+    first.cancel()
+    await asyncio.gather(first, return_exceptions=True)
+    release.set()
+    queue = await waiting
+    assert queue.get_nowait() == ("snapshot", {"count": 1, "recent": []})
+    assert hub.stats() == {"sessions": 1, "viewers": 1}
+    assert loads == ["s1", "s1", "s1"]
+
+@pytest.mark.asyncio
+async def test_failed_load_drops_the_feed():
+    loads = []
+
+    async def loader(session_id, recent_size):
+        loads.append(session_id)
+        if len(loads) == 1:
+            raise ConnectionError("database unavailable")
+        return ["r1"], []
+
+    hub = LiveAttendanceHub(loader)
+    with pytest.raises(ConnectionError):
+        await hub.subscribe("s1")
+    assert hub.stats() == {"sessions": 0, "viewers": 0}
+
+    # The next viewer loads again instead of getting a count of 0
+    queue = await hub.subscribe("s1")
+    assert queue.get_nowait() == ("snapshot", {"count": 1, "recent": []})
+    assert loads == ["s1", "s1"]
+
+@pytest.mark.asyncio
+async def test_event_stream_ends_when_load_fails():
+    async def loader(session_id, recent_size):
+        raise ConnectionError("database unavailable")
+
+    async def is_disconnected():
+        return False
+
+    hub = LiveAttendanceHub(loader)
+    stream = event_stream(hub, "s1", is_disconnected)
+    with pytest.raises(StopAsyncIteration):
+        await stream.__anext__()
+    assert hub.stats() == {"sessions": 0, "viewers": 0}
+
+def test_live_stream_needs_the_export_key(monkeypatch):
+    app = FastAPI()
+    app.include_router(router)
+    client = TestClient(app)
+
+    monkeypatch.setattr(settings, "EXPORT_API_KEY", "")
+    assert client.get("/api/attendance/live/s1").status_code == 503
+    monkeypatch.setattr(settings, "EXPORT_API_KEY", "secret")
+    assert client.get("/api/attendance/live/s1").status_code == 401
+    assert client.get("/api/attendance/live/s1", headers={"X-API-Key": "wrong"}).status_code == 401
+
+@pytest.mark.asyncio
+async def test_slow_viewer_keeps_latest_count():
+    hub, _ = make_hub(existing=())
+    queue = await hub.subscribe("s1")
+    for i in range(20):
+        hub.apply(_event(f"r{i}"))
+    messages = [queue.get_nowait() for _ in range(queue.qsize())]
+    assert len(messages) == 5
+    assert messages[-1][1]["count"] == 20
+
+@pytest.mark.asyncio
+async def test_event_stream_formats_sse():
+    hub, _ = make_hub(existing=("r1",))
+    disconnected = False
+
+    async def is_disconnected():
+        return disconnected
+
+    stream = event_stream(hub, "s1", is_disconnected, heartbeat=0.01)
+    assert (await stream.__anext__()).startswith(b"event: snapshot\ndata: {\"count\": 1")
+    assert await stream.__anext__() == b": keep-alive\n\n"
+    hub.apply(_event("r2"))
+    assert (await stream.__anext__()).startswith(b"event: arrival\ndata: {\"count\": 2")
+    disconnected = True
+    with pytest.raises(StopAsyncIteration):
+        await stream.__anext__()
+    assert hub.stats()["viewers"] == 0
@@ -0,0 +1,45 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from app.services.metrics import MetricsMiddleware
+from app.services.session_manager import SessionCache
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+def make_client():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: str):
+        return {"id": item_id}
+
+    @app.post("/upload")
+    async def upload():
+        return {}
+
+    return TestClient(app)
+
+def test_requests_are_labelled_by_route_template():
+    client = make_client()
+    before = sample("http_requests_total", method="GET", route="/items/{item_id}", status="200")
+    client.get("/items/1")
+    client.get("/items/2")
+    client.get("/nope")
+    assert sample("http_requests_total", method="GET", route="/items/{item_id}", status="200") == before + 2
+    assert sample("http_requests_total", method="GET", route="unmatched", status="404") >= 1
+    assert sample("http_request_duration_seconds_count", method="GET", route="/items/{item_id}") >= 2
+
+def test_request_size_is_recorded():
+    client = make_client()
+    before = sample("http_request_size_bytes_sum", method="POST", route="/upload")
+    client.post("/upload", content=b"x" * 2048)
+    assert sample("http_request_size_bytes_sum", method="POST", route="/upload") == before + 2048
+
+def test_session_cache_lookups_are_counted():
+    hits = sample("session_cache_lookups_total", result="hit")
+    misses = sample("session_cache_lookups_total", result="miss")
+    SessionCache().get("missing")
+    assert sample("session_cache_lookups_total", result="miss") == misses + 1
+    assert sample("session_cache_lookups_total", result="hit") == hits
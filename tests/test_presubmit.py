@@ -0,0 +1,56 @@
+import pytest
+from app.services.geofence import CircleFence, GeofenceIndex
+from app.services.geolocation import GeolocationValidator
+from app.services.presubmit import PreSubmitValidator
+from app.utils.security import SecurityValidator
+
+BROWSER = "Mozilla/5.0 (Linux; Android 14) AppleWebKit/537.36 Chrome/120.0 Mobile Safari/537.36"
+
+class FakeSecurity(SecurityValidator):
+    def __init__(self, ranges=None, suspicious=()):
+        super().__init__()
+        self.ranges = ranges or {}
+        self.suspicious = set(suspicious)
+        self.reputation_calls = 0
+
+    def classify_ip(self, ip_address):
+        return self.ranges.get(ip_address)
+
+    async def check_vpn(self, ip_address):
+        self.reputation_calls += 1
+        return ip_address in self.suspicious
+
+@pytest.fixture
+def geolocation():
+    return GeolocationValidator(geofences=GeofenceIndex([CircleFence("campus", 17.385, 78.4867, 500)]))
+
+def test_user_agent_pattern():
+    validator = SecurityValidator()
+    assert validator.validate_user_agent(BROWSER)
+    assert validator.validate_user_agent("Firefox/121.0")
+    assert not validator.validate_user_agent("curl/8.4.0")
+    assert not validator.validate_user_agent("python-requests Mozilla/5.0")
+    assert not validator.validate_user_agent(None)
+
+@pytest.mark.asyncio
+async def test_pipeline_accepts_clean_request(geolocation):
+    security = FakeSecurity()
+    presubmit = PreSubmitValidator(security, geolocation)
+    assert await presubmit.validate(BROWSER, "203.0.113.7", 17.385, 78.4867) == (True, "Request validated successfully")
+    assert security.reputation_calls == 1
+
+@pytest.mark.asyncio
+async def test_cheap_checks_short_circuit_the_reputation_api(geolocation):
+    security = FakeSecurity(ranges={"198.51.100.1": "datacenter"})
+    presubmit = PreSubmitValidator(security, geolocation)
+    assert await presubmit.validate("curl/8.4.0", "203.0.113.7") == (False, "Invalid user agent")
+    assert await presubmit.validate(BROWSER, "198.51.100.1") == (False, "VPN usage detected")
+    is_valid, message = await presubmit.validate(BROWSER, "203.0.113.7", 17.5, 78.6)
+    assert not is_valid and "away from campus" in message
+    assert security.reputation_calls == 0
+
+@pytest.mark.asyncio
+async def test_reputation_api_runs_last():
+    security = FakeSecurity(suspicious={"203.0.113.9"})
+    presubmit = PreSubmitValidator(security)
+    assert await presubmit.validate(BROWSER, "203.0.113.9", 17.5, 78.6) == (False, "VPN usage detected")
@@ -0,0 +1,35 @@
+import pytest
+from app.services.qr_generator import QRGenerator, RenderedQRCache, qr_image_cache, render_qr
+
+def test_render_png_is_one_bit():
+    from io import BytesIO
+    from PIL import Image
+
+    image = Image.open(BytesIO(render_qr("https://example.com/attendance?sessionId=abc")))
+    assert image.format == "PNG"
+    assert image.mode == "1"
+
+def test_render_svg():
+    svg = render_qr("https://example.com/attendance?sessionId=abc", "svg")
+    assert svg.lstrip().startswith(b"<?xml")
+    assert b"<svg" in svg
+
+def test_rendered_cache_evicts_least_recently_used():
+    cache = RenderedQRCache(max_entries=2)
+    cache.put("a", "png", b"A")
+    cache.put("b", "png", b"B")
+    assert cache.get("a", "png") == b"A"
+    cache.put("c", "png", b"C")
+    assert cache.get("b", "png") is None
+    assert cache.get("a", "svg") is None
+    assert cache.hits == 1
+
+@pytest.mark.asyncio
+async def test_generate_qr_code_is_served_from_cache():
+    qr_image_cache.clear()
+    generator = QRGenerator(db_session=None)
+    first = await generator.generate_qr_code("payload-1")
+    hits = qr_image_cache.hits
+    second = await generator.generate_qr_code("payload-1")
+    assert first.getvalue() == second.getvalue()
+    assert qr_image_cache.hits == hits + 1
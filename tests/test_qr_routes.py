@@ -0,0 +1,66 @@
+import pytest
+from datetime import datetime, timedelta
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+import app.routers.qr as qr
+from app.models.base import Base
+from app.models.session import Session
+from app.services.database import get_db
+from app.services.qr_generator import qr_image_cache
+
+pytest.importorskip("aiosqlite")
+
+@pytest.fixture
+def client(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/qr.db")
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    async def override_db():
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(qr.router)
+    app.dependency_overrides[get_db] = override_db
+    with TestClient(app) as test_client:
+        test_client.portal.call(setup)
+        test_client.engine = engine
+        yield test_client
+        test_client.portal.call(engine.dispose)
+
+def _add_session(client, session_id, expires_in):
+    async def add():
+        async with AsyncSession(client.engine) as db:
+            now = datetime.utcnow()
+            db.add(Session(session_id=session_id, created_at=now, expires_at=now + expires_in))
+            await db.commit()
+
+    client.portal.call(add)
+
+def test_session_image_is_cached_until_expiry(client):
+    _add_session(client, "image-open", timedelta(minutes=3))
+    qr_image_cache.clear()
+
+    first = client.get("/api/qr/session/image-open/image")
+    assert first.status_code == 200
+    assert first.headers["content-type"] == "image/png"
+    assert first.headers["session-id"] == "image-open"
+    max_age = int(first.headers["cache-control"].removeprefix("max-age="))
+    assert 170 <= max_age <= 180
+
+    hits = qr_image_cache.hits
+    second = client.get("/api/qr/session/image-open/image")
+    assert second.content == first.content
+    assert qr_image_cache.hits == hits + 1
+
+    svg = client.get("/api/qr/session/image-open/image?format=svg")
+    assert svg.headers["content-type"] == "image/svg+xml"
+
+def test_session_image_of_unknown_or_expired_session(client):
+    _add_session(client, "image-expired", timedelta(minutes=-1))
+    assert client.get("/api/qr/session/image-missing/image").status_code == 404
+    assert client.get("/api/qr/session/image-expired/image").status_code == 410
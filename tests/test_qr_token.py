@@ -0,0 +1,43 @@
+import uuid
+import pytest
+from app.utils.qr_token import ExpiredToken, InvalidToken, issue_token, new_session_secret, verify_token
+
+SECRET = b"test-secret"
+SESSION_ID = str(uuid.uuid4())
+ROTATE = 10
+
+def test_round_trip():
+    token = issue_token(SECRET, SESSION_ID, window=100)
+    assert len(token) == 48
+    assert verify_token(SECRET, token, ROTATE, now=100 * ROTATE + 3) == SESSION_ID
+
+def test_tokens_are_unique_within_a_window():
+    assert issue_token(SECRET, SESSION_ID, 100) != issue_token(SECRET, SESSION_ID, 100)
+
+def test_clock_skew_is_allowed():
+    token = issue_token(SECRET, SESSION_ID, window=100)
+    assert verify_token(SECRET, token, ROTATE, skew_windows=1, now=101 * ROTATE) == SESSION_ID
+    assert verify_token(SECRET, token, ROTATE, skew_windows=1, now=99 * ROTATE) == SESSION_ID
+
+def test_old_token_is_rejected():
+    token = issue_token(SECRET, SESSION_ID, window=100)
+    with pytest.raises(ExpiredToken):
+        verify_token(SECRET, token, ROTATE, skew_windows=1, now=102 * ROTATE)
+
+def test_wrong_secret_is_rejected():
+    token = issue_token(SECRET, SESSION_ID, window=100)
+    with pytest.raises(InvalidToken):
+        verify_token(b"other", token, ROTATE, now=100 * ROTATE)
+
+@pytest.mark.parametrize("token", ["", "abc", "!" * 48])
+def test_malformed_token_is_rejected(token):
+    with pytest.raises(InvalidToken):
+        verify_token(SECRET, token, ROTATE)
+
+def test_session_secrets_are_independent():
+    first, second = new_session_secret(), new_session_secret()
+    assert len(first) == 64 and first != second
+    token = issue_token(bytes.fromhex(first), SESSION_ID, 100)
+    assert verify_token(bytes.fromhex(first), token, ROTATE, now=100 * ROTATE) == SESSION_ID
+    with pytest.raises(InvalidToken):
+        verify_token(bytes.fromhex(second), token, ROTATE, now=100 * ROTATE)
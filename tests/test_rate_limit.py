@@ -0,0 +1,106 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.services.rate_limit import (
+    InMemoryBuckets, RateLimit, RateLimitMiddleware, RateLimitRule, RedisBuckets, take_token
+)
+
+def make_client(rules, trusted_hops=0):
+    app = FastAPI()
+    app.add_middleware(
+        RateLimitMiddleware,
+        buckets=InMemoryBuckets(),
+        rules=rules,
+        exempt_paths=["/health"],
+        trusted_hops=trusted_hops
+    )
+
+    @app.get("/api/qr/generate")
+    async def generate():
+        return {}
+
+    @app.get("/api/qr/lecture/{session_id}")
+    async def lecture(session_id: str):
+        return {"session_id": session_id}
+
+    @app.get("/health")
+    async def health():
+        return {}
+
+    return TestClient(app)
+
+def test_parse():
+    assert RateLimit.parse("30/60") == RateLimit(30, 60.0)
+    assert RateLimit.parse("") is None
+    assert RateLimit.parse("0/60") is None
+
+def test_take_token_refills_over_time():
+    limit = RateLimit(2, 10)
+    tokens, wait = take_token(2, 0, 0, limit)
+    tokens, wait = take_token(tokens, 0, 0, limit)
+    assert (tokens, wait) == (0, 0)
+    tokens, wait = take_token(tokens, 0, 0, limit)
+    assert wait == pytest.approx(5)
+    # Half a refill period later one token is back
+    assert take_token(tokens, 0, 5, limit)[1] == 0
+
+def test_over_limit_gets_429_with_retry_after():
+    client = make_client([RateLimitRule("ip", RateLimit(2, 60))])
+    assert client.get("/api/qr/generate").status_code == 200
+    assert client.get("/api/qr/lecture/a").status_code == 200
+    response = client.get("/api/qr/generate")
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "30"
+    # Exempt paths are never limited
+    assert client.get("/health").status_code == 200
+
+def test_rules_are_scoped_to_routes():
+    client = make_client([RateLimitRule("qr_create", RateLimit(1, 60), ("/api/qr/generate",))])
+    assert client.get("/api/qr/generate").status_code == 200
+    assert client.get("/api/qr/generate").status_code == 429
+    assert client.get("/api/qr/lecture/a").status_code == 200
+
+def test_per_session_buckets():
+    client = make_client([RateLimitRule("session", RateLimit(1, 60), ("/api/qr/lecture/{session_id}",), per_session=True)])
+    assert client.get("/api/qr/lecture/a").status_code == 200
+    assert client.get("/api/qr/lecture/a").status_code == 429
+    assert client.get("/api/qr/lecture/b").status_code == 200
+    # Rules keyed by session skip routes without one
+    assert client.get("/api/qr/generate").status_code == 200
+
+def test_clients_behind_a_proxy_get_their_own_buckets():
+    client = make_client([RateLimitRule("ip", RateLimit(1, 60))], trusted_hops=1)
+
+    def get(forwarded_for):
+        return client.get("/api/qr/generate", headers={"X-Forwarded-For": forwarded_for}).status_code
+
+    assert get("203.0.113.1") == 200
+    assert get("203.0.113.2") == 200
+    assert get("203.0.113.1") == 429
+    # A forged entry to the left of the one the proxy appended changes nothing
+    assert get("198.51.100.7, 203.0.113.1") == 429
+
+def test_forwarded_for_is_ignored_without_trusted_proxies():
+    client = make_client([RateLimitRule("ip", RateLimit(1, 60))])
+    assert client.get("/api/qr/generate", headers={"X-Forwarded-For": "203.0.113.1"}).status_code == 200
+    assert client.get("/api/qr/generate", headers={"X-Forwarded-For": "203.0.113.2"}).status_code == 429
+
+@pytest.mark.asyncio
+async def test_redis_buckets_are_shared_between_workers():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    server = fakeredis.FakeServer()
+    first = RedisBuckets(fakeredis.FakeAsyncRedis(server=server))
+    second = RedisBuckets(fakeredis.FakeAsyncRedis(server=server))
+    limit = RateLimit(2, 60)
+    assert await first.take("ip:10.0.0.1", limit) == 0
+    assert await second.take("ip:10.0.0.1", limit) == 0
+    assert await first.take("ip:10.0.0.1", limit) == pytest.approx(30, abs=0.1)
+    assert await second.take("ip:10.0.0.2", limit) == 0
+
+@pytest.mark.asyncio
+async def test_redis_outage_lets_requests_through():
+    redis_asyncio = pytest.importorskip("redis.asyncio")
+    buckets = RedisBuckets(redis_asyncio.from_url("redis://127.0.0.1:1/0", socket_connect_timeout=0.2))
+    assert await buckets.take("ip:10.0.0.1", RateLimit(1, 60)) == 0
+    await buckets.close()
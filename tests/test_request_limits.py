@@ -0,0 +1,51 @@
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from app.services.request_limits import BodySizeLimitMiddleware
+
+def make_client():
+    app = FastAPI()
+    app.add_middleware(BodySizeLimitMiddleware, default_limit=100, limits={"/upload": 1000})
+    seen = []
+
+    @app.post("/echo")
+    async def echo(payload: dict):
+        seen.append(payload)
+        return {"size": len(payload["data"])}
+
+    @app.post("/upload")
+    async def upload(request: Request):
+        size = 0
+        async for chunk in request.stream():
+            size += len(chunk)
+        return {"size": size}
+
+    return TestClient(app), seen
+
+def _chunks(total, size=64):
+    for start in range(0, total, size):
+        yield b"x" * min(size, total - start)
+
+def test_small_body_passes():
+    client, seen = make_client()
+    response = client.post("/echo", json={"data": "abc"})
+    assert response.status_code == 200
+    assert seen == [{"data": "abc"}]
+
+def test_declared_length_over_limit_is_rejected_before_the_route():
+    client, seen = make_client()
+    response = client.post("/echo", json={"data": "x" * 200})
+    assert response.status_code == 413
+    assert response.json() == {"detail": "Request body too large"}
+    assert seen == []
+
+def test_streamed_body_is_cut_off_at_the_limit():
+    client, seen = make_client()
+    # No Content-Length: the body is sent chunked and counted as it arrives
+    response = client.post("/echo", content=_chunks(500), headers={"content-type": "application/json"})
+    assert response.status_code == 413
+    assert seen == []
+
+def test_limit_is_per_path():
+    client, _ = make_client()
+    assert client.post("/upload", content=b"x" * 500).json() == {"size": 500}
+    assert client.post("/upload", content=_chunks(2000)).status_code == 413
@@ -0,0 +1,102 @@
+import pytest
+from types import SimpleNamespace
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from app.core.config import settings
+from app.models.base import Base
+from app.models.roster import RosterEntry  # noqa: F401 (register table)
+from app.routers.roster import require_roster_key, router
+from app.services.database import get_db
+from app.services.roster import RosterIndex, get_roster_index, import_roster, parse_roster_csv
+
+pytest.importorskip("aiosqlite")
+
+CSV = [
+    "roll_number,full_name,branch,section",
+    "21cs001 ,Asha,CSE,A",
+    "21CS002,Ravi,CSE,B"
+]
+
+@pytest.fixture
+async def db():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+    await engine.dispose()
+
+def test_parse_normalizes_roll_numbers():
+    rows = list(parse_roster_csv(CSV))
+    assert rows[0] == {"roll_number": "21CS001", "full_name": "Asha", "branch": "CSE", "section": "A", "active": True}
+    inactive = list(parse_roster_csv(["roll_number,full_name,branch,section,active", "21CS003,Kiran,ECE,A,no"]))
+    assert inactive[0]["active"] is False
+
+@pytest.mark.parametrize("lines", [
+    ["roll_number,full_name,branch", "21CS001,Asha,CSE"],
+    ["roll_number,full_name,branch,section", "21CS001,,CSE,A"],
+    ["roll_number,full_name,branch,section", "21CS001,Asha,CSE,SECTION-ABC"]
+])
+def test_parse_rejects_malformed_csv(lines):
+    with pytest.raises(ValueError):
+        list(parse_roster_csv(lines))
+
+def test_overlong_value_is_reported_with_its_line(monkeypatch):
+    monkeypatch.setattr(settings, "ROSTER_API_KEY", "secret")
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_db] = lambda: None
+    app.dependency_overrides[get_roster_index] = lambda: None
+    body = "\n".join(CSV + ["21CS003," + "x" * 101 + ",CSE,A"])
+    response = TestClient(app).post("/api/roster/import", content=body, headers={"X-API-Key": "secret"})
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Roster CSV line 4: full_name is longer than 100 characters"}
+
+def test_check():
+    index = RosterIndex()
+    # Nothing is checked until a roster is loaded
+    assert index.check("anything", "CSE", "A") is None
+    index.apply([SimpleNamespace(roll_number="21CS001", full_name="Asha", branch="CSE", section="A", active=True, updated_at=1)])
+    assert index.check(" 21cs001", "cse", "a ") is None
+    assert index.check("21CS009", "CSE", "A") == "Roll number is not on the class roster"
+    assert index.check("21CS001", "CSE", "B") == "Branch or section does not match the class roster"
+    other_section = SimpleNamespace(branch="CSE", section="B")
+    assert index.check("21CS001", "CSE", "A", other_section) == "This session is for a different section"
+    any_section = SimpleNamespace(branch=None, section=None)
+    assert index.check("21CS001", "CSE", "A", any_section) is None
+
+@pytest.mark.asyncio
+async def test_refresh_is_incremental(db):
+    index = RosterIndex(overlap=0)
+    await import_roster(db, parse_roster_csv(CSV))
+    assert await index.refresh(db) == 2
+    assert index.get("21CS002").section == "B"
+
+    # Nothing changed: only the rows at the watermark are read again
+    assert await index.refresh(db) <= 2
+
+    await import_roster(db, parse_roster_csv([
+        "roll_number,full_name,branch,section,active",
+        "21CS002,Ravi,CSE,C,yes",
+        "21CS001,Asha,CSE,A,false"
+    ]))
+    assert await index.refresh(db) == 2
+    assert index.get("21CS002").section == "C"
+    assert index.get("21CS001") is None
+    assert len(index) == 1
+
+@pytest.mark.asyncio
+async def test_failed_import_writes_nothing(db):
+    rows = list(parse_roster_csv(CSV))
+    rows.append(dict(rows[0], roll_number="21CS003", full_name=None))
+    with pytest.raises(Exception):
+        await import_roster(db, rows, batch_size=1)
+    assert (await db.execute(select(func.count()).select_from(RosterEntry))).scalar() == 0
+
+def test_import_is_closed_without_a_key(monkeypatch):
+    monkeypatch.setattr(settings, "ROSTER_API_KEY", "")
+    with pytest.raises(HTTPException) as exc:
+        require_roster_key("anything")
+    assert exc.value.status_code == 503
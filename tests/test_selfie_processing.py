@@ -0,0 +1,109 @@
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from io import BytesIO
+from PIL import Image
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from app.models.base import Base
+from app.models.attendance import Attendance
+from app.models.session import Session
+from app.services.blob_storage import LocalBlobStorage
+from app.services.selfie_processing import SelfieJob, SelfieProcessor, process_image
+
+def camera_photo(width=1600, height=1200, orientation=None) -> bytes:
+    """A noisy gradient, which compresses about as badly as a real photo"""
+    image = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    image = Image.blend(image, Image.effect_noise((width, height), 40).convert("RGB"), 0.3)
+    exif = Image.Exif()
+    if orientation:
+        exif[0x0112] = orientation
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", quality=90, exif=exif.tobytes())
+    return buffer.getvalue()
+
+def test_process_image_downscales_and_strips_exif():
+    original = camera_photo(orientation=6)  # stored sideways, rotate 90 degrees
+    result = process_image(original, max_dimension=640, thumbnail_dimension=160)
+
+    assert result.mime_type == "image/webp"
+    assert len(result.image) < len(original) / 5
+    with Image.open(BytesIO(result.image)) as image:
+        assert image.size == (480, 640)
+        assert not image.getexif()
+    with Image.open(BytesIO(result.thumbnail)) as thumbnail:
+        assert max(thumbnail.size) == 160
+
+def test_process_image_as_jpeg():
+    result = process_image(camera_photo(), image_format="jpeg", quality=60)
+    assert result.mime_type == "image/jpeg"
+    assert result.image[:3] == b"\xff\xd8\xff"
+
+@pytest.fixture
+async def session_factory():
+    pytest.importorskip("aiosqlite")
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(Session).values(
+            session_id="s1", created_at=datetime.utcnow(), expires_at=datetime.utcnow()
+        ))
+    yield lambda: AsyncSession(engine)
+    await engine.dispose()
+
+async def _insert_row(session_factory, selfie_key, roll_number="R1"):
+    async with session_factory() as db:
+        await db.execute(insert(Attendance).values(
+            session_id="s1", full_name="A", phone_number="1", email="a@example.com",
+            branch="CSE", section="A", roll_number=roll_number, selfie_key=selfie_key,
+            created_at=datetime.utcnow()
+        ))
+        await db.commit()
+
+@pytest.mark.asyncio
+async def test_processed_selfie_replaces_original(tmp_path, session_factory):
+    storage = LocalBlobStorage(str(tmp_path))
+    original = await storage.put(camera_photo(), "image/jpeg")
+    await _insert_row(session_factory, original.key)
+
+    with ThreadPoolExecutor(1) as executor:
+        processor = SelfieProcessor(session_factory, storage, executor, delete_delay=0)
+        assert await processor.process(SelfieJob(original.key)) is True
+
+    async with session_factory() as db:
+        row = (await db.execute(select(Attendance))).scalar_one()
+    assert row.selfie_mime_type == "image/webp"
+    assert row.selfie_size < original.size
+    assert await storage.exists(row.selfie_thumbnail_key)
+    assert not await storage.exists(original.key)
+
+@pytest.mark.asyncio
+async def test_original_is_kept_until_a_row_references_it(tmp_path, session_factory):
+    storage = LocalBlobStorage(str(tmp_path))
+    original = await storage.put(camera_photo(), "image/jpeg")
+
+    with ThreadPoolExecutor(1) as executor:
+        processor = SelfieProcessor(session_factory, storage, executor, retry_delay=60)
+        assert await processor.process(SelfieJob(original.key)) is False
+    assert await storage.exists(original.key)
+
+@pytest.mark.asyncio
+async def test_original_shared_with_a_later_row_is_kept(tmp_path, session_factory):
+    storage = LocalBlobStorage(str(tmp_path))
+    original = await storage.put(camera_photo(), "image/jpeg")
+    await _insert_row(session_factory, original.key)
+
+    with ThreadPoolExecutor(1) as executor:
+        processor = SelfieProcessor(session_factory, storage, executor, delete_delay=0.05)
+        await processor.start()
+        assert await processor.process(SelfieJob(original.key)) is True
+        # The same photo resubmitted by another student, stored before the deletion is due
+        await _insert_row(session_factory, original.key, roll_number="R2")
+        await processor.deletions.join()
+        assert await storage.exists(original.key)
+
+        # The later row's own job removes the original once nothing references it
+        assert await processor.process(SelfieJob(original.key)) is True
+        await processor.deletions.join()
+        await processor.stop()
+    assert not await storage.exists(original.key)
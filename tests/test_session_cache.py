@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+from app.services.session_manager import CachedSession, SessionCache
+
+def _session(session_id, seconds=120):
+    return CachedSession(session_id=session_id, expires_at=datetime.utcnow() + timedelta(seconds=seconds))
+
+def test_hit_and_miss_counters():
+    cache = SessionCache(max_entries=10, ttl_seconds=60)
+    assert cache.get("a") is None
+    cache.put(_session("a"))
+    assert cache.get("a").session_id == "a"
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_ratio"] == 0.5
+
+def test_expired_session_is_not_cached():
+    cache = SessionCache()
+    cache.put(_session("old", seconds=-1))
+    assert cache.get("old") is None
+
+def test_entry_never_outlives_session_expiry():
+    cache = SessionCache(ttl_seconds=600)
+    cache.put(_session("a", seconds=5))
+    with patch("app.services.session_manager.time.monotonic", return_value=10**9):
+        assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+
+def test_lru_eviction():
+    cache = SessionCache(max_entries=2)
+    cache.put(_session("a"))
+    cache.put(_session("b"))
+    cache.get("a")
+    cache.put(_session("c"))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+def test_from_row_decodes_token_secret():
+    expires_at = datetime.utcnow() + timedelta(minutes=5)
+    lecture = CachedSession.from_row(SimpleNamespace(session_id="a", expires_at=expires_at, token_secret="ab" * 32, branch=None, section=None))
+    assert lecture.token_secret == bytes.fromhex("ab" * 32)
+    assert lecture.requires_token
+    plain = CachedSession.from_row(SimpleNamespace(session_id="b", expires_at=expires_at, token_secret=None, branch="CSE", section="A"))
+    assert not plain.requires_token
+    assert (plain.branch, plain.section) == ("CSE", "A")
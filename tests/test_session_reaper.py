@@ -0,0 +1,50 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.services.session_reaper import SessionReaper
+
+pytest.importorskip("aiosqlite")
+
+@pytest.fixture
+async def engine():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.execute(text(
+            "CREATE TABLE sessions (session_id VARCHAR PRIMARY KEY, data TEXT, "
+            "created_at DATETIME, expires_at DATETIME)"
+        ))
+        await conn.execute(text(
+            "CREATE TABLE attendance (id INTEGER PRIMARY KEY, session_id VARCHAR)"
+        ))
+        now = datetime.utcnow()
+        for i in range(7):
+            await conn.execute(
+                text("INSERT INTO sessions (session_id, expires_at) VALUES (:id, :expires_at)"),
+                {"id": f"old-{i}", "expires_at": now - timedelta(hours=2)}
+            )
+        await conn.execute(
+            text("INSERT INTO sessions (session_id, expires_at) VALUES ('live', :expires_at)"),
+            {"expires_at": now + timedelta(minutes=3)}
+        )
+        await conn.execute(text("INSERT INTO attendance (session_id) VALUES ('old-0')"))
+    yield engine
+    await engine.dispose()
+
+@pytest.mark.asyncio
+async def test_sweep_removes_expired_sessions_in_batches(engine):
+    reaper = SessionReaper(engine, batch_size=2, max_batches=10, grace_seconds=60)
+    result = await reaper.sweep()
+
+    assert result.removed == 6
+    assert not result.skipped
+    async with engine.connect() as conn:
+        remaining = (await conn.execute(text("SELECT session_id FROM sessions ORDER BY session_id"))).scalars().all()
+    # Sessions with attendance and live sessions are kept
+    assert remaining == ["live", "old-0"]
+    assert reaper.stats()["total_removed"] == 6
+
+@pytest.mark.asyncio
+async def test_sweep_is_bounded(engine):
+    reaper = SessionReaper(engine, batch_size=2, max_batches=1, grace_seconds=60)
+    assert (await reaper.sweep()).removed == 2
@@ -1,5 +1,6 @@
 import pytest
 from fastapi.testclient import TestClient
+from app.core.config import settings
 from app.main import app
 from unittest.mock import patch
 
@@ -108,4 +109,27 @@ def test_validate_security_invalid_ip():
             "user_agent": "Mozilla/5.0"
         }
     )
-    assert response.status_code == 422  # Validation error
\ No newline at end of file
+    assert response.status_code == 422  # Validation error
+
+
+@pytest.mark.parametrize("body", [
+    '{"latitudes": [NaN], "longitudes": [78.4]}',
+    '{"latitudes": [17.3], "longitudes": [Infinity]}',
+    '{"latitudes": [91.0], "longitudes": [78.4]}'
+])
+def test_validate_location_batch_rejects_bad_coordinates(body):
+    response = client.post(
+        "/api/validation/location/batch",
+        content=body,
+        headers={"content-type": "application/json"}
+    )
+    assert response.status_code == 422
+
+
+def test_validate_location_batch_accepts_the_largest_batch():
+    points = settings.LOCATION_BATCH_MAX_POINTS
+    response = client.post(
+        "/api/validation/location/batch",
+        json={"latitudes": [-17.123456789012345] * points, "longitudes": [-78.12345678901234] * points}
+    )
+    assert response.status_code == 200